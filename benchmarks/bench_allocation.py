@@ -0,0 +1,202 @@
+# benchmarks/bench_allocation.py
+"""
+Batch allocation of requests for any matching car (src/system/allocation.py): quality against the optimum, and
+speed at scale.
+
+Quality: --check small random instances (a few cars of a few classes, some existing reservations, up to
+--check-requests requests) are allocated by FleetAllocator and by an exhaustive search for the largest number of
+requests that can be served. Every allocation is checked to be valid (matching, in-service cars, rent periods
+respected, no overlaps). On instances with one class of cars and no existing reservations the allocator is
+optimal, and the script exits with status 1 if it ever serves fewer requests there; elsewhere the share of optimal
+instances and the worst ratio are printed.
+
+Speed: --requests requests spread over the workload year, asking for a make, a make and model, a year or any car,
+are allocated against a generated fleet and its approved bookings: once by FleetAllocator alone and once by
+RentalService.allocate_requests, which also books and saves them. Fleet utilization is the share of the year's
+car-days that are booked before and after.
+
+Run from the repository root:
+    python -m benchmarks.bench_allocation --scale 10k --requests 100000 --check 500
+"""
+import argparse
+import datetime
+import random
+import time
+
+from benchmarks.common import temp_db_path
+from benchmarks.workload import MAKES, SCALES, WORKLOAD_DAYS, WORKLOAD_START, Workload
+from src.database.database_manager import DatabaseManager
+from src.models.car import Car
+from src.system.allocation import CarRequest, FleetAllocator
+from src.system.auth_service import AuthService
+from src.system.availability import AvailabilityIndex
+from src.system.rental_service import RentalService
+
+SMALL_DAYS = 12  # Days of the period small instances are drawn from
+
+
+def matches(car, request):
+    make, model, year = request.car_class()
+    return ((make is None or car.make.lower() == make) and (model is None or car.model.lower() == model)
+            and (year is None or int(car.year) == year))
+
+
+def fits(car, request):
+    return car.available and matches(car, request) and \
+        car.min_rent_period <= (request.end_date - request.start_date).days <= car.max_rent_period
+
+
+def validate(assignments, availability):
+    # Raises if an allocation breaks a rule; returns the number of requests served
+    taken = {}
+    for request, car in assignments:
+        if not fits(car, request) or not availability.is_free(car.car_id, request.start_date, request.end_date):
+            raise SystemExit(f"{request} was given {car.car_id}, which does not fit it.")
+        for other in taken.setdefault(car.car_id, []):
+            if other.start_date < request.end_date and request.start_date < other.end_date:
+                raise SystemExit(f"{request} and {other} were both given {car.car_id}.")
+        taken[car.car_id].append(request)
+    return len(assignments)
+
+
+def optimum(cars, availability, requests):
+    """
+    Largest number of requests that can be served, by exhaustive search.
+    """
+    options = [[car for car in cars if fits(car, request)
+                and availability.is_free(car.car_id, request.start_date, request.end_date)] for request in requests]
+    taken = {car.car_id: [] for car in cars}
+    best = 0
+
+    def search(i, served):
+        nonlocal best
+        if served + len(requests) - i <= best:
+            return  # Serving every remaining request would not beat the best found
+        if i == len(requests):
+            best = served
+            return
+        request = requests[i]
+        for car in options[i]:
+            if all(other.end_date <= request.start_date or request.end_date <= other.start_date
+                   for other in taken[car.car_id]):
+                taken[car.car_id].append(request)
+                search(i + 1, served + 1)
+                taken[car.car_id].pop()
+        search(i + 1, served)
+
+    search(0, 0)
+    return best
+
+
+def small_instance(rng, max_requests, single_class):
+    day = lambda offset: WORKLOAD_START + datetime.timedelta(days=offset)
+    makes = ['Toyota'] if single_class else ['Toyota', 'Honda']
+    cars = []
+    for i in range(rng.randint(1, 3)):
+        make = rng.choice(makes)
+        cars.append(Car(f"car-{i}", make, rng.choice(MAKES[make][:2]), rng.choice((2020, 2021)), 0, True,
+                        1 if single_class else rng.randint(1, 2), SMALL_DAYS if single_class else rng.randint(3, 6)))
+    availability = AvailabilityIndex()
+    if not single_class:
+        for car in cars:
+            if rng.random() < 0.5:
+                start = rng.randrange(SMALL_DAYS - 2)
+                availability.reserve(car.car_id, day(start), day(start + rng.randint(1, 2)), f"booked-{car.car_id}")
+    requests = []
+    for i in range(rng.randint(1, max_requests)):
+        start = rng.randrange(SMALL_DAYS - 1)
+        end = min(SMALL_DAYS, start + rng.randint(1, 5))
+        if single_class:
+            wanted = {'make': 'Toyota'}
+        else:
+            wanted = rng.choice(({}, {'make': rng.choice(makes)}, {'year': rng.choice((2020, 2021))},
+                                 {'make': 'Toyota', 'model': MAKES['Toyota'][0]}))
+        requests.append(CarRequest(i, f"customer-{i}", day(start), day(end), **wanted))
+    return cars, availability, requests
+
+
+def check(instances, max_requests, seed):
+    rng = random.Random(seed)
+    for single_class in (True, False):
+        optimal, worst = 0, 1.0
+        for _ in range(instances):
+            cars, availability, requests = small_instance(rng, max_requests, single_class)
+            served = validate(FleetAllocator(cars, availability).allocate(requests)[0], availability)
+            best = optimum(cars, availability, requests)
+            if served > best:
+                raise SystemExit("The exhaustive search missed an allocation.")
+            if served == best:
+                optimal += 1
+            elif single_class:
+                raise SystemExit(f"Served {served} requests where {best} could be: {[str(r) for r in requests]}")
+            else:
+                worst = min(worst, served / best)
+        label = "one class, no reservations" if single_class else "mixed classes and reservations"
+        print(f"{label:<32}{optimal}/{instances} optimal, worst {worst:.0%} of the optimum")
+
+
+def random_requests(workload, count, seed):
+    rng = random.Random(seed)
+    makes = sorted(MAKES)
+    requests = []
+    for i in range(count):
+        start = WORKLOAD_START + datetime.timedelta(days=rng.randrange(WORKLOAD_DAYS - 7))
+        end = start + datetime.timedelta(days=rng.randint(1, 7))
+        make = rng.choice(makes)
+        wanted = rng.choices(({'make': make}, {'make': make, 'model': rng.choice(MAKES[make])},
+                              {'year': rng.randint(2005, 2024)}, {}), weights=(4, 3, 2, 1))[0]
+        requests.append((i, workload.customer(rng.randrange(workload.customers)), start, end, wanted))
+    return requests
+
+
+def utilization(service):
+    cars = sum(1 for car in service.cars if car.available)
+    return service.availability.reservation_count(), sum(
+        (booking.end_date - booking.start_date).days for booking in service.list_bookings("Approved")) / (
+        cars * WORKLOAD_DAYS)
+
+
+def run(workload, count, seed):
+    with temp_db_path() as db_path:
+        workload.populate(db_path)
+        service = RentalService(DatabaseManager(db_path), auth=AuthService(workers=1))
+        rows = random_requests(workload, count, seed)
+        requests = [service.car_request(customer, start.isoformat(), end.isoformat(), request_id=i, **wanted)
+                    for i, customer, start, end, wanted in rows]
+        print(f"\n{workload.describe()}, {count} requests")
+        reservations, before = utilization(service)
+
+        started = time.perf_counter()
+        assignments, unassigned = FleetAllocator(service.cars, service.availability).allocate(requests)
+        allocated = time.perf_counter() - started
+        validate(assignments, service.availability)
+
+        started = time.perf_counter()
+        report = service.allocate_requests(requests)
+        booked = time.perf_counter() - started
+        if len(report.bookings) != len(assignments):
+            raise SystemExit("allocate_requests booked a different allocation.")
+        _, after = utilization(service)
+        service.close()
+
+        print(f"FleetAllocator.allocate          {allocated:>8.2f} s  {count / allocated:>10.0f} requests/sec")
+        print(f"allocate_requests (and save)     {booked:>8.2f} s  {count / booked:>10.0f} requests/sec")
+        print(f"served {len(assignments)} of {count} requests ({report.booked_days()} days) in {report.batches} "
+              f"transactions; {reservations} existing reservations")
+        print(f"fleet utilization {before:.1%} -> {after:.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', default='10k', help=f"{', '.join(SCALES)} or a number of bookings")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--requests', type=int, default=100_000)
+    parser.add_argument('--check', type=int, default=500, help="small instances compared with the optimum per kind")
+    parser.add_argument('--check-requests', type=int, default=7, help="most requests in a small instance")
+    args = parser.parse_args()
+    check(args.check, args.check_requests, args.seed)
+    run(Workload(args.scale, args.seed), args.requests, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+# benchmarks/bench_archive.py
+"""
+Hot/cold partitioning of bookings: the working set before and after archiving the bookings that have ended
+(DatabaseManager.archive_bookings, run by RentalService.archive_bookings and the server's --archive-every).
+
+A generated workload spreads bookings over WORKLOAD_DAYS days. load_data, available cars, the pending bookings of a
+date range and a conflict check (book_car on a taken period) are timed, the bookings that ended --cutoff-days days
+into the workload and the rejected ones are archived, and the same calls are timed again. Reading a customer's
+history from the archive is timed last. Report totals are checked to be unchanged by archiving.
+
+Run from the repository root:
+    python -m benchmarks.bench_archive --scale 100k --cutoff-days 300
+"""
+import argparse
+import datetime
+import random
+import time
+
+from benchmarks.common import measure, print_table, temp_db_path
+from benchmarks.workload import SCALES, WORKLOAD_DAYS, WORKLOAD_START, Workload
+from src.database.database_manager import DatabaseManager
+from src.system.auth_service import AuthService
+from src.system.rental_service import RentalService, ServiceError
+
+
+def calls(service, workload, cutoff, seed):
+    """
+    Operation name -> zero-argument call on the bookings still running after the cutoff.
+    """
+    rng = random.Random(seed)
+    remaining_days = max(1, WORKLOAD_DAYS - (cutoff - WORKLOAD_START).days)
+    customer = service.users.get(workload.customer(0))
+    taken = [booking for booking in service.list_bookings("Approved") if booking.end_date > cutoff]
+
+    def period(days):
+        start = cutoff + datetime.timedelta(days=rng.randrange(remaining_days))
+        return start.isoformat(), (start + datetime.timedelta(days=days)).isoformat()
+
+    def conflict():
+        booking = rng.choice(taken)
+        try:
+            service.book_car(customer, booking.car_id, booking.start_date.isoformat(), booking.end_date.isoformat())
+        except ServiceError:
+            pass  # Taken, as expected
+
+    return {
+        'load_data': service.load_data,
+        'available cars': lambda: service.available_cars(*period(3)),
+        'pending bookings': lambda: service.find_bookings("Pending", *period(30)),
+        'conflict check': conflict,
+    }
+
+
+def run(workload, cutoff_days, repeat):
+    cutoff = WORKLOAD_START + datetime.timedelta(days=cutoff_days)
+    with temp_db_path() as db_path:
+        workload.populate(db_path)
+        db_manager = DatabaseManager(db_path)
+        service = RentalService(db_manager, auth=AuthService(workers=1))
+        totals = service.report()  # Also counts the approved bookings, which are only archived once counted
+        print(f"\n{workload.describe()}, archiving bookings ended by {cutoff.isoformat()}")
+
+        rows, sizes = [], [len(service.bookings)]
+        for name, call in calls(service, workload, cutoff, workload.seed).items():
+            rows.append((f"{name}, all bookings", measure(call, repeat)))
+
+        started = time.perf_counter()
+        archived = db_manager.archive_bookings(cutoff)  # The service only archives up to today
+        elapsed = time.perf_counter() - started
+        service.load_data()
+        sizes.append(len(service.bookings))
+        check = db_manager.check_booking_totals()
+        if service.report() != totals or check['uncounted'] or check['stale'] or check['mismatched']:
+            raise SystemExit("Archiving changed the report totals.")
+
+        for name, call in calls(service, workload, cutoff, workload.seed).items():
+            rows.append((f"{name}, after archiving", measure(call, repeat)))
+        customers = iter(random.Random(workload.seed).choices(range(workload.customers), k=repeat))
+        rows.append(("booking history of a customer", measure(
+            lambda: list(service.booking_history(workload.customer(next(customers)))), repeat)))
+        service.close()
+
+        print(f"archived {archived} bookings in {elapsed:.2f} s; working set {sizes[0]} -> {sizes[1]} bookings")
+        print_table("Working set before and after archiving", rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', default='100k', help=f"{', '.join(SCALES)} or a number of bookings")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--cutoff-days', type=int, default=300,
+                        help=f"days into the {WORKLOAD_DAYS}-day workload whose ended bookings are archived")
+    parser.add_argument('--repeat', type=int, default=20, help="calls timed per operation")
+    args = parser.parse_args()
+    run(Workload(args.scale, args.seed), args.cutoff_days, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+# benchmarks/bench_auth.py
+"""
+Login throughput of CarRentalSystem.login_user with the salted KDF, for a range of AuthService worker counts,
+with many client threads logging in at once. The unsalted MD5 check it replaces is shown for reference.
+
+Run from the repository root:
+    python -m benchmarks.bench_auth --clients 32 --logins 256 --workers 1 2 4 8
+"""
+import argparse
+import hashlib
+import io
+import os
+import threading
+import time
+from contextlib import redirect_stdout
+
+from benchmarks.common import print_table, summarize, temp_db_path
+from src.database.database_manager import DatabaseManager
+from src.system.auth_service import AuthService, Pbkdf2Kdf, ScryptKdf
+from src.system.car_rental_system import CarRentalSystem
+
+USERS = 64
+
+
+def populate(db_path, auth):
+    manager = DatabaseManager(db_path)
+    manager.bulk_write('users', ((f"user-{i}", auth.hash_password(f"password-{i}"), 'customer')
+                                 for i in range(USERS)))
+    manager.close()
+
+
+def concurrent_logins(login, clients, logins):
+    """
+    Run logins spread over client threads.
+
+    Returns:
+        Tuple (logins per second, latency summary).
+    """
+    latencies = []
+    lock = threading.Lock()
+
+    def client(index):
+        mine = []
+        for n in range(index, logins, clients):
+            user = n % USERS
+            started = time.perf_counter()
+            if not login(f"user-{user}", f"password-{user}"):
+                raise AssertionError("login failed")
+            mine.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return logins / elapsed, summarize(latencies)
+
+
+def run(kdf_name, clients, logins, workers):
+    kdf = ScryptKdf() if kdf_name == 'scrypt' else Pbkdf2Kdf()
+    results = []
+    with temp_db_path() as db_path:
+        populate(db_path, AuthService(kdf, workers=1))
+
+        md5_hashes = {f"user-{i}": hashlib.md5(f"password-{i}".encode()).hexdigest() for i in range(USERS)}
+        rate, summary = concurrent_logins(
+            lambda username, password: hashlib.md5(password.encode()).hexdigest() == md5_hashes[username],
+            clients, logins)
+        summary['ops_per_sec'] = round(rate, 1)
+        results.append(('md5, unsalted (previous)', summary))
+
+        for count in workers:
+            auth = AuthService(kdf, workers=count)
+            system = CarRentalSystem(DatabaseManager(db_path), auth=auth)
+            with redirect_stdout(io.StringIO()):
+                rate, summary = concurrent_logins(system.login_user, clients, logins)
+            summary['ops_per_sec'] = round(rate, 1)
+            results.append((f"{kdf.name}, {count} worker(s)", summary))
+            auth.close()
+            system.db_manager.close()
+    print_table(f"{clients} concurrent clients, {logins} logins, {os.cpu_count()} CPU(s) "
+                f"(ops_per_sec is aggregate logins/s)", results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--kdf', choices=('scrypt', 'pbkdf2'), default='scrypt')
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--logins', type=int, default=256)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    run(args.kdf, args.clients, args.logins, args.workers)
+
+
+if __name__ == '__main__':
+    main()
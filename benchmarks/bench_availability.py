@@ -0,0 +1,95 @@
+# benchmarks/bench_availability.py
+"""
+AvailabilityIndex against a linear scan over every reserved booking.
+
+Run from the repository root (defaults match a 100k-car fleet with 5M historical bookings):
+    python -m benchmarks.bench_availability --cars 100000 --bookings 5000000
+"""
+import argparse
+import datetime
+import random
+import time
+
+from benchmarks.common import measure, print_table
+from src.system.availability import AvailabilityIndex
+
+
+class _CarRef:
+    __slots__ = ('car_id',)
+
+    def __init__(self, car_id):
+        self.car_id = car_id
+
+
+def generate_reservations(cars, bookings, seed=42):
+    """
+    Yield (car_id, start, end) ordinals: consecutive, non-overlapping history per car ending before today.
+    """
+    rng = random.Random(seed)
+    per_car = max(1, bookings // cars)
+    today = datetime.date.today().toordinal()
+    for car in range(cars):
+        day = today - per_car * 12
+        for _ in range(per_car):
+            day += rng.randint(0, 5)
+            length = rng.randint(1, 7)
+            yield f"car-{car}", day, day + length
+            day += length
+
+
+def run(cars, bookings, repeat, naive_repeat):
+    index = AvailabilityIndex()
+    flat = []  # (car_id, start, end) for the linear-scan baseline
+    started = time.perf_counter()
+    for number, (car_id, start, end) in enumerate(generate_reservations(cars, bookings)):
+        index.reserve(car_id, start, end, number)
+        flat.append((car_id, start, end))
+    build_seconds = time.perf_counter() - started
+    print(f"Indexed {index.reservation_count()} reservations for {cars} cars in {build_seconds:.1f}s")
+
+    rng = random.Random(7)
+    today = datetime.date.today().toordinal()
+    fleet = [_CarRef(f"car-{car}") for car in range(cars)]
+
+    def random_query(past):
+        car_id = f"car-{rng.randrange(cars)}"
+        start = today - rng.randint(1, 300) if past else today + rng.randint(0, 60)
+        return car_id, start, start + rng.randint(1, 14)
+
+    def naive_is_free(car_id, start, end):
+        return not any(c == car_id and s < end and e > start for c, s, e in flat)
+
+    results = [
+        ('index is_free (historical range)', measure(lambda: index.is_free(*random_query(True)), repeat)),
+        ('index is_free (future range)', measure(lambda: index.is_free(*random_query(False)), repeat)),
+        ('scan is_free (historical range)', measure(lambda: naive_is_free(*random_query(True)), naive_repeat)),
+    ]
+
+    def index_free_cars(past):
+        _, start, end = random_query(past)
+        return sum(1 for _ in index.free_cars(fleet, start, end))
+
+    def naive_free_cars():
+        _, start, end = random_query(True)
+        busy = {c for c, s, e in flat if s < end and e > start}
+        return sum(1 for car in fleet if car.car_id not in busy)
+
+    results.append((f'index free_cars (historical, {cars} cars)', measure(lambda: index_free_cars(True), naive_repeat)))
+    results.append((f'index free_cars (future, {cars} cars)', measure(lambda: index_free_cars(False), naive_repeat)))
+    results.append((f'scan free_cars ({len(flat)} bookings)', measure(naive_free_cars, naive_repeat)))
+    print_table("Date-range availability", results)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cars', type=int, default=100_000)
+    parser.add_argument('--bookings', type=int, default=5_000_000)
+    parser.add_argument('--repeat', type=int, default=10_000, help='point queries per index measurement')
+    parser.add_argument('--naive-repeat', type=int, default=3, help='queries for the slow full-scan measurements')
+    args = parser.parse_args()
+    run(args.cars, args.bookings, args.repeat, args.naive_repeat)
+
+
+if __name__ == '__main__':
+    main()
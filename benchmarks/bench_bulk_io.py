@@ -0,0 +1,117 @@
+# benchmarks/bench_bulk_io.py
+"""
+Bulk import/export throughput: one add_car + save per car (previous) versus src.system.bulk_io with chunked
+transactions, for a range of batch sizes.
+
+Run from the repository root:
+    python -m benchmarks.bench_bulk_io --cars 20000 --bookings 200000
+"""
+import argparse
+import csv
+import datetime
+import json
+import os
+import random
+import time
+
+from benchmarks.common import temp_db_path
+from src.database.database_manager import DatabaseManager
+from src.system.bulk_io import export_table, import_file
+from src.system.car_rental_system import CarRentalSystem
+
+CAR_COLUMNS = ['car_id', 'make', 'model', 'year', 'mileage', 'available', 'min_rent_period', 'max_rent_period']
+BOOKING_COLUMNS = ['booking_id', 'customer_username', 'car_id', 'start_date', 'end_date', 'status']
+
+
+def write_fleet(path, count, seed=42):
+    rng = random.Random(seed)
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(CAR_COLUMNS)
+        for i in range(count):
+            writer.writerow([f"car-{i}", rng.choice(['Toyota', 'Honda', 'Ford', 'BMW']), f"Model {i % 50}",
+                             rng.randint(2005, 2024), rng.randint(0, 200000), 'true', rng.randint(1, 3),
+                             rng.randint(7, 30)])
+
+
+def write_bookings(path, count, cars, seed=42):
+    rng = random.Random(seed)
+    base = datetime.date(2024, 1, 1).toordinal()
+    with open(path, 'w') as file:
+        for i in range(count):
+            car = i % cars
+            # Bookings of a car follow each other every 10 days, so approved ones never overlap
+            start = base + (i // cars) * 10
+            file.write(json.dumps(dict(zip(BOOKING_COLUMNS, [
+                f"booking-{i}", 'customer', f"car-{car}", datetime.date.fromordinal(start).isoformat(),
+                datetime.date.fromordinal(start + 7).isoformat(), rng.choice(['Pending', 'Approved'])]))))
+            file.write("\n")
+
+
+def timed(label, function, count):
+    started = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<44}{elapsed:>10.2f}s{count / elapsed:>16,.0f} rows/s")
+    return result
+
+
+def add_one_by_one(db_path, fleet_path, limit):
+    # The admin menu path: every add_car followed by a save
+    db_manager = DatabaseManager(db_path)
+    system = CarRentalSystem(db_manager=db_manager)
+    with open(fleet_path, newline='') as file:
+        for i, record in enumerate(csv.DictReader(file)):
+            if i == limit:
+                break
+            system.add_car(record['make'], record['model'], record['year'], record['mileage'],
+                           record['min_rent_period'], record['max_rent_period'])
+            system.save_data()
+    db_manager.close()
+
+
+def run(cars, bookings, batch_sizes, baseline_cars):
+    with temp_db_path() as db_path:
+        directory = os.path.dirname(db_path)
+        fleet_path = os.path.join(directory, 'fleet.csv')
+        bookings_path = os.path.join(directory, 'bookings.jsonl')
+        write_fleet(fleet_path, cars)
+        write_bookings(bookings_path, bookings, cars)
+        print(f"\n{cars} cars, {bookings} bookings")
+
+        baseline_cars = min(baseline_cars, cars)
+        timed(f"cars: add_car + save_data x{baseline_cars}",
+              lambda: add_one_by_one(os.path.join(directory, 'baseline.db'), fleet_path, baseline_cars), baseline_cars)
+
+        for batch_size in batch_sizes:
+            path = os.path.join(directory, f"bulk_{batch_size}.db")
+            db_manager = DatabaseManager(path)
+            db_manager.connect()
+            CarRentalSystem(db_manager=db_manager).register_user('customer', 'secret', 'customer')
+            timed(f"cars: import csv, batch {batch_size}",
+                  lambda: import_file(db_manager, 'cars', fleet_path, batch_size=batch_size), cars)
+            timed(f"bookings: import jsonl, batch {batch_size}",
+                  lambda: import_file(db_manager, 'bookings', bookings_path, batch_size=batch_size), bookings)
+            db_manager.close()
+
+        db_manager = DatabaseManager(path)
+        for table, count in (('cars', cars), ('bookings', bookings)):
+            for fmt in ('csv', 'jsonl'):
+                out = os.path.join(directory, f"export_{table}.{fmt}")
+                timed(f"{table}: export {fmt}", lambda: export_table(db_manager, table, out), count)
+        db_manager.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cars', type=int, default=20000)
+    parser.add_argument('--bookings', type=int, default=200000)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[500, 5000, 50000])
+    parser.add_argument('--baseline-cars', type=int, default=2000,
+                        help="cars added one by one for the previous-behaviour baseline")
+    args = parser.parse_args()
+    run(args.cars, args.bookings, args.batch_sizes, args.baseline_cars)
+
+
+if __name__ == '__main__':
+    main()
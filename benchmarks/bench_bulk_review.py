@@ -0,0 +1,115 @@
+# benchmarks/bench_bulk_review.py
+"""
+Approving a backlog of pending bookings: one approve_booking call per booking (one transaction each, rejecting the
+booking when it overlaps an approved one), against review_bookings deciding them in batches of one transaction.
+
+Every booking is pending and they overlap heavily (random 1-7 day periods, about 10 per car over a year), so a
+share is rejected automatically. The per-booking loop runs on the first --loop bookings and is extrapolated. After
+each run the database is checked for approved bookings of a car that overlap.
+
+Run from the repository root:
+    python -m benchmarks.bench_bulk_review --bookings 100000 --batch-sizes 100 1000 10000
+"""
+import argparse
+import datetime
+import random
+import shutil
+import sqlite3
+import time
+
+from benchmarks.common import temp_db_path
+from benchmarks.workload import PASSWORD, WORKLOAD_DAYS, WORKLOAD_START, Workload
+from src.database.database_manager import DatabaseManager
+from src.system.auth_service import AuthService
+from src.system.rental_service import RentalService, ServiceError
+
+
+def pending_rows(workload, rng):
+    for i in range(workload.bookings):
+        start = WORKLOAD_START + datetime.timedelta(days=rng.randrange(WORKLOAD_DAYS))
+        end = start + datetime.timedelta(days=rng.randint(1, 7))
+        yield (workload.booking_id(i), workload.customer(rng.randrange(workload.customers)),
+               workload.car_id(rng.randrange(workload.cars)), start.isoformat(), end.isoformat(), "Pending")
+
+
+def populate(db_path, bookings, seed):
+    workload = Workload(bookings, seed)
+    manager = DatabaseManager(db_path)
+    try:
+        manager.bulk_write('users', workload.user_rows(AuthService(workers=1).hash_password(PASSWORD)))
+        manager.bulk_write('cars', workload.car_rows())
+        manager.bulk_write('bookings', pending_rows(workload, random.Random(seed)))
+        with manager.connection() as connection:
+            connection.execute('ANALYZE')
+    finally:
+        manager.close()
+
+
+def overlapping_approvals(db_path):
+    connection = sqlite3.connect(db_path)
+    try:
+        rows = connection.execute("SELECT car_id, start_date, end_date FROM bookings WHERE status = 'Approved' "
+                                  "ORDER BY car_id, start_date").fetchall()
+    finally:
+        connection.close()
+    return sum(car == next_car and next_start < end
+               for (car, _, end), (next_car, next_start, _) in zip(rows, rows[1:]))
+
+
+def per_booking_loop(db_path, lazy, limit):
+    service = RentalService(DatabaseManager(db_path), lazy=lazy)
+    booking_ids = [booking.booking_id for booking in service.find_bookings()[:limit]]
+    started = time.perf_counter()
+    for booking_id in booking_ids:
+        try:
+            service.approve_booking(booking_id)
+        except ServiceError:
+            service.reject_booking(booking_id)
+    seconds = time.perf_counter() - started
+    service.db_manager.close()
+    return len(booking_ids), seconds
+
+
+def bulk_review(db_path, lazy, batch_size):
+    service = RentalService(DatabaseManager(db_path), lazy=lazy)
+    started = time.perf_counter()
+    report = service.review_bookings(service.find_bookings(), 'approve', batch_size)
+    seconds = time.perf_counter() - started
+    service.db_manager.close()
+    return report, seconds
+
+
+def run(bookings, batch_sizes, loop, seed):
+    with temp_db_path('template.db') as template:
+        populate(template, bookings, seed)
+        work = template.replace('template.db', 'work.db')
+        print(f"\n{bookings} pending bookings{'':<22}{'seconds':>12}{'bookings/s':>14}{'approved':>10}"
+              f"{'rejected':>10}{'overlaps':>10}")
+        for lazy in (False, True):
+            mode = 'lazy' if lazy else 'eager'
+            shutil.copyfile(template, work)
+            decided, seconds = per_booking_loop(work, lazy, loop)
+            estimate = seconds / decided * bookings
+            print(f"{mode + ' approve_booking loop (est.)':<40}{estimate:>12.2f}{decided / seconds:>14,.0f}"
+                  f"{'':>20}{overlapping_approvals(work):>10}")
+            for batch_size in batch_sizes:
+                shutil.copyfile(template, work)
+                report, seconds = bulk_review(work, lazy, batch_size)
+                label = f"{mode} review_bookings, batches of {batch_size}"
+                print(f"{label:<40}{seconds:>12.2f}{bookings / seconds:>14,.0f}{report.approved:>10}"
+                      f"{report.rejected + report.auto_rejected:>10}{overlapping_approvals(work):>10}")
+        print(f"\nThe approve_booking loop ran on the first {loop} bookings; its total is extrapolated.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bookings', type=int, default=100_000)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[100, 1000, 10_000])
+    parser.add_argument('--loop', type=int, default=1000, help="bookings approved one call at a time")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    run(args.bookings, args.batch_sizes, args.loop, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+# benchmarks/bench_contention.py
+"""
+Several processes working on the same database file, as several console terminals would: each books and approves
+cars and increments the mileage of a few shared cars, working from its own in-memory snapshot and refreshing it
+between operations.
+
+Reports bookings per second and conflicts, then checks the database afterwards:
+  - lost updates: mileage increments that were acknowledged but are missing from the final mileage
+  - double bookings: pairs of approved bookings of the same car with overlapping dates
+
+--blind runs the mileage increments as plain overwrites of the whole row (no version check), for comparison.
+
+Run from the repository root:
+    python -m benchmarks.bench_contention --processes 4 --seconds 5
+"""
+import argparse
+import datetime
+import multiprocessing
+import random
+import sqlite3
+import time
+
+from benchmarks.common import temp_db_path
+from src.database.database_manager import DatabaseManager
+from src.system.rental_service import RentalService, ServiceError
+
+INITIAL_MILEAGE = 1000
+BOOKING_WINDOW_DAYS = 365  # Bookings start within this many days from tomorrow
+OVERLAPPING_APPROVED = ("SELECT COUNT(*) FROM bookings a JOIN bookings b ON a.car_id = b.car_id "
+                        "AND a.booking_id < b.booking_id AND a.start_date < b.end_date AND b.start_date < a.end_date "
+                        "WHERE a.status = 'Approved' AND b.status = 'Approved'")
+
+
+def populate(db_path, processes, cars):
+    manager = DatabaseManager(db_path)
+    manager.bulk_write('users', [(f"customer-{i}", 'x', 'customer') for i in range(processes)])
+    manager.bulk_write('cars', ((f"car-{i}", 'Toyota', 'Corolla', 2020, INITIAL_MILEAGE, True, 1, 30)
+                                for i in range(cars)))
+    manager.close()
+
+
+def worker(index, db_path, seconds, cars, hot_cars, lazy, blind, barrier, results):
+    rng = random.Random(index)
+    service = RentalService(DatabaseManager(db_path), lazy=lazy)
+    customer = service.users.get(f"customer-{index}")
+    first_day = datetime.date.today() + datetime.timedelta(days=1)
+    counts = {'approved': 0, 'booking_conflicts': 0, 'increments': 0, 'increment_conflicts': 0}
+    barrier.wait()
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        service.refresh()
+        if rng.random() < 0.3:
+            # Read-modify-write of a shared counter, from this process's snapshot
+            car_id = f"car-{rng.randrange(hot_cars)}"
+            car = service.get_car(car_id)
+            if blind:
+                car.mileage += 1
+                service.db_manager.save_cars([car])
+                counts['increments'] += 1
+                continue
+            try:
+                service.update_car(car_id, mileage=car.mileage + 1)
+                counts['increments'] += 1
+            except ServiceError:
+                counts['increment_conflicts'] += 1
+            continue
+        start = first_day + datetime.timedelta(days=rng.randrange(BOOKING_WINDOW_DAYS))
+        end = start + datetime.timedelta(days=rng.randint(1, 5))
+        try:
+            booking = service.book_car(customer, f"car-{rng.randrange(cars)}", start.isoformat(), end.isoformat())
+            service.approve_booking(booking.booking_id)
+            counts['approved'] += 1
+        except ServiceError:
+            counts['booking_conflicts'] += 1
+    counts['seconds'] = time.perf_counter() - started
+    service.db_manager.close()
+    results.put(counts)
+
+
+def run(processes, seconds, cars, hot_cars, lazy, blind):
+    context = multiprocessing.get_context('spawn')
+    with temp_db_path() as db_path:
+        populate(db_path, processes, cars)
+        barrier = context.Barrier(processes)
+        results = context.Queue()
+        workers = [context.Process(target=worker, args=(i, db_path, seconds, cars, hot_cars, lazy, blind, barrier,
+                                                        results))
+                   for i in range(processes)]
+        for process in workers:
+            process.start()
+        counts = [results.get() for _ in workers]
+        for process in workers:
+            process.join()
+
+        connection = sqlite3.connect(db_path)
+        mileage_added = connection.execute(
+            "SELECT SUM(mileage) - ? * COUNT(*) FROM cars WHERE car_id IN (%s)" % ', '.join('?' * hot_cars),
+            [INITIAL_MILEAGE] + [f"car-{i}" for i in range(hot_cars)]).fetchone()[0]
+        double_bookings = connection.execute(OVERLAPPING_APPROVED).fetchone()[0]
+        connection.close()
+
+    total = {key: sum(count[key] for count in counts) for key in counts[0]}
+    elapsed = max(count['seconds'] for count in counts)
+    mode = 'blind overwrites' if blind else 'versioned writes'
+    print(f"\n{processes} processes x {seconds} s, {cars} cars ({hot_cars} with shared mileage counters), "
+          f"{'lazy' if lazy else 'eager'} mode, {mode}")
+    print(f"{'bookings approved per second':<40}{total['approved'] / elapsed:>12.1f}")
+    print(f"{'booking requests per second':<40}{(total['approved'] + total['booking_conflicts']) / elapsed:>12.1f}")
+    print(f"{'bookings approved':<40}{total['approved']:>12}")
+    print(f"{'bookings refused (dates taken)':<40}{total['booking_conflicts']:>12}")
+    print(f"{'mileage increments acknowledged':<40}{total['increments']:>12}")
+    print(f"{'mileage increments refused (stale)':<40}{total['increment_conflicts']:>12}")
+    print(f"{'lost updates':<40}{total['increments'] - mileage_added:>12}")
+    print(f"{'double bookings':<40}{double_bookings:>12}")
+    return total['increments'] - mileage_added, double_bookings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--cars', type=int, default=200)
+    parser.add_argument('--hot-cars', type=int, default=3, help="cars whose mileage every process increments")
+    parser.add_argument('--lazy', action='store_true')
+    parser.add_argument('--blind', action='store_true', help="increment mileage without version checks")
+    args = parser.parse_args()
+    run(args.processes, args.seconds, args.cars, args.hot_cars, args.lazy, args.blind)
+
+
+if __name__ == '__main__':
+    main()
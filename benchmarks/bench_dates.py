@@ -0,0 +1,62 @@
+# benchmarks/bench_dates.py
+"""
+Booking date decoding on load and encoding on save: strptime/strftime (previous) versus the memoized helpers in
+src.utils.dates.
+
+Run from the repository root:
+    python -m benchmarks.bench_dates --bookings 5000000
+"""
+import argparse
+import datetime
+import random
+import time
+
+from src.utils.dates import cache_info, format_date, parse_date
+
+
+def generate_date_pairs(count, seed=42):
+    rng = random.Random(seed)
+    base = datetime.date(2015, 1, 1).toordinal()
+    pairs = []
+    for _ in range(count):
+        start = base + rng.randrange(3650)
+        pairs.append((datetime.date.fromordinal(start).isoformat(),
+                      datetime.date.fromordinal(start + rng.randint(1, 30)).isoformat()))
+    return pairs
+
+
+def timed(label, function, count):
+    started = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<40}{elapsed:>10.2f}s{count / elapsed:>16,.0f} rows/s")
+    return elapsed
+
+
+def run(bookings):
+    pairs = generate_date_pairs(bookings)
+    print(f"\n{bookings} bookings")
+    decoded = []
+    timed('load: strptime (previous)', lambda: decoded.extend(
+        (datetime.datetime.strptime(start, "%Y-%m-%d").date(), datetime.datetime.strptime(end, "%Y-%m-%d").date())
+        for start, end in pairs), bookings)
+    timed('load: parse_date (memoized)', lambda: [(parse_date(start), parse_date(end)) for start, end in pairs],
+          bookings)
+    timed('save: strftime (previous)', lambda: [(start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"))
+                                                for start, end in decoded], bookings)
+    timed('save: format_date (memoized)', lambda: [(format_date(start), format_date(end)) for start, end in decoded],
+          bookings)
+    for name, info in cache_info().items():
+        if info.hits or info.misses:
+            print(f"  {name}: {info.hits} hits, {info.misses} misses")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bookings', type=int, default=1_000_000)
+    args = parser.parse_args()
+    run(args.bookings)
+
+
+if __name__ == '__main__':
+    main()
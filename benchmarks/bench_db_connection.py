@@ -0,0 +1,85 @@
+# benchmarks/bench_db_connection.py
+"""
+Per-operation latency of DatabaseManager with a connection per call (the previous behaviour) versus the pooled
+long-lived connection with WAL pragmas.
+
+Run from the repository root:
+    python -m benchmarks.bench_db_connection --cars 1000 --repeat 500
+"""
+import argparse
+import sqlite3
+import uuid
+
+from benchmarks.common import measure, print_table, temp_db_path
+from src.database.database_manager import (DatabaseManager, SCHEMA_STATEMENTS, DATA_COLUMNS, CHANGE_STATEMENTS,
+                                           booking_row, car_row)
+from src.models.booking import Booking
+from src.models.car import Car
+import datetime
+
+# The legacy database has the initial schema, without row versions
+LEGACY_SELECT_USERS = f"SELECT {', '.join(DATA_COLUMNS['users'])} FROM users"
+LEGACY_SELECT_CARS = f"SELECT {', '.join(DATA_COLUMNS['cars'])} FROM cars"
+
+
+def make_cars(count):
+    return [Car(str(uuid.UUID(int=i)), 'Toyota', 'Corolla', 2015 + i % 10, 1000 * (i % 200), True, 1, 30)
+            for i in range(count)]
+
+
+def make_booking():
+    start = datetime.date(2030, 1, 1)
+    return Booking(str(uuid.uuid4()), 'alice', str(uuid.UUID(int=0)), start, start + datetime.timedelta(days=3))
+
+
+def legacy_call(db_path, work):
+    # Mirrors the old DatabaseManager: connect, create the schema and commit, do the work, commit and close
+    connection = sqlite3.connect(db_path)
+    cursor = connection.cursor()
+    for statement in SCHEMA_STATEMENTS:
+        cursor.execute(statement)
+    connection.commit()
+    result = work(cursor)
+    connection.commit()
+    connection.close()
+    return result
+
+
+def run(cars, repeat):
+    fleet = make_cars(cars)
+    results = []
+    with temp_db_path('legacy.db') as legacy_path, temp_db_path('pooled.db') as pooled_path:
+        legacy_call(legacy_path, lambda cursor: cursor.executemany(CHANGE_STATEMENTS['cars']['insert'],
+                                                                   [car_row(car) for car in fleet]))
+        manager = DatabaseManager(pooled_path)
+        manager.save_cars(fleet)
+
+        results.append(('legacy load_users', measure(
+            lambda: legacy_call(legacy_path, lambda cursor: cursor.execute(LEGACY_SELECT_USERS).fetchall()), repeat)))
+        results.append(('pooled load_users', measure(manager.load_users, repeat)))
+        results.append((f'legacy load_cars ({cars} rows)', measure(
+            lambda: legacy_call(legacy_path, lambda cursor: cursor.execute(LEGACY_SELECT_CARS).fetchall()), repeat)))
+        results.append((f'pooled load_cars ({cars} rows)', measure(manager.load_cars, repeat)))
+        results.append(('legacy insert one booking', measure(
+            lambda: legacy_call(legacy_path, lambda cursor: cursor.execute(CHANGE_STATEMENTS['bookings']['insert'],
+                                                                           booking_row(make_booking()))), repeat)))
+        results.append(('pooled insert one booking', measure(
+            lambda: manager.apply_changes({'users': {'insert': [], 'update': [], 'delete': []},
+                                           'cars': {'insert': [], 'update': [], 'delete': []},
+                                           'bookings': {'insert': [make_booking()], 'update': [], 'delete': []}}),
+            repeat)))
+        manager.close()
+    print_table(f"DatabaseManager per-operation latency ({repeat} calls each)", results)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cars', type=int, default=1000, help='number of cars in the table')
+    parser.add_argument('--repeat', type=int, default=500, help='calls per operation')
+    args = parser.parse_args()
+    run(args.cars, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
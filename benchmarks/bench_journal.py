@@ -0,0 +1,117 @@
+# benchmarks/bench_journal.py
+"""
+The event journal storage engine (src/database/journal_manager.py) against the SQLite database: write throughput
+of bookings and approvals through RentalService, and startup time (RentalService construction) on the same data.
+
+Startup is measured for SQLite, for the journal right after a snapshot, and for the journal with the --writes
+records of the write run still to replay. With --fsync every SQLite commit and journal record is forced to disk
+(synchronous=FULL against fsync=True); by default neither is, which survives a crash of the process but not a
+power loss.
+
+Run from the repository root:
+    python -m benchmarks.bench_journal --scale 100k --writes 5000
+"""
+import argparse
+import datetime
+import os
+import random
+import time
+
+from benchmarks.common import measure, print_table, temp_db_path
+from benchmarks.workload import PASSWORD, SCALES, WORKLOAD_START, Workload
+from src.database.database_manager import DatabaseManager
+from src.database.journal_manager import JournalManager
+from src.system.auth_service import AuthService
+from src.system.rental_service import RentalService, ServiceError
+
+
+def populate_journal(workload, journal_dir):
+    manager = JournalManager(journal_dir, compact_after=None)
+    manager.bulk_write('users', workload.user_rows(AuthService(workers=1).hash_password(PASSWORD)))
+    manager.bulk_write('cars', workload.car_rows())
+    manager.bulk_write('bookings', workload.booking_rows())
+    manager.compact()
+    manager.close()
+
+
+def write_calls(service, workload, writes, seed):
+    """
+    Zero-argument calls alternating a new booking with the approval of a pending one.
+    """
+    rng = random.Random(seed)
+    pending = [booking.booking_id for booking in service.find_bookings()]
+    rng.shuffle(pending)
+    customers = [service.users.get(workload.customer(i)) for i in range(min(workload.customers, 100))]
+
+    def book():
+        start = WORKLOAD_START + datetime.timedelta(days=rng.randrange(365))
+        end = start + datetime.timedelta(days=rng.randint(1, 7))
+        try:
+            service.book_car(rng.choice(customers), workload.car_id(rng.randrange(workload.cars)),
+                             start.isoformat(), end.isoformat())
+        except ServiceError:
+            pass  # Dates taken or outside the car's rent period
+
+    def approve():
+        try:
+            service.approve_booking(pending.pop())
+        except (ServiceError, IndexError):
+            pass  # Overlaps an approved booking
+
+    return [book if i % 2 == 0 else approve for i in range(writes)]
+
+
+def startup(make_manager, repeat):
+    seconds = []
+    for _ in range(repeat):
+        manager = make_manager()
+        started = time.perf_counter()
+        RentalService(manager, auth=AuthService(workers=1))
+        seconds.append(time.perf_counter() - started)
+        manager.close()
+    return min(seconds)
+
+
+def run(workload, writes, fsync, repeat):
+    pragmas = {'synchronous': 'FULL'} if fsync else None
+    with temp_db_path() as db_path:
+        journal_dir = os.path.join(os.path.dirname(db_path), 'journal')
+        workload.populate(db_path)
+        populate_journal(workload, journal_dir)
+        print(f"\n{workload.describe()}: database {os.path.getsize(db_path) / 2**20:.1f} MB, journal snapshot "
+              f"{os.path.getsize(os.path.join(journal_dir, 'snapshot.json')) / 2**20:.1f} MB")
+
+        startups = [('sqlite', startup(lambda: DatabaseManager(db_path, pragmas=pragmas), repeat)),
+                    ('journal, just compacted', startup(lambda: JournalManager(journal_dir), repeat))]
+
+        rows = []
+        for label, manager in (('sqlite', DatabaseManager(db_path, pragmas=pragmas)),
+                               ('journal', JournalManager(journal_dir, compact_after=None, fsync=fsync))):
+            service = RentalService(manager, auth=AuthService(workers=1))
+            calls = iter(write_calls(service, workload, writes, workload.seed))
+            rows.append((f"{label} book/approve", measure(lambda: next(calls)(), writes)))
+            manager.close()
+        print_table(f"{writes} writes through RentalService{', fsync' if fsync else ''}", rows)
+        journal_size = os.path.getsize(os.path.join(journal_dir, 'journal.log'))
+
+        startups.append((f"journal, {writes} records to replay", startup(lambda: JournalManager(journal_dir),
+                                                                         repeat)))
+        print(f"\nJournal after the writes: {journal_size / 2**10:.0f} KB, {journal_size / writes:.0f} bytes per record")
+        print(f"\n{'startup (best of ' + str(repeat) + ')':<40}{'seconds':>14}")
+        for label, seconds in startups:
+            print(f"{label:<40}{seconds:>14.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', default='100k', help=f"{', '.join(SCALES)} or a number of bookings")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--writes', type=int, default=5000)
+    parser.add_argument('--fsync', action='store_true', help="force every commit to disk")
+    parser.add_argument('--repeat', type=int, default=3, help="startups timed per engine")
+    args = parser.parse_args()
+    run(Workload(args.scale, args.seed), args.writes, args.fsync, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+# benchmarks/bench_lazy_loading.py
+"""
+Startup time and peak memory of CarRentalSystem with eager loading versus lazy mode, for growing databases.
+
+Run from the repository root:
+    python -m benchmarks.bench_lazy_loading --sizes 1000 10000 50000
+"""
+import argparse
+import datetime
+import time
+import tracemalloc
+
+from benchmarks.common import temp_db_path
+from src.database.database_manager import DatabaseManager, UPSERT_BOOKINGS, UPSERT_CARS
+from src.system.car_rental_system import CarRentalSystem
+
+
+def populate(db_path, bookings):
+    manager = DatabaseManager(db_path)
+    cars = max(1, bookings // 10)
+    start = datetime.date(2024, 1, 1)
+    with manager.connection() as connection, connection:
+        connection.executemany(UPSERT_CARS, ((f"car-{i}", 'Toyota', 'Corolla', 2015 + i % 10, i % 90_000, True, 1, 30)
+                                             for i in range(cars)))
+        connection.executemany(UPSERT_BOOKINGS, (
+            (f"booking-{i}", 'alice', f"car-{i % cars}", (start + datetime.timedelta(days=i % 300)).isoformat(),
+             (start + datetime.timedelta(days=i % 300 + 3)).isoformat(), 'Approved' if i % 2 else 'Pending')
+            for i in range(bookings)))
+    manager.close()
+
+
+def measure_startup(db_path, lazy):
+    # Timed and traced in separate runs because tracemalloc slows allocation-heavy code down several times
+    started = time.perf_counter()
+    system = CarRentalSystem(DatabaseManager(db_path), lazy=lazy)
+    elapsed = time.perf_counter() - started
+    system.db_manager.close()
+    del system
+    tracemalloc.start()
+    system = CarRentalSystem(DatabaseManager(db_path), lazy=lazy)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    system.db_manager.close()
+    return elapsed, peak
+
+
+def run(sizes):
+    print(f"{'bookings':>10}{'eager ms':>12}{'eager MB':>12}{'lazy ms':>12}{'lazy MB':>12}")
+    for size in sizes:
+        with temp_db_path() as db_path:
+            populate(db_path, size)
+            eager_seconds, eager_peak = measure_startup(db_path, lazy=False)
+            lazy_seconds, lazy_peak = measure_startup(db_path, lazy=True)
+        print(f"{size:>10}{eager_seconds * 1000:>12.1f}{eager_peak / 1e6:>12.1f}"
+              f"{lazy_seconds * 1000:>12.1f}{lazy_peak / 1e6:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10_000, 50_000])
+    args = parser.parse_args()
+    run(args.sizes)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+# benchmarks/bench_model_memory.py
+"""
+Bytes per booking (measured with tracemalloc) for the previous __dict__-based Booking and the __slots__ Booking.
+
+Run from the repository root:
+    python -m benchmarks.bench_model_memory --bookings 200000
+"""
+import argparse
+import datetime
+import gc
+import random
+import tracemalloc
+import uuid
+
+from src.models.booking import Booking
+
+
+class DictBooking:
+    # The Booking class as it was before __slots__: one __dict__ per instance
+    def __init__(self, booking_id, customer_username, car_id, start_date, end_date, status="Pending"):
+        self.booking_id = booking_id
+        self.customer_username = customer_username
+        self.car_id = car_id
+        self.start_date = start_date
+        self.end_date = end_date
+        self.status = status
+
+
+def generate_rows(count, seed=42):
+    # Rows as they come out of the bookings table: UUID strings and ISO date text
+    rng = random.Random(seed)
+    customers = [f"customer{i}" for i in range(max(1, count // 50))]
+    cars = [str(uuid.UUID(int=rng.getrandbits(128), version=4)) for _ in range(max(1, count // 20))]
+    base = datetime.date(2020, 1, 1).toordinal()
+    for _ in range(count):
+        start = base + rng.randrange(2000)
+        yield (str(uuid.UUID(int=rng.getrandbits(128), version=4)), rng.choice(customers), rng.choice(cars),
+               datetime.date.fromordinal(start).isoformat(),
+               datetime.date.fromordinal(start + rng.randint(1, 14)).isoformat(),
+               rng.choice(("Pending", "Approved", "Rejected")), 0)
+
+
+def build_objects(cls, rows):
+    # Fresh strings and date objects per row, as a loader decoding database rows produces them
+    return [cls(''.join(booking_id), ''.join(customer), ''.join(car_id), datetime.date.fromisoformat(start),
+                datetime.date.fromisoformat(end), ''.join(status))
+            for booking_id, customer, car_id, start, end, status, _ in rows]
+
+
+def traced(build, rows):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build(rows)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def run(bookings):
+    rows = list(generate_rows(bookings))
+    results = []
+    for label, build in (('dict Booking (previous)', lambda r: build_objects(DictBooking, r)),
+                         ('__slots__ Booking', lambda r: build_objects(Booking, r))):
+        result, used = traced(build, rows)
+        results.append((label, used / bookings))
+        del result
+    print(f"\nMemory per booking ({bookings} bookings)")
+    for label, per_booking in results:
+        print(f"{label:<30}{per_booking:>10.1f} bytes")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bookings', type=int, default=200_000)
+    args = parser.parse_args()
+    run(args.bookings)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+# benchmarks/bench_pricing.py
+"""
+Quotes per second: pricing cars one call at a time through calculate_rental_fee, against the batch quotes of the
+pricing engine (src/system/pricing.py) - many cars for one period, and one car for many periods.
+
+The rate table has per-make rates, summer and weekend multipliers and long-rental discounts. "day-by-day loop" prices
+each day separately, as a straightforward implementation of those rules would. NumPy rows appear when it is installed.
+
+Run from the repository root:
+    python -m benchmarks.bench_pricing --cars 10000 --periods 10000
+"""
+import argparse
+import datetime
+import random
+import time
+
+from benchmarks.common import temp_db_path
+from src.database.database_manager import DatabaseManager
+from src.system.pricing import PricingEngine, RateTable, load_numpy
+from src.system.rental_service import RentalService
+
+RATES = {'default_rate': 50, 'makes': {'BMW': 85, 'Toyota': 45}, 'months': {'7': 1.25, '8': 1.25, '12': 1.1},
+         'weekend': 1.15, 'long_rental': [[7, 0.9], [28, 0.8]]}
+MAKES = ('Toyota', 'Honda', 'BMW', 'Ford')
+
+
+def populate(db_path, cars):
+    manager = DatabaseManager(db_path)
+    manager.bulk_write('cars', ((f"car-{i}", MAKES[i % len(MAKES)], 'Model', 2015, 1000, True, 1, 30)
+                                for i in range(cars)))
+    manager.close()
+
+
+def day_by_day(rates, car, start_date, end_date):
+    total = 0.0
+    day = start_date
+    while day < end_date:
+        total += rates.daily_rate(car) * rates.day_factor(day.toordinal())
+        day += datetime.timedelta(days=1)
+    return round(total * rates.discount((end_date - start_date).days), 2)
+
+
+def rate(label, quotes, operation, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        operation()
+        best = min(best, time.perf_counter() - started)
+    print(f"{label:<52}{quotes / best:>16,.0f}")
+
+
+def run(cars, periods, repeat):
+    rng = random.Random(0)
+    first_day = datetime.date.today() + datetime.timedelta(days=1)
+    start = first_day + datetime.timedelta(days=30)
+    end = start + datetime.timedelta(days=9)
+    start_str, end_str = start.isoformat(), end.isoformat()
+    ranges = []
+    for _ in range(periods):
+        period_start = first_day + datetime.timedelta(days=rng.randrange(365))
+        ranges.append((period_start, period_start + datetime.timedelta(days=rng.randint(1, 30))))
+    range_strs = [(a.isoformat(), b.isoformat()) for a, b in ranges]
+
+    rates = RateTable.from_dict(RATES)
+    with temp_db_path() as db_path:
+        populate(db_path, cars)
+        service = RentalService(DatabaseManager(db_path), pricing=PricingEngine(rates, vectorize=False))
+        car_ids = [f"car-{i}" for i in range(cars)]
+        car_list = [service.cars.get(car_id) for car_id in car_ids]
+        car = car_list[0]
+        engines = [('python', PricingEngine(rates, vectorize=False))]
+        if load_numpy():
+            engines.append(('numpy', PricingEngine(rates)))
+
+        print(f"\n{cars} cars for one 9-day period (quotes per second)")
+        rate("calculate_rental_fee per car (per-call loop)", cars,
+             lambda: [service.calculate_rental_fee(car_id, start_str, end_str) for car_id in car_ids], repeat)
+        rate("day-by-day loop", cars, lambda: [day_by_day(rates, c, start, end) for c in car_list], repeat)
+        rate("engine.quote per car", cars, lambda: [engines[0][1].quote(c, start, end) for c in car_list], repeat)
+        for name, engine in engines:
+            rate(f"engine.quote_cars batch ({name})", cars, lambda: engine.quote_cars(car_list, start, end), repeat)
+        rate("service.quote_cars (lookups, checks, batch)", cars,
+             lambda: service.quote_cars(car_ids, start_str, end_str), repeat)
+
+        print(f"\n1 car for {periods} periods of 1-30 days (quotes per second)")
+        rate("calculate_rental_fee per period (per-call loop)", periods,
+             lambda: [service.calculate_rental_fee(car.car_id, a, b) for a, b in range_strs], repeat)
+        rate("day-by-day loop", periods, lambda: [day_by_day(rates, car, a, b) for a, b in ranges], repeat)
+        for name, engine in engines:
+            rate(f"engine.quote_periods batch ({name})", periods, lambda: engine.quote_periods(car, ranges), repeat)
+        rate("service.quote_periods (parsing, checks, batch)", periods,
+             lambda: service.quote_periods(car.car_id, range_strs), repeat)
+        if not load_numpy():
+            print("\nNumPy is not installed; batch quotes ran on the plain Python path.")
+        service.db_manager.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cars', type=int, default=10_000)
+    parser.add_argument('--periods', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=5, help="runs per measurement; the fastest is reported")
+    args = parser.parse_args()
+    run(args.cars, args.periods, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+# benchmarks/bench_query_cache.py
+"""
+Read-heavy traffic with and without the query result cache (src/system/query_cache.py).
+
+Customers mostly ask about the same few weeks: periods are drawn from a small set of popular start dates (with
+Zipf-like weights) and 3-7 day lengths, recommendations use a handful of year and mileage filters, and fees are asked
+for a hundred popular cars. One request in --write-every updates a car or approves a booking, which invalidates
+cached results the way an administrator working alongside the customers would.
+
+Run from the repository root:
+    python -m benchmarks.bench_query_cache --db /tmp/rental_10k.db --requests 5000
+"""
+import argparse
+import datetime
+import random
+import shutil
+
+from benchmarks.common import measure, print_table, temp_db_path
+from benchmarks.workload import SCALES, WORKLOAD_START, Workload
+from src.database.database_manager import DatabaseManager
+from src.system.query_cache import QueryCache
+from src.system.rental_service import RentalService, ServiceError
+
+POPULAR_STARTS = 20  # Distinct start dates customers ask about
+POPULAR_CARS = 100  # Cars whose fees customers ask about
+YEARS = (None, 2015, 2018, 2020)
+MILEAGES = (None, 50_000, 100_000)
+
+
+def traffic(service, workload, requests, write_every, seed):
+    """
+    A list of zero-argument requests; the same seed gives the same requests.
+    """
+    rng = random.Random(seed)
+    starts = [WORKLOAD_START + datetime.timedelta(days=rng.randrange(365)) for _ in range(POPULAR_STARTS)]
+    weights = [1 / (rank + 1) for rank in range(POPULAR_STARTS)]
+    popular_cars = [workload.car_id(i) for i in rng.sample(range(workload.cars), min(POPULAR_CARS, workload.cars))]
+    car_weights = [1 / (rank + 1) for rank in range(len(popular_cars))]
+    pending = [booking.booking_id for booking in service.list_bookings("Pending")]
+    rng.shuffle(pending)
+
+    def period():
+        start = rng.choices(starts, weights)[0]
+        return start.isoformat(), (start + datetime.timedelta(days=rng.randint(3, 7))).isoformat()
+
+    def approve(booking_id):
+        try:
+            service.approve_booking(booking_id)
+        except ServiceError:
+            pass  # Overlaps an approved booking
+
+    def fee(car_id, start, end):
+        try:
+            service.calculate_rental_fee(car_id, start, end)
+        except ServiceError:
+            pass  # Outside the car's rent period
+
+    calls = []
+    for i in range(1, requests + 1):
+        if write_every and i % write_every == 0:
+            if i // write_every % 2 and pending:
+                calls.append(lambda booking_id=pending.pop(): approve(booking_id))
+            else:
+                car_id = workload.car_id(rng.randrange(workload.cars))
+                calls.append(lambda car_id=car_id, mileage=rng.randrange(200_000):
+                             service.update_car(car_id, mileage=mileage))
+            continue
+        start, end = period()
+        kind = rng.random()
+        if kind < 0.4:
+            calls.append(lambda start=start, end=end: service.available_cars(start, end))
+        elif kind < 0.7:
+            year, mileage = rng.choice(YEARS), rng.choice(MILEAGES)
+            order_by = rng.choice(('mileage', 'price'))
+            calls.append(lambda year=year, mileage=mileage, start=start, end=end, order_by=order_by:
+                         service.recommend_cars(year, mileage, start, end, limit=10, order_by=order_by))
+        else:
+            car_id = rng.choices(popular_cars, car_weights)[0]
+            calls.append(lambda car_id=car_id, start=start, end=end: fee(car_id, start, end))
+    return calls
+
+
+def run(workload, source_db, requests, write_every, lazy, query_mode):
+    rows = []
+    with temp_db_path() as db_path:
+        for label, cache_size in (('no cache', 0), ('query cache', 1024)):
+            shutil.copyfile(source_db, db_path)
+            service = RentalService(DatabaseManager(db_path), lazy=lazy, query_mode=query_mode,
+                                    query_cache=QueryCache(cache_size))
+            calls = iter(traffic(service, workload, requests, write_every, workload.seed))
+            result = measure(lambda: next(calls)(), requests)
+            stats = service.query_cache.stats()
+            rows.append((f"{label} (hit rate {stats['hit_rate'] or 0:.0%})", result))
+            service.db_manager.close()
+    print_table(f"{requests} requests on {workload.describe()}, one write in {write_every}, "
+                f"{'lazy' if lazy else 'eager'}, query mode {query_mode}", rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', default='10k', help=f"{', '.join(SCALES)} or a number of bookings")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--db', help="database generated by benchmarks.workload for the same scale and seed")
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--write-every', type=int, default=500, help="one write per this many requests (0: none)")
+    parser.add_argument('--lazy', action='store_true')
+    parser.add_argument('--query-mode', choices=('memory', 'sql'), default='memory')
+    args = parser.parse_args()
+    workload = Workload(args.scale, args.seed)
+    if args.db:
+        run(workload, args.db, args.requests, args.write_every, args.lazy, args.query_mode)
+        return
+    with temp_db_path('source.db') as source_db:
+        workload.populate(source_db)
+        run(workload, source_db, args.requests, args.write_every, args.lazy, args.query_mode)
+
+
+if __name__ == '__main__':
+    main()
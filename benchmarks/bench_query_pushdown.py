@@ -0,0 +1,113 @@
+# benchmarks/bench_query_pushdown.py
+"""
+Search latency of the in-memory query path versus SQL pushdown, on large databases, with and without the
+secondary indexes added by migration 2.
+
+Paths compared for each search (available cars, top-10 recommendation, pending bookings):
+  memory (loaded)  objects already in memory, filtered in Python (eager mode after startup)
+  memory (scan)    rows streamed from the database and filtered in Python (lazy mode, query_mode='memory')
+  sql, no index    filters pushed into SQL with the secondary indexes dropped
+  sql, indexed     filters pushed into SQL with the secondary indexes
+
+Run from the repository root:
+    python -m benchmarks.bench_query_pushdown --cars 50000 --bookings 500000
+"""
+import argparse
+import datetime
+import io
+import random
+import time
+from contextlib import redirect_stdout
+
+from benchmarks.common import measure, print_table, temp_db_path
+from src.database.database_manager import DatabaseManager
+from src.system.car_rental_system import CarRentalSystem
+
+BASE_DAY = datetime.date(2024, 1, 1)
+
+
+def populate(db_path, cars, bookings, indexed, seed=42):
+    rng = random.Random(seed)
+    manager = DatabaseManager(db_path)
+    manager.bulk_write('users', [('customer', 'secret', 'customer')])
+    manager.bulk_write('cars', ((f"car-{i}", 'Toyota', 'Corolla', rng.randint(2010, 2024), rng.randint(0, 200_000),
+                                 rng.random() < 0.95, rng.randint(1, 3), rng.randint(7, 30)) for i in range(cars)))
+
+    def rows():
+        for i in range(bookings):
+            # Each car's bookings follow each other every 12 days, so approved ones never overlap
+            start = BASE_DAY + datetime.timedelta(days=(i // cars) * 12 + rng.randint(0, 4))
+            yield (f"booking-{i}", 'customer', f"car-{i % cars}", start.isoformat(),
+                   (start + datetime.timedelta(days=7)).isoformat(), rng.choice(['Approved', 'Pending', 'Rejected']))
+
+    manager.bulk_write('bookings', rows())
+    with manager.connection() as connection:
+        if not indexed:
+            # The schema version stays current, so the migration does not bring the indexes back
+            names = [row[0] for row in connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%'")]
+            for name in names:
+                connection.execute(f"DROP INDEX {name}")
+        connection.execute('ANALYZE')
+    manager.close()
+
+
+def searches(system, start, end, quiet):
+    start_text, end_text = start.isoformat(), end.isoformat()
+
+    def available():
+        with redirect_stdout(quiet):
+            system.view_available_cars(start_text, end_text)
+        quiet.seek(0)
+        quiet.truncate()
+
+    def recommend():
+        return system.recommend_cars(2020, 50_000, start_text, end_text, limit=10)
+
+    if system.query_mode == 'sql':
+        def pending():
+            return sum(1 for _ in system.db_manager.stream('bookings', 'status', "Pending"))
+    else:
+        def pending():
+            return sum(1 for _ in system.bookings.by_status("Pending"))
+
+    return [('available cars', available), ('recommend top 10', recommend), ('pending bookings', pending)]
+
+
+def run(cars, bookings, repeat):
+    day = bookings // cars * 12 // 2  # Middle of the booked period
+    start = BASE_DAY + datetime.timedelta(days=day)
+    end = start + datetime.timedelta(days=5)
+    quiet = io.StringIO()
+    results = []
+    with temp_db_path('plain.db') as plain_path, temp_db_path('indexed.db') as indexed_path:
+        populate(plain_path, cars, bookings, indexed=False)
+        populate(indexed_path, cars, bookings, indexed=True)
+
+        started = time.perf_counter()
+        eager = CarRentalSystem(DatabaseManager(indexed_path))
+        print(f"\neager startup (memory path only): {time.perf_counter() - started:.2f}s")
+        lazy = CarRentalSystem(DatabaseManager(indexed_path), lazy=True)
+        plain = CarRentalSystem(DatabaseManager(plain_path), lazy=True, query_mode='sql')
+        indexed = CarRentalSystem(DatabaseManager(indexed_path), lazy=True, query_mode='sql')
+
+        for label, system, times in (('memory (loaded)', eager, repeat), ('memory (scan)', lazy, max(1, repeat // 10)),
+                                     ('sql, no index', plain, max(1, repeat // 10)), ('sql, indexed', indexed, repeat)):
+            for name, search in searches(system, start, end, quiet):
+                results.append((f"{name}: {label}", measure(search, times)))
+        for system in (eager, lazy, plain, indexed):
+            system.db_manager.close()
+    print_table(f"{cars} cars, {bookings} bookings", results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cars', type=int, default=50_000)
+    parser.add_argument('--bookings', type=int, default=500_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    run(args.cars, args.bookings, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+# benchmarks/bench_recommendation.py
+"""
+RecommendationIndex top-k queries against the previous full filter over every car.
+
+Run from the repository root:
+    python -m benchmarks.bench_recommendation --cars 1000000
+"""
+import argparse
+import random
+import time
+
+from benchmarks.common import measure, print_table
+from src.models.car import Car
+from src.system.availability import AvailabilityIndex
+from src.system.recommendation import RecommendationIndex
+
+
+def generate_cars(count, seed=42):
+    rng = random.Random(seed)
+    for i in range(count):
+        min_period = rng.choice((1, 1, 2, 3, 7))
+        yield Car(f"car-{i}", rng.choice(('Toyota', 'Mazda', 'Ford', 'VW')), 'Model', rng.randint(2005, 2024),
+                  rng.randint(0, 300_000), rng.random() > 0.05, min_period, min_period + rng.choice((7, 14, 30, 60)))
+
+
+def run(cars, repeat, page_size):
+    fleet = list(generate_cars(cars))
+    availability = AvailabilityIndex()
+    index = RecommendationIndex()
+    started = time.perf_counter()
+    index.load(fleet)
+    print(f"Indexed {len(index)} in-service cars out of {cars} in {time.perf_counter() - started:.2f}s")
+
+    rng = random.Random(7)
+    start_day = 800_000
+
+    def query():
+        year = rng.choice((None, rng.randint(2005, 2024)))
+        mileage = rng.choice((None, 50_000, 150_000))
+        return year, mileage, rng.randint(1, 20)
+
+    def indexed():
+        year, mileage, days = query()
+        return index.query(year, mileage, days, limit=page_size,
+                           accept=lambda car_id: availability.is_free(car_id, start_day, start_day + days))
+
+    def full_filter():
+        # The previous recommend_cars: int() conversions and every check for every car, unordered full list
+        year, mileage, days = query()
+        return [car for car in fleet
+                if car.available and (year is None or car.year == int(year)) and
+                (mileage is None or car.mileage <= int(mileage)) and
+                car.min_rent_period <= days <= car.max_rent_period and
+                availability.is_free(car.car_id, start_day, start_day + days)]
+
+    results = [
+        (f'index top-{page_size}', measure(indexed, repeat)),
+        ('full filter', measure(full_filter, max(1, repeat // 500))),
+    ]
+    print_table(f"recommend_cars over {cars} cars", results)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cars', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=2000, help='indexed queries to time')
+    parser.add_argument('--page-size', type=int, default=10)
+    args = parser.parse_args()
+    run(args.cars, args.repeat, args.page_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+# benchmarks/bench_reporting.py
+"""
+Fleet utilization and revenue reports read from incrementally maintained totals, against recomputing them by
+scanning every approved booking.
+
+A generated workload is backfilled into the totals (timed), then --operations random approvals, rejections of
+approved bookings and bulk reviews run through RentalService. Afterwards the totals are recomputed from scratch and
+compared with the incremental ones, and a sample of reports is checked against the scan. Finally fleet, make and car
+reports for single months are timed both ways.
+
+Run from the repository root:
+    python -m benchmarks.bench_reporting --scale 100k --operations 2000
+"""
+import argparse
+import datetime
+import random
+import time
+
+from benchmarks.common import measure, print_table, temp_db_path
+from benchmarks.workload import SCALES, WORKLOAD_DAYS, WORKLOAD_START, Workload
+from src.database.database_manager import DatabaseManager
+from src.system.rental_service import RentalService, ServiceError
+from src.utils.dates import month_days
+
+MONTHS = [month for month, _ in month_days(WORKLOAD_START, WORKLOAD_START + datetime.timedelta(days=WORKLOAD_DAYS))]
+
+
+def scan_report(service, group, key, month):
+    """
+    Bookings, booked days and revenue in cents of a group in a month, summed over every approved booking.
+    """
+    bookings = booked_days = revenue = 0
+    for row in service.db_manager.stream_bookings("Approved"):
+        booking = service.bookings.adopt(row)
+        car = service.cars.get(booking.car_id)
+        if group == 'car' and booking.car_id != key or group == 'make' and (car.make if car else '') != key:
+            continue
+        for i, (booking_month, days) in enumerate(month_days(booking.start_date, booking.end_date)):
+            if booking_month == month:
+                booked_days += days
+                if i == 0:
+                    bookings += 1
+                    revenue += round(service.pricing.quote(car, booking.start_date, booking.end_date) * 100)
+    return bookings, booked_days, revenue
+
+
+def random_operations(service, operations, rng):
+    """
+    Approve, reject and bulk-review bookings at random through the service.
+
+    Returns:
+        Dictionary operation -> number of calls.
+    """
+    pending = [booking.booking_id for booking in service.find_bookings()]
+    approved = [booking.booking_id for booking in service.list_bookings("Approved")]
+    rng.shuffle(pending)
+    rng.shuffle(approved)
+    calls = {'approve_booking': 0, 'reject_booking': 0, 'review_bookings': 0}
+    for _ in range(operations):
+        kind = rng.random()
+        if kind < 0.5 and pending:
+            booking_id = pending.pop()
+            try:
+                service.approve_booking(booking_id)
+                approved.append(booking_id)
+            except ServiceError:
+                service.reject_booking(booking_id)  # Overlaps an approved booking
+            calls['approve_booking'] += 1
+        elif kind < 0.8 and approved:
+            service.reject_booking(approved.pop(rng.randrange(len(approved))))
+            calls['reject_booking'] += 1
+        elif pending:
+            batch, pending = pending[-50:], pending[:-50]
+            service.review_bookings(batch, rng.choice(('approve', 'reject')), batch_size=20)
+            calls['review_bookings'] += 1
+    return calls
+
+
+def run(workload, operations, lazy, seed):
+    rng = random.Random(seed)
+    with temp_db_path() as db_path:
+        workload.populate(db_path)
+        service = RentalService(DatabaseManager(db_path), lazy=lazy)
+        started = time.perf_counter()
+        service.report()  # The first report backfills the totals
+        print(f"\nBackfilled the totals of {workload.describe()} in {time.perf_counter() - started:.2f} s")
+
+        started = time.perf_counter()
+        calls = random_operations(service, operations, rng)
+        print(f"{', '.join(f'{count} {name}' for name, count in calls.items())} in "
+              f"{time.perf_counter() - started:.2f} s")
+
+        started = time.perf_counter()
+        check = service.db_manager.check_booking_totals()
+        print(f"Full recompute in {time.perf_counter() - started:.2f} s: {check['uncounted']} approved bookings "
+              f"uncounted, {check['stale']} counted but no longer approved, {len(check['mismatched'])} totals differ")
+
+        makes = sorted(service.db_manager.count_by('cars', 'make'))
+        samples = [('fleet', '', month) for month in MONTHS[:3]] + [('make', rng.choice(makes), rng.choice(MONTHS))
+                                                                    for _ in range(3)]
+        samples += [('car', workload.car_id(rng.randrange(workload.cars)), rng.choice(MONTHS)) for _ in range(3)]
+        wrong = 0
+        for group, key, month in samples:
+            report = service.report(group, key, month)
+            totals = (report['bookings'], report['booked_days'], round(report['revenue'] * 100))
+            wrong += totals != scan_report(service, group, key, month)
+        print(f"{len(samples) - wrong} of {len(samples)} sampled reports match a scan of the approved bookings")
+
+        rows = []
+        for group, key in (('fleet', ''), ('make', makes[0]), ('car', workload.car_id(0))):
+            rows.append((f"report {group} (totals)",
+                         measure(lambda: service.report(group, key, rng.choice(MONTHS)), 1000)))
+            rows.append((f"report {group} (scan)",
+                         measure(lambda: scan_report(service, group, key, rng.choice(MONTHS)), 3)))
+        print_table(f"Single-month reports, {'lazy' if lazy else 'eager'}", rows)
+        service.db_manager.close()
+        if wrong or check['uncounted'] or check['stale'] or check['mismatched']:
+            raise SystemExit("The incremental totals do not match a full recompute.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', default='100k', help=f"{', '.join(SCALES)} or a number of bookings")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--operations', type=int, default=2000, help="random approvals, rejections and reviews")
+    parser.add_argument('--lazy', action='store_true')
+    args = parser.parse_args()
+    run(Workload(args.scale, args.seed), args.operations, args.lazy, args.seed)
+
+
+if __name__ == '__main__':
+    main()
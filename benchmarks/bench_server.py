@@ -0,0 +1,169 @@
+# benchmarks/bench_server.py
+"""
+Load generator for the network service in src/system/rental_server.py: many concurrent client connections log in
+and then send a mix of reads (recommendations, fee quotes, car listings) and writes (bookings). Reports aggregate
+throughput and p50/p99 latency per operation.
+
+The server runs in its own process on a temporary database, so client and server do not share an event loop.
+
+Run from the repository root:
+    python -m benchmarks.bench_server --clients 200 --requests 50 --write-ratio 0.2
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+from benchmarks.common import print_table, summarize, temp_db_path
+from src.database.database_manager import DatabaseManager
+from src.system.auth_service import AuthService
+
+PASSWORD = 'password'
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def populate(db_path, clients, cars):
+    # One hash shared by every user: the benchmark measures the server, not how long setup takes to hash
+    password_hash = AuthService(workers=1).hash_password(PASSWORD)
+    manager = DatabaseManager(db_path)
+    manager.bulk_write('users', ((f"user-{i}", password_hash, 'customer') for i in range(clients)))
+    manager.bulk_write('cars', ((f"car-{i}", 'Toyota', 'Corolla', 2010 + i % 15, (i * 7919) % 200_000, True, 1, 30)
+                                for i in range(cars)))
+    manager.close()
+
+
+def start_server(db_path, flags):
+    """
+    Start the server on a free port.
+
+    Returns:
+        Tuple (process, port).
+    """
+    process = subprocess.Popen([sys.executable, '-m', 'src.system.rental_server', '--db', db_path, '--port', '0']
+                               + flags, cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if not line.startswith('Listening on '):
+        process.kill()
+        raise RuntimeError("The server did not start.")
+    return process, int(line.rsplit(':', 1)[1])
+
+
+def random_period(rng):
+    start = datetime.date.today() + datetime.timedelta(days=rng.randrange(1, 366))
+    return start.isoformat(), (start + datetime.timedelta(days=rng.randint(1, 10))).isoformat()
+
+
+def next_request(rng, cars, write_ratio):
+    """
+    Pick the next operation of the workload mix.
+
+    Returns:
+        Tuple (op, args).
+    """
+    start_date, end_date = random_period(rng)
+    if rng.random() < write_ratio:
+        return 'book_car', {'car_id': f"car-{rng.randrange(cars)}", 'start_date': start_date, 'end_date': end_date}
+    choice = rng.random()
+    if choice < 0.5:
+        return 'recommend_cars', {'year': rng.randint(2010, 2020), 'mileage': rng.randrange(20_000, 200_000),
+                                  'start_date': start_date, 'end_date': end_date, 'limit': 10}
+    if choice < 0.85:
+        return 'calculate_fee', {'car_id': f"car-{rng.randrange(cars)}", 'start_date': start_date,
+                                 'end_date': end_date}
+    return 'list_cars', {'limit': 20, 'offset': rng.randrange(max(1, cars - 20))}
+
+
+async def call(reader, writer, request_id, op, args):
+    writer.write(json.dumps({'id': request_id, 'op': op, 'args': args}).encode() + b"\n")
+    await writer.drain()
+    response = json.loads(await reader.readline())
+    if not response['ok'] and response['error']['code'] != 'conflict':  # A car already booked is expected
+        raise RuntimeError(f"{op} failed: {response['error']}")
+    return response
+
+
+async def connect(index, port, latencies):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port, limit=1 << 20)
+    started = time.perf_counter()
+    response = await call(reader, writer, 0, 'login', {'username': f"user-{index}", 'password': PASSWORD})
+    if not response['ok']:
+        raise RuntimeError(f"login failed: {response['error']}")
+    latencies['login'].append(time.perf_counter() - started)
+    return reader, writer
+
+
+async def client(index, reader, writer, requests, cars, write_ratio, latencies):
+    rng = random.Random(index)
+    try:
+        for request_id in range(1, requests + 1):
+            op, args = next_request(rng, cars, write_ratio)
+            started = time.perf_counter()
+            await call(reader, writer, request_id, op, args)
+            latencies[op].append(time.perf_counter() - started)
+    finally:
+        writer.close()
+
+
+async def load(port, clients, requests, cars, write_ratio):
+    """
+    Log every client in, then run the request mix on all connections at once.
+
+    Returns:
+        Tuple (latencies by op, login phase seconds, request phase seconds).
+    """
+    latencies = {op: [] for op in ('login', 'recommend_cars', 'calculate_fee', 'list_cars', 'book_car')}
+    started = time.perf_counter()
+    connections = await asyncio.gather(*(connect(i, port, latencies) for i in range(clients)))
+    logged_in = time.perf_counter()
+    await asyncio.gather(*(client(i, reader, writer, requests, cars, write_ratio, latencies)
+                           for i, (reader, writer) in enumerate(connections)))
+    return latencies, logged_in - started, time.perf_counter() - logged_in
+
+
+def run(clients, requests, cars, write_ratio, flags):
+    with temp_db_path() as db_path:
+        populate(db_path, clients, cars)
+        process, port = start_server(db_path, flags)
+        try:
+            latencies, login_elapsed, elapsed = asyncio.run(load(port, clients, requests, cars, write_ratio))
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+    rows = []
+    for op, samples in latencies.items():
+        summary = summarize(samples)
+        summary['ops_per_sec'] = round(len(samples) / (login_elapsed if op == 'login' else elapsed), 1)
+        rows.append((f"{op} ({len(samples)})", summary))
+    requests_made = [sample for op, samples in latencies.items() if op != 'login' for sample in samples]
+    overall = summarize(requests_made)
+    overall['ops_per_sec'] = round(len(requests_made) / elapsed, 1)
+    rows.append(('all requests', overall))
+    print_table(f"{clients} clients x {requests} requests, {cars} cars, {write_ratio:.0%} writes, "
+                f"server flags {' '.join(flags)}; logins {login_elapsed:.2f} s, requests {elapsed:.2f} s "
+                f"(ops_per_sec is aggregate over its phase)", rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=50, help="requests per client after logging in")
+    parser.add_argument('--cars', type=int, default=5_000)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    parser.add_argument('--lazy', action='store_true', help="run the server with --lazy")
+    parser.add_argument('--query-mode', choices=('memory', 'sql'), default='memory')
+    parser.add_argument('--read-workers', type=int, default=8)
+    args = parser.parse_args()
+    flags = ['--query-mode', args.query_mode, '--read-workers', str(args.read_workers)]
+    if args.lazy:
+        flags.append('--lazy')
+    run(args.clients, args.requests, args.cars, args.write_ratio, flags)
+
+
+if __name__ == '__main__':
+    main()
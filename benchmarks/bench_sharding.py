@@ -0,0 +1,104 @@
+# benchmarks/bench_sharding.py
+"""
+Fan-out searches over a sharded fleet (src/database/sharded_manager.py) with 1 to N worker processes, against the
+same data in one database file.
+
+A generated workload is written once to a single database and once across --shards shard files. Then the searches
+query mode 'sql' sends to the database - recommend_cars (first page of 10), available cars and the pending bookings
+of a date range - are timed on the single database, on the shards searched one after another in this process
+(0 workers), and on the shards searched in parallel by 1, 2, 4 ... --max-workers processes. The results of every
+configuration are checked against the single database.
+
+Searches only get faster with more workers as long as there are cores to run them; compare with the CPU count
+printed first. Starting the worker processes is not timed.
+
+Run from the repository root:
+    python -m benchmarks.bench_sharding --scale 1m --shards 8 --max-workers 8
+"""
+import argparse
+import datetime
+import os
+import random
+
+from benchmarks.common import measure, print_table, temp_db_path
+from benchmarks.workload import SCALES, WORKLOAD_DAYS, WORKLOAD_START, Workload
+from src.database.database_manager import DatabaseManager
+from src.database.sharded_manager import ShardedDatabaseManager, shard_paths
+
+
+def searches(rng):
+    """
+    Search name -> function(manager) running it on a random rental period.
+    """
+    def period(days):
+        start = WORKLOAD_START + datetime.timedelta(days=rng.randrange(WORKLOAD_DAYS - days))
+        return start, start + datetime.timedelta(days=days)
+
+    return {
+        'recommend_cars': lambda manager: manager.recommend_cars(*period(3), max_mileage=100_000, limit=10),
+        'available cars': lambda manager: list(manager.stream_available_cars(*period(3))),
+        'pending bookings': lambda manager: list(manager.stream_bookings('Pending', *period(30))),
+    }
+
+
+def worker_counts(max_workers):
+    counts, workers = [], 1
+    while workers < max_workers:
+        counts.append(workers)
+        workers *= 2
+    return counts + [max_workers]
+
+
+def check(manager, single, seed):
+    # The same searches on the same periods must give the same rows
+    for (name, search), reference in zip(searches(random.Random(seed)).items(),
+                                         searches(random.Random(seed)).values()):
+        expected = reference(single)
+        found = search(manager)
+        if name == 'available cars':
+            expected, found = sorted(expected), sorted(found)
+        if found != expected:
+            raise SystemExit(f"{name} differs between the shards and the single database.")
+
+
+def run(workload, shards, max_workers, repeat, seed):
+    with temp_db_path() as db_path:
+        workload.populate(db_path)
+        single = DatabaseManager(db_path)
+        sharded = ShardedDatabaseManager(shard_paths(os.path.join(os.path.dirname(db_path), 'shards'), shards),
+                                         workers=0)
+        for table in ('users', 'cars', 'bookings'):
+            sharded.bulk_write(table, (row[:-1] for row in single.stream(table)))
+        for shard in sharded.shards:
+            with shard.connection() as connection:
+                connection.execute('ANALYZE')
+        sharded.close()
+        print(f"\n{workload.describe()} in {shards} shards, {os.cpu_count()} CPUs")
+
+        configurations = [('single database', single), ('0 workers (in-process)', sharded)]
+        configurations += [(f"{workers} worker{'s' if workers > 1 else ''}",
+                            ShardedDatabaseManager(sharded.paths, workers=workers))
+                           for workers in worker_counts(max_workers)]
+        rows = {name: [] for name in searches(random.Random(seed))}
+        for label, manager in configurations:
+            check(manager, single, seed)  # Also starts the worker processes
+            for name, search in searches(random.Random(seed)).items():
+                rows[name].append((f"{name}, {label}", measure(lambda: search(manager), repeat)))
+            manager.close()
+        for name, table in rows.items():
+            print_table(name, table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', default='100k', help=f"{', '.join(SCALES)} or a number of bookings")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--shards', type=int, default=max(4, os.cpu_count() or 1))
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--repeat', type=int, default=50, help="calls timed per search and configuration")
+    args = parser.parse_args()
+    run(Workload(args.scale, args.seed), args.shards, args.max_workers, args.repeat, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+# benchmarks/bench_startup.py
+"""
+Cold-start regression guard for `python -m src.main`: the -X importtime breakdown of the modules it imports, and
+the wall-clock time from process start to the first menu prompt in eager, lazy and fast-start mode.
+
+Run from the repository root:
+    python -m benchmarks.bench_startup --bookings 200000 --max-ms 500
+
+With --max-ms the script exits with status 1 when the fast-start time to first prompt exceeds the limit.
+"""
+import argparse
+import datetime
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.common import temp_db_path
+from src.database.database_manager import DatabaseManager
+
+PROMPT = b"Enter your choice: "
+MODES = {
+    'eager': [],
+    'lazy': ['--lazy'],
+    'fast start': ['--fast-start'],
+}
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def populate(db_path, bookings):
+    manager = DatabaseManager(db_path)
+    cars = max(1, bookings // 10)
+    start = datetime.date(2024, 1, 1)
+    manager.bulk_write('users', [('alice', 'x', 'customer')])
+    manager.bulk_write('cars', ((f"car-{i}", 'Toyota', 'Corolla', 2010 + i % 15, i % 90_000, True, 1, 30)
+                                for i in range(cars)))
+    manager.bulk_write('bookings', (
+        (f"booking-{i}", 'alice', f"car-{i % cars}", (start + datetime.timedelta(days=(i // cars) * 5)).isoformat(),
+         (start + datetime.timedelta(days=(i // cars) * 5 + 3)).isoformat(), 'Approved' if i % 2 else 'Pending')
+        for i in range(bookings)))
+    manager.close()
+
+
+def import_times(top):
+    """
+    Import the entry point in a fresh interpreter with -X importtime.
+
+    Returns:
+        Tuple (total microseconds, list of (cumulative microseconds, module) for the slowest modules).
+    """
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import src.main'], cwd=ROOT,
+                            capture_output=True, text=True, check=True).stderr
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules.append((int(cumulative), name.rstrip()))
+    total = next(cumulative for cumulative, name in modules if name.strip() == 'src.main')
+    modules.sort(reverse=True)
+    return total, modules[:top]
+
+
+def time_to_prompt(db_path, flags):
+    """
+    Start the console application and wait for its first menu prompt.
+
+    Returns:
+        Seconds from process start to the prompt.
+    """
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-m', 'src.main', '--db', db_path] + flags, cwd=ROOT,
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    seen = b""
+    while PROMPT not in seen:
+        chunk = os.read(process.stdout.fileno(), 4096)
+        if not chunk:
+            raise RuntimeError("The application exited before showing a prompt.")
+        seen += chunk
+    elapsed = time.perf_counter() - started
+    process.communicate(b"0\n", timeout=60)
+    return elapsed
+
+
+def run(bookings, repeat, top, max_ms):
+    total, modules = import_times(top)
+    print(f"\nimport src.main: {total / 1000:.1f} ms cumulative; slowest modules:")
+    for cumulative, name in modules:
+        print(f"{cumulative / 1000:>10.1f} ms  {name}")
+
+    results = {}
+    with temp_db_path() as db_path:
+        populate(db_path, bookings)
+        print(f"\ntime to first prompt, {bookings} bookings (median of {repeat})")
+        for mode, flags in MODES.items():
+            results[mode] = statistics.median(time_to_prompt(db_path, flags) for _ in range(repeat)) * 1000
+            print(f"{mode:<14}{results[mode]:>10.1f} ms")
+
+    if max_ms is not None and results['fast start'] > max_ms:
+        print(f"\nFAIL: fast start took {results['fast start']:.1f} ms, limit {max_ms} ms")
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bookings', type=int, default=200_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help="slowest modules listed from the importtime output")
+    parser.add_argument('--max-ms', type=float, help="fail if the fast-start time to first prompt exceeds this")
+    args = parser.parse_args()
+    run(args.bookings, args.repeat, args.top, args.max_ms)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,264 @@
+# benchmarks/bench_suite.py
+"""
+Benchmark suite for the operations of CarRentalSystem on a deterministic synthetic database (benchmarks.workload).
+Every scenario calls the system's methods directly, without stdin, and reports ops/sec, latency percentiles and
+the peak memory allocated by one call, as JSON that can be compared between commits.
+
+Run from the repository root:
+    python -m benchmarks.bench_suite --scale 100k --output before.json
+    ... change the code ...
+    python -m benchmarks.bench_suite --scale 100k --output after.json
+    python -m benchmarks.bench_suite --compare before.json after.json --max-regression 0.2
+
+Scenarios that write (book_car, approve_booking, update_car, save_data) run after the read-only ones, on a copy of
+the database, so every run starts from the same data. --db reuses a file made by `python -m benchmarks.workload`.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+
+from benchmarks.common import measure, print_table, temp_db_path
+from benchmarks.workload import PASSWORD, SCALES, Workload
+from src.database.database_manager import DatabaseManager
+from src.system.car_rental_system import CarRentalSystem
+from src.system.query_cache import DEFAULT_MAX_ENTRIES, QueryCache
+from src.system.rental_service import ServiceError
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MEMORY_SAMPLES = 3  # Calls traced with tracemalloc per scenario; tracing is slow, so it is kept apart from timing
+DIRTY_CARS = 100  # Cars changed before each save_data call
+
+
+def scenario_load_data(system, workload, rng):
+    return system.load_data
+
+
+def scenario_login_user(system, workload, rng):
+    return lambda: system.login_user(workload.customer(rng.randrange(workload.customers)), PASSWORD)
+
+
+def scenario_available_cars(system, workload, rng):
+    return lambda: system.available_cars(*workload.random_period(rng))
+
+
+def scenario_recommend_cars(system, workload, rng):
+    return lambda: system.recommend_cars(rng.randint(2005, 2024), rng.randrange(20_000, 200_000),
+                                         *workload.random_period(rng), limit=10)
+
+
+def scenario_calculate_rental_fee(system, workload, rng):
+    return lambda: system.calculate_rental_fee(workload.car_id(rng.randrange(workload.cars)),
+                                               *workload.random_period(rng))
+
+
+def scenario_quote_cars(system, workload, rng):
+    car_ids = [workload.car_id(i) for i in range(min(1000, workload.cars))]
+    return lambda: system.quote_cars(car_ids, *workload.random_period(rng))
+
+
+def scenario_book_car(system, workload, rng):
+    customers = [system.users.get(workload.customer(i)) for i in range(min(100, workload.customers))]
+
+    def book():
+        # 3 to 7 days fits every generated car's rent period; some dates are taken and refused
+        start, _ = workload.random_period(rng)
+        end = (datetime.date.fromisoformat(start) + datetime.timedelta(days=rng.randint(3, 7))).isoformat()
+        system.book_car(rng.choice(customers), workload.car_id(rng.randrange(workload.cars)), start, end)
+    return book
+
+
+def scenario_approve_booking(system, workload, rng):
+    pending = [booking.booking_id for booking in system.list_bookings("Pending")]
+    rng.shuffle(pending)
+
+    def approve():
+        if not pending:
+            return  # Only with a large --repeat-factor on a small scale
+        try:
+            system.approve_booking(pending.pop())
+        except ServiceError:
+            pass  # Overlaps an approved booking; refusing it is part of the work measured
+    return approve
+
+
+def scenario_update_car(system, workload, rng):
+    return lambda: system.update_car(workload.car_id(rng.randrange(workload.cars)), mileage=rng.randrange(200_000))
+
+
+def scenario_save_data(system, workload, rng):
+    def save():
+        for _ in range(DIRTY_CARS):
+            car = system.cars.get(workload.car_id(rng.randrange(workload.cars)))
+            system.cars.update(car, mileage=car.mileage + 1)
+        system.save_data()
+    return save
+
+
+# name -> (setup returning a zero-argument operation, default number of calls). Read-only scenarios come first.
+SCENARIOS = {
+    'load_data': (scenario_load_data, 3),
+    'login_user': (scenario_login_user, 10),
+    'available_cars': (scenario_available_cars, 20),
+    'recommend_cars': (scenario_recommend_cars, 200),
+    'calculate_rental_fee': (scenario_calculate_rental_fee, 1000),
+    'quote_cars': (scenario_quote_cars, 100),
+    'book_car': (scenario_book_car, 200),
+    'approve_booking': (scenario_approve_booking, 200),
+    'update_car': (scenario_update_car, 200),
+    'save_data': (scenario_save_data, 20),
+}
+
+
+def peak_memory(operation, calls):
+    """
+    Largest amount of memory allocated at once by a single call, in bytes.
+    """
+    peak = 0
+    tracemalloc.start()
+    try:
+        for _ in range(calls):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            operation()
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(workload, names, repeat_factor=1.0, lazy=False, query_mode='memory', source_db=None,
+              cache_size=DEFAULT_MAX_ENTRIES):
+    """
+    Run scenarios against a fresh copy of the workload database.
+
+    Args:
+        workload: Workload describing the data
+        names: Scenario names, run in SCENARIOS order
+        repeat_factor: Multiplier for each scenario's default number of calls
+        lazy: Run CarRentalSystem in lazy mode
+        query_mode: 'memory' or 'sql'
+        source_db: Database file previously generated for the same workload (optional, generated if omitted)
+        cache_size: Entries of the query result cache (0 disables it)
+
+    Returns:
+        Dictionary with 'meta' (commit, machine, workload, settings) and 'results' (scenario -> metrics).
+    """
+    results = {}
+    with temp_db_path() as db_path, open(os.devnull, 'w') as quiet:
+        if source_db:
+            shutil.copyfile(source_db, db_path)
+        else:
+            workload.populate(db_path)
+        started = time.perf_counter()
+        system = CarRentalSystem(DatabaseManager(db_path), lazy=lazy, query_mode=query_mode,
+                                 query_cache=QueryCache(cache_size))
+        startup = time.perf_counter() - started
+        try:
+            for name in (name for name in SCENARIOS if name in names):
+                setup, default_repeat = SCENARIOS[name]
+                repeat = max(1, int(default_repeat * repeat_factor))
+                rng = random.Random(f"{workload.seed}-{name}")
+                with redirect_stdout(quiet):  # The console subclass prints messages; they are not measured
+                    operation = setup(system, workload, rng)
+                    result = measure(operation, repeat)
+                    result['peak_bytes'] = peak_memory(operation, min(repeat, MEMORY_SAMPLES))
+                results[name] = result
+        finally:
+            system.db_manager.close()
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'workload': workload.describe(),
+            'lazy': lazy,
+            'query_mode': query_mode,
+            'cache_size': cache_size,
+            'startup_seconds': round(startup, 4),
+        },
+        'results': results,
+    }
+
+
+def compare(base, new, max_regression=None):
+    """
+    Print per-scenario throughput and p99 changes between two result files.
+
+    Returns:
+        Names of the scenarios whose throughput dropped by more than max_regression (a fraction), if given.
+    """
+    print(f"\n{'scenario':<24}{'base ops/s':>14}{'new ops/s':>14}{'change':>12}{'base p99 us':>14}"
+          f"{'new p99 us':>14}")
+    regressions = []
+    for name, result in new['results'].items():
+        before = base['results'].get(name)
+        if before is None or not before['ops_per_sec']:
+            continue
+        change = result['ops_per_sec'] / before['ops_per_sec'] - 1
+        print(f"{name:<24}{before['ops_per_sec']:>14}{result['ops_per_sec']:>14}{change:>+12.1%}"
+              f"{before['p99_us']:>14}{result['p99_us']:>14}")
+        if max_regression is not None and change < -max_regression:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', default='10k', help=f"{', '.join(SCALES)} or a number of bookings")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--db', help="database generated by benchmarks.workload for the same scale and seed")
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--repeat-factor', type=float, default=1.0, help="scale every scenario's number of calls")
+    parser.add_argument('--lazy', action='store_true')
+    parser.add_argument('--query-mode', choices=('memory', 'sql'), default='memory')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_ENTRIES,
+                        help="entries of the query result cache (0 disables it)")
+    parser.add_argument('--output', help="write the JSON results to this file")
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help="compare two result files instead")
+    parser.add_argument('--max-regression', type=float,
+                        help="with --compare, exit with status 1 if any throughput dropped by more than this fraction")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as base_file, open(args.compare[1]) as new_file:
+            regressions = compare(json.load(base_file), json.load(new_file), args.max_regression)
+        if regressions:
+            print(f"\nFAIL: slower by more than {args.max_regression:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        return
+
+    workload = Workload(args.scale, args.seed)
+    report = run_suite(workload, args.scenarios, args.repeat_factor, args.lazy, args.query_mode, args.db,
+                       args.cache_size)
+    meta = report['meta']
+    print_table(f"{meta['workload']}, {'lazy' if args.lazy else 'eager'}, query mode {args.query_mode}, "
+                f"commit {meta['commit']}; startup {meta['startup_seconds']} s",
+                [(f"{name} (peak {result['peak_bytes'] / 1024:.0f} KiB)", result)
+                 for name, result in report['results'].items()])
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+# benchmarks/bench_write_behind.py
+"""
+Latency of interactive actions at each durability level (RentalService DURABILITY_LEVELS): 'full' commits with
+synchronous=FULL, 'normal' with the default synchronous=NORMAL, 'deferred' queues the changes for a WriteBehind
+that group-commits them in the background.
+
+Each level runs the same --actions bookings, approvals and mileage updates on a fresh copy of a generated
+workload. Mileage updates go to a small set of cars, so the writer has repeated changes to the same rows to
+combine. The table shows the latency the user waits for; the summary adds the time until everything is committed
+(for 'deferred', including the final flush) and the number of transactions written.
+
+Run from the repository root:
+    python -m benchmarks.bench_write_behind --scale 10k --actions 3000 --flush-ms 100
+"""
+import argparse
+import datetime
+import os
+import random
+import shutil
+import time
+
+from benchmarks.common import measure, print_table, temp_db_path
+from benchmarks.workload import SCALES, WORKLOAD_START, Workload
+from src.database.database_manager import DatabaseManager
+from src.database.write_behind import DEFAULT_FLUSH_ROWS, WriteBehind
+from src.system.auth_service import AuthService
+from src.system.rental_service import DURABILITY_LEVELS, RentalService, ServiceError
+
+HOT_CARS = 20  # Cars whose mileage is updated over and over
+
+
+def action_calls(service, workload, actions, seed):
+    """
+    Zero-argument calls cycling through a new booking, the approval of a pending one and a mileage update.
+    """
+    rng = random.Random(seed)
+    pending = [booking.booking_id for booking in service.find_bookings()]
+    rng.shuffle(pending)
+    customers = [service.users.get(workload.customer(i)) for i in range(min(workload.customers, 100))]
+    hot_cars = [workload.car_id(i) for i in range(min(workload.cars, HOT_CARS))]
+
+    def book():
+        start = WORKLOAD_START + datetime.timedelta(days=rng.randrange(365))
+        end = start + datetime.timedelta(days=rng.randint(1, 7))
+        try:
+            service.book_car(rng.choice(customers), workload.car_id(rng.randrange(workload.cars)),
+                             start.isoformat(), end.isoformat())
+        except ServiceError:
+            pass  # Dates taken or outside the car's rent period
+
+    def approve():
+        try:
+            service.approve_booking(pending.pop())
+        except (ServiceError, IndexError):
+            pass  # Overlaps an approved booking
+
+    def drive():
+        car = service.cars.get(rng.choice(hot_cars))
+        service.update_car(car.car_id, mileage=car.mileage + rng.randint(10, 500))
+
+    return [(book, approve, drive)[i % 3] for i in range(actions)]
+
+
+def run_level(db_path, level, workload, actions, flush_ms, flush_rows):
+    db_manager = DatabaseManager(db_path, pragmas={'synchronous': 'FULL'} if level == 'full' else None)
+    write_behind = WriteBehind(db_manager, flush_ms / 1000, flush_rows) if level == 'deferred' else None
+    service = RentalService(db_manager, auth=AuthService(workers=1), write_behind=write_behind)
+    calls = iter(action_calls(service, workload, actions, workload.seed))
+    started = time.perf_counter()
+    result = measure(lambda: next(calls)(), actions)
+    service.close()  # Waits for the background writer to commit the rest
+    return result, time.perf_counter() - started, write_behind
+
+
+def run(workload, actions, flush_ms, flush_rows):
+    with temp_db_path() as db_path:
+        workload.populate(db_path)
+        print(f"\n{workload.describe()}, {actions} actions, deferred flush every {flush_ms:g} ms "
+              f"or {flush_rows} rows")
+        table, summary = [], []
+        for level in DURABILITY_LEVELS:
+            copy = os.path.join(os.path.dirname(db_path), f'{level}.db')
+            shutil.copyfile(db_path, copy)
+            result, committed, write_behind = run_level(copy, level, workload, actions, flush_ms, flush_rows)
+            table.append((f"{level} action", result))
+            # Without write-behind every action that changed something committed on its own
+            groups = (write_behind.commits, write_behind.rows_written) if write_behind else ('', '')
+            summary.append((level, committed) + groups)
+        print_table("Latency of one action until the next prompt", table)
+        print(f"\n{'durability':<16}{'all committed s':>18}{'actions/sec':>14}{'group commits':>14}{'rows':>14}")
+        for level, committed, commits, rows in summary:
+            print(f"{level:<16}{committed:>18.2f}{actions / committed:>14.0f}{commits:>14}{rows:>14}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', default='10k', help=f"{', '.join(SCALES)} or a number of bookings")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--actions', type=int, default=3000)
+    parser.add_argument('--flush-ms', type=float, default=100)
+    parser.add_argument('--flush-rows', type=int, default=DEFAULT_FLUSH_ROWS)
+    args = parser.parse_args()
+    run(Workload(args.scale, args.seed), args.actions, args.flush_ms, args.flush_rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+# benchmarks/common.py
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+
+
+@contextmanager
+def temp_db_path(name='bench.db'):
+    """
+    Yield a database path inside a fresh temporary directory that is removed afterwards.
+    """
+    directory = tempfile.mkdtemp(prefix='car_rental_bench_')
+    try:
+        yield os.path.join(directory, name)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def measure(operation, repeat):
+    """
+    Call an operation repeatedly and collect per-call latencies.
+
+    Args:
+        operation: Zero-argument callable
+        repeat: Number of calls
+
+    Returns:
+        Dictionary with ops/sec and latency percentiles in microseconds.
+    """
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        operation()
+        latencies.append(time.perf_counter() - started)
+    return summarize(latencies)
+
+
+def summarize(latencies):
+    latencies = sorted(latencies)
+    total = sum(latencies)
+    return {
+        'ops': len(latencies),
+        'ops_per_sec': round(len(latencies) / total, 1) if total else None,
+        'mean_us': round(statistics.fmean(latencies) * 1e6, 1),
+        'p50_us': round(percentile(latencies, 50) * 1e6, 1),
+        'p99_us': round(percentile(latencies, 99) * 1e6, 1),
+    }
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def print_table(title, rows):
+    """
+    Print benchmark results as an aligned table.
+
+    Args:
+        title: Heading printed above the table
+        rows: List of (label, result dictionary) pairs
+    """
+    print(f"\n{title}")
+    columns = ['ops_per_sec', 'mean_us', 'p50_us', 'p99_us']
+    print(f"{'operation':<40}" + ''.join(f"{column:>14}" for column in columns))
+    for label, result in rows:
+        print(f"{label:<40}" + ''.join(f"{result.get(column, ''):>14}" for column in columns))
@@ -0,0 +1,135 @@
+# benchmarks/workload.py
+"""
+Deterministic synthetic data for benchmarks: users, cars and bookings at a named scale, generated from a seed so
+that two runs (or two commits) benchmark exactly the same database.
+
+Scales are named after the number of bookings; cars and users are derived from it:
+    1k, 10k, 100k, 1m  ->  bookings / 10 cars, bookings / 20 customers (at least 10 of each), plus one admin
+
+Bookings lie in the year from WORKLOAD_START, which is far enough ahead that they are all in the future. Approved
+bookings of a car never overlap; pending and rejected ones may.
+
+Generate a database file once and reuse it (the suite copies it before running):
+    python -m benchmarks.workload --scale 1m --out /tmp/rental_1m.db
+"""
+import argparse
+import datetime
+import random
+
+from src.database.database_manager import DatabaseManager
+from src.system.auth_service import AuthService
+
+SCALES = {'1k': 1_000, '10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+WORKLOAD_START = datetime.date(2030, 1, 1)
+WORKLOAD_DAYS = 365
+PASSWORD = 'password'  # Password of every generated user
+ADMIN = 'admin'
+MAKES = {
+    'Toyota': ('Corolla', 'Camry', 'RAV4', 'Yaris'),
+    'Honda': ('Civic', 'Accord', 'CR-V', 'Jazz'),
+    'Ford': ('Focus', 'Fiesta', 'Mondeo', 'Kuga'),
+    'BMW': ('3 Series', '5 Series', 'X1', 'X3'),
+    'Volkswagen': ('Golf', 'Polo', 'Passat', 'Tiguan'),
+}
+STATUS_WEIGHTS = (("Approved", 5), ("Pending", 3), ("Rejected", 2))
+
+
+class Workload:
+    """
+    Sizes and seed of a generated data set, and the generators for its rows.
+    """
+
+    def __init__(self, scale='10k', seed=42):
+        """
+        Args:
+            scale: Key of SCALES, or a number of bookings
+            seed: Seed of the random generators; the same seed gives the same rows
+        """
+        self.scale = scale
+        self.bookings = SCALES[scale] if scale in SCALES else int(scale)
+        self.cars = max(10, self.bookings // 10)
+        self.customers = max(10, self.bookings // 20)
+        self.seed = seed
+
+    def customer(self, index):
+        return f"customer-{index}"
+
+    def car_id(self, index):
+        return f"car-{index}"
+
+    def booking_id(self, index):
+        return f"booking-{index}"
+
+    def user_rows(self, password_hash):
+        yield ADMIN, password_hash, 'admin'
+        for i in range(self.customers):
+            yield self.customer(i), password_hash, 'customer'
+
+    def car_rows(self):
+        rng = random.Random(self.seed)
+        makes = sorted(MAKES)
+        for i in range(self.cars):
+            make = rng.choice(makes)
+            yield (self.car_id(i), make, rng.choice(MAKES[make]), rng.randint(2005, 2024), rng.randint(0, 200_000),
+                   rng.random() < 0.95, rng.randint(1, 3), rng.randint(7, 30))
+
+    def booking_rows(self):
+        """
+        Bookings, spread evenly over the cars. Each car's year is cut into one slot per booking, so approved
+        bookings of a car never overlap.
+        """
+        rng = random.Random(self.seed + 1)
+        statuses = [status for status, weight in STATUS_WEIGHTS for _ in range(weight)]
+        per_car = -(-self.bookings // self.cars)
+        slot = max(2, WORKLOAD_DAYS // per_car)
+        for i in range(self.bookings):
+            car, position = i % self.cars, i // self.cars
+            start = WORKLOAD_START + datetime.timedelta(days=position * slot + rng.randrange(max(1, slot // 2)))
+            end = start + datetime.timedelta(days=rng.randint(1, max(1, min(7, slot // 2))))
+            yield (self.booking_id(i), self.customer(rng.randrange(self.customers)), self.car_id(car),
+                   start.isoformat(), end.isoformat(), rng.choice(statuses))
+
+    def random_period(self, rng, max_days=7):
+        """
+        A rental period inside the workload year.
+
+        Returns:
+            Tuple (start date, end date) as YYYY-MM-DD strings.
+        """
+        start = WORKLOAD_START + datetime.timedelta(days=rng.randrange(WORKLOAD_DAYS))
+        return start.isoformat(), (start + datetime.timedelta(days=rng.randint(1, max_days))).isoformat()
+
+    def populate(self, db_path):
+        """
+        Write the data set into a database file with chunked bulk inserts.
+        """
+        # One hash shared by every user, made with the default KDF so logins don't trigger a re-hash
+        password_hash = AuthService(workers=1).hash_password(PASSWORD)
+        manager = DatabaseManager(db_path)
+        try:
+            manager.bulk_write('users', self.user_rows(password_hash))
+            manager.bulk_write('cars', self.car_rows())
+            manager.bulk_write('bookings', self.booking_rows())
+            with manager.connection() as connection:
+                connection.execute('ANALYZE')
+        finally:
+            manager.close()
+
+    def describe(self):
+        return {'scale': self.scale, 'seed': self.seed, 'users': self.customers + 1, 'cars': self.cars,
+                'bookings': self.bookings}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', default='10k', help=f"{', '.join(SCALES)} or a number of bookings")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out', required=True, help="database file to create")
+    args = parser.parse_args()
+    workload = Workload(args.scale, args.seed)
+    workload.populate(args.out)
+    print(f"Wrote {workload.describe()} to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
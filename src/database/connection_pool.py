@@ -0,0 +1,126 @@
+# database/connection_pool.py
+import queue
+import sqlite3
+import threading
+import time
+
+from src.utils.instrumentation import connection_factory  # Profiling connections while metrics are on
+
+# Pragmas applied to every pooled connection unless overridden
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',  # Readers don't block the writer and commits only append to the log
+    'synchronous': 'NORMAL',  # Safe with WAL; fsync on checkpoint instead of every commit
+    'cache_size': -16000,  # Negative values are KiB, i.e. a 16 MB page cache per connection
+    'temp_store': 'MEMORY',
+}
+PRAGMA_RETRY_INTERVAL = 0.01  # Seconds between attempts to set a pragma on a busy database
+
+
+class ConnectionPool:
+    """
+    Small pool of long-lived SQLite connections shared by the threads of one process.
+    """
+
+    def __init__(self, db_path, size=1, pragmas=None, cached_statements=256, timeout=30.0):
+        """
+        Args:
+            db_path: Path of the SQLite database file
+            size: Maximum number of open connections
+            pragmas: Pragma name -> value applied to each new connection (merged over DEFAULT_PRAGMAS)
+            cached_statements: Number of prepared statements sqlite3 keeps per connection
+            timeout: Seconds to wait for a database lock before failing
+        """
+        if size < 1:
+            raise ValueError("Pool size must be at least 1.")
+        self.db_path = db_path
+        self.size = size
+        self.pragmas = dict(DEFAULT_PRAGMAS)
+        self.pragmas.update(pragmas or {})
+        self.cached_statements = cached_statements
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()  # Most recently used connection first, its page cache is warm
+        self._all = []  # Every connection created so far
+        self._lock = threading.Lock()
+        self._local = threading.local()  # Connection checked out by the current thread and its nesting depth
+
+    def _open(self):
+        connection = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False,
+                                     cached_statements=self.cached_statements, factory=connection_factory())
+        for name, value in self.pragmas.items():
+            if not name.isidentifier():
+                raise ValueError(f"Invalid pragma name: {name}")
+            self._set_pragma(connection, name, value)
+        return connection
+
+    def _set_pragma(self, connection, name, value):
+        # Switching a database to WAL needs an exclusive lock, and SQLite reports a busy database right away
+        # instead of waiting, e.g. when several processes open a new database at once. Retry until the timeout.
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                connection.execute(f"PRAGMA {name} = {value}")
+                return
+            except sqlite3.OperationalError as error:
+                if 'locked' not in str(error) or time.monotonic() >= deadline:
+                    raise
+            time.sleep(PRAGMA_RETRY_INTERVAL)
+
+    def open_connection(self):
+        """
+        Open a connection with the pool's settings that is not shared through the pool. The caller closes it.
+        """
+        return self._open()
+
+    def acquire(self):
+        """
+        Take an idle connection, opening a new one while the pool is below its size. A thread that already holds
+        a connection gets the same one back, so nested calls (e.g. a write while a streaming read is open) never
+        wait on themselves.
+
+        Returns:
+            sqlite3.Connection owned by the caller until release()
+        """
+        held = getattr(self._local, 'connection', None)
+        if held is not None:
+            self._local.depth += 1
+            return held
+        connection = self._checkout()
+        self._local.connection = connection
+        self._local.depth = 1
+        return connection
+
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._all) < self.size:
+                connection = self._open()
+                self._all.append(connection)
+                return connection
+        return self._idle.get()  # Wait for another thread to hand one back
+
+    def release(self, connection):
+        if getattr(self._local, 'connection', None) is connection:
+            self._local.depth -= 1
+            if self._local.depth:
+                return  # Still in use further up this thread's call stack
+            self._local.connection = None
+        with self._lock:
+            if not any(connection is pooled for pooled in self._all):
+                return  # The pool was closed while the connection was checked out
+        if connection.in_transaction:
+            connection.rollback()  # Never hand out a connection with a half-finished transaction
+        self._idle.put(connection)
+
+    def close(self):
+        """
+        Close every connection. The pool can be used again afterwards and reopens connections on demand.
+        """
+        with self._lock:
+            for connection in self._all:
+                connection.close()
+            self._all = []
+            self._idle = queue.LifoQueue()
+            self._local = threading.local()
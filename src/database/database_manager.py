@@ -1,115 +1,788 @@
 # database/database_manager.py
-import sqlite3
 import os
-import datetime
+import sqlite3
+import threading
+from contextlib import contextmanager
+from itertools import islice
+
+from src.database.connection_pool import ConnectionPool
+from src.database.migrations import MIGRATIONS, migrate
+from src.utils.dates import format_date, month_days, parse_date
+from src.utils.instrumentation import timed
+
+
+def user_row(user):
+    return user.username, user.password, user.role
+
+
+def car_row(car):
+    return (car.car_id, car.make, car.model, car.year, car.mileage, car.available, car.min_rent_period,
+            car.max_rent_period)
+
+
+def booking_row(booking):
+    return (booking.booking_id, booking.customer_username, booking.car_id, format_date(booking.start_date),
+            format_date(booking.end_date), booking.status)
+
+
+def insert_statement(table, on_conflict='error'):
+    """
+    INSERT of the data columns of a table.
+
+    Args:
+        table: 'users', 'cars' or 'bookings'
+        on_conflict: 'skip' keeps an existing row with the same key, 'replace' overwrites it and bumps its version so
+            writers holding the old version notice, 'error' raises sqlite3.IntegrityError
+
+    Returns:
+        SQL statement with one placeholder per column of DATA_COLUMNS[table].
+    """
+    key, *columns = DATA_COLUMNS[table]
+    sql = (f"INSERT {'OR IGNORE ' if on_conflict == 'skip' else ''}INTO {table} ({key}, {', '.join(columns)}) "
+           f"VALUES ({', '.join('?' * (len(columns) + 1))})")
+    if on_conflict == 'replace':
+        assignments = ', '.join(f"{column} = excluded.{column}" for column in columns)
+        sql += f" ON CONFLICT ({key}) DO UPDATE SET {assignments}, version = version + 1"
+    elif on_conflict not in ('skip', 'error'):
+        raise ValueError(f"Unknown conflict handling: {on_conflict}")
+    return sql
+
+
+class ConflictError(Exception):
+    """
+    A write that would overwrite or contradict a change committed by another process or connection since the data
+    was read. The transaction is rolled back; the message is meant for the end user.
+    """
+
+    def __init__(self, message, table, key):
+        """
+        Args:
+            message: Explanation for the user
+            table: Table of the conflicting row
+            key: Primary key of the conflicting row
+        """
+        super().__init__(message)
+        self.table = table
+        self.key = key
+
+
+# Tables of the initial schema; later changes are applied by src.database.migrations
+SCHEMA_STATEMENTS = MIGRATIONS[0][2]
+
+# Columns of each table in row order; the first column is the primary key and the last the row version
+TABLE_COLUMNS = {
+    'users': ('username', 'password', 'role', 'version'),
+    'cars': ('car_id', 'make', 'model', 'year', 'mileage', 'available', 'min_rent_period', 'max_rent_period',
+             'version'),
+    'bookings': ('booking_id', 'customer_username', 'car_id', 'start_date', 'end_date', 'status', 'version'),
+}
+# Columns without the row version: what ROW_BUILDERS produce and bulk import/export read and write
+DATA_COLUMNS = {table: columns[:-1] for table, columns in TABLE_COLUMNS.items()}
+
+SELECT_STATEMENTS = {table: f"SELECT {', '.join(columns)} FROM {table}" for table, columns in TABLE_COLUMNS.items()}
+SELECT_USERS = SELECT_STATEMENTS['users']
+SELECT_CARS = SELECT_STATEMENTS['cars']
+SELECT_BOOKINGS = SELECT_STATEMENTS['bookings']
+
+STREAM_BATCH_SIZE = 1000  # Rows fetched per fetchmany() call when streaming
+BULK_BATCH_SIZE = 5000  # Rows written per transaction by bulk_write()
+
+# Pushed-down availability filter: no approved booking of the car overlaps [?, ?). ISO date strings compare in
+# date order, so the range test runs on idx_bookings_car_dates without decoding dates.
+NOT_RESERVED = ("NOT EXISTS (SELECT 1 FROM bookings WHERE bookings.car_id = cars.car_id "
+                "AND bookings.start_date < ? AND bookings.end_date > ? AND bookings.status = 'Approved')")
+
+# Full-table writes used by save_users/save_cars/save_bookings
+UPSERT_USERS = insert_statement('users', 'replace')
+UPSERT_CARS = insert_statement('cars', 'replace')
+UPSERT_BOOKINGS = insert_statement('bookings', 'replace')
+
+ROW_BUILDERS = {'users': user_row, 'cars': car_row, 'bookings': booking_row}
+
+# Statements used to flush incremental changes; rows are built by ROW_BUILDERS. Updates and deletes only match
+# the row if it still has the version that was read, so a change committed elsewhere in the meantime is detected.
+CHANGE_STATEMENTS = {
+    'users': {
+        'key': 'username',
+        'noun': 'User',
+        'insert': 'INSERT INTO users (username, password, role) VALUES (?, ?, ?)',
+        'update': 'UPDATE users SET password = ?, role = ?, version = version + 1 WHERE username = ? AND version = ?',
+        'delete': 'DELETE FROM users WHERE username = ? AND version = ?',
+    },
+    'cars': {
+        'key': 'car_id',
+        'noun': 'Car',
+        'insert': 'INSERT INTO cars (car_id, make, model, year, mileage, available, min_rent_period, max_rent_period) '
+                  'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+        'update': 'UPDATE cars SET make = ?, model = ?, year = ?, mileage = ?, available = ?, min_rent_period = ?, '
+                  'max_rent_period = ?, version = version + 1 WHERE car_id = ? AND version = ?',
+        'delete': 'DELETE FROM cars WHERE car_id = ? AND version = ?',
+    },
+    'bookings': {
+        'key': 'booking_id',
+        'noun': 'Booking',
+        'insert': 'INSERT INTO bookings (booking_id, customer_username, car_id, start_date, end_date, status) '
+                  'VALUES (?, ?, ?, ?, ?, ?)',
+        'update': 'UPDATE bookings SET customer_username = ?, car_id = ?, start_date = ?, end_date = ?, status = ?, '
+                  'version = version + 1 WHERE booking_id = ? AND version = ?',
+        'delete': 'DELETE FROM bookings WHERE booking_id = ? AND version = ?',
+    },
+}
+
+# Checked in the same transaction as a booking write, so two processes cannot both reserve the same dates
+BOOKABLE_CAR = 'SELECT 1 FROM cars WHERE car_id = ? AND available'
+OVERLAPPING_APPROVED = ("SELECT 1 FROM bookings WHERE car_id = ? AND status = 'Approved' AND start_date < ? "
+                        "AND end_date > ? AND booking_id != ? LIMIT 1")
+
+# Report totals (see migration 5). A booking is counted at most once, and only while it is approved: the ledger row
+# is written in the same transaction as the approval and removed with the un-approval.
+REPORT_GRAINS = ('car', 'make', 'fleet')
+TOTALS_BACKFILL = 'booking_totals'  # Pending while approved bookings may be missing from the totals, or stale in them
+SCHEDULE_TOTALS_BACKFILL = f"INSERT OR IGNORE INTO pending_backfills (name) VALUES ('{TOTALS_BACKFILL}')"
+LEDGER_COLUMNS = ('booking_id', 'car_id', 'make', 'start_date', 'end_date', 'revenue_cents')
+INSERT_LEDGER = (f"INSERT OR IGNORE INTO booking_ledger ({', '.join(LEDGER_COLUMNS)}) SELECT ?, ?, ?, ?, ?, ? "
+                 "WHERE EXISTS (SELECT 1 FROM bookings WHERE booking_id = ? AND status = 'Approved')")
+SELECT_LEDGER = f"SELECT {', '.join(LEDGER_COLUMNS)} FROM booking_ledger"
+UPSERT_TOTALS = ("INSERT INTO booking_totals (grain, group_key, month, bookings, booked_days, revenue_cents) "
+                 "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (grain, group_key, month) DO UPDATE SET "
+                 "bookings = bookings + excluded.bookings, booked_days = booked_days + excluded.booked_days, "
+                 "revenue_cents = revenue_cents + excluded.revenue_cents")
+SELECT_TOTALS = "SELECT group_key, bookings, booked_days, revenue_cents FROM booking_totals"
+# Approved bookings not counted yet, with their car's row (all NULL if the car was deleted)
+UNCOUNTED_BOOKINGS = (f"SELECT {', '.join('b.' + column for column in TABLE_COLUMNS['bookings'])}, "
+                      f"{', '.join('c.' + column for column in TABLE_COLUMNS['cars'])} "
+                      "FROM bookings b LEFT JOIN cars c ON c.car_id = b.car_id WHERE b.status = 'Approved' "
+                      "AND NOT EXISTS (SELECT 1 FROM booking_ledger l WHERE l.booking_id = b.booking_id)")
+# Counted bookings that are no longer approved, e.g. overwritten by an import
+STALE_LEDGER = ("SELECT l.booking_id FROM booking_ledger l WHERE NOT EXISTS (SELECT 1 FROM bookings b "
+                "WHERE b.booking_id = l.booking_id AND b.status = 'Approved') AND NOT EXISTS (SELECT 1 "
+                "FROM bookings_archive a WHERE a.booking_id = l.booking_id AND a.status = 'Approved')")
+
+# Booking archive (see migration 6): bookings that have ended or were rejected. An approved booking is only moved
+# once it is counted in the report totals, so the totals never need to look at the archive.
+SELECT_ARCHIVE = f"SELECT {', '.join(TABLE_COLUMNS['bookings'])} FROM bookings_archive"
+ARCHIVABLE_BOOKINGS = ("SELECT booking_id FROM bookings WHERE (status = 'Rejected' OR end_date <= ?) AND "
+                       "(status != 'Approved' OR booking_id IN (SELECT booking_id FROM booking_ledger)) LIMIT ?")
+ARCHIVE_BOOKING = (f"INSERT OR REPLACE INTO bookings_archive ({', '.join(TABLE_COLUMNS['bookings'])}) "
+                   f"{SELECT_BOOKINGS} WHERE booking_id = ?")
+
+
+def total_changes(ledger_row, sign=1):
+    """
+    booking_totals changes for counting (sign 1) or un-counting (sign -1) one ledger row.
+
+    Returns:
+        List of (grain, group_key, month, bookings, booked_days, revenue_cents) rows to add.
+    """
+    _, car_id, make, start_date, end_date, revenue = ledger_row
+    months = month_days(parse_date(start_date), parse_date(end_date))
+    changes = []
+    for grain, key in zip(REPORT_GRAINS, (car_id, make, '')):
+        changes.append((grain, key, '', sign, sign * sum(days for _, days in months), sign * revenue))
+        for i, (month, days) in enumerate(months):
+            first = i == 0  # The booking and its revenue count in the month it starts
+            changes.append((grain, key, month, sign * first, sign * days, sign * revenue * first))
+    return changes
+
+
+def advance_versions(changes):
+    """
+    Advance the versions of the objects a committed change set updated, as the database did.
+    """
+    for table in ('users', 'cars', 'bookings'):
+        for obj in changes[table]['update']:
+            obj.version += 1
+
 
 class DatabaseManager:
-    def __init__(self):
-        # Get the absolute path of the directory containing the current script
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        # Get the absolute path of the `database` directory
-        database_dir = os.path.join(current_dir, '..', 'database')
-        # Create the `database` directory if it doesn't exist
-        os.makedirs(database_dir, exist_ok=True)
-        # Database file path
-        self.db_path = os.path.join(database_dir, 'car_rental.db')
-        self.db_connection = None
-        self.db_cursor = None
+    def __init__(self, db_path=None, pool_size=1, pragmas=None, cached_statements=256):
+        """
+        Args:
+            db_path: Database file path (optional, defaults to database/car_rental.db)
+            pool_size: Number of connections kept open for multi-threaded callers
+            pragmas: SQLite pragmas such as {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'cache_size': -16000}
+            cached_statements: Number of prepared statements cached per connection
+        """
+        if db_path is None:
+            # Get the absolute path of the directory containing the current script
+            current_dir = os.path.dirname(os.path.abspath(__file__))
+            # Get the absolute path of the `database` directory
+            database_dir = os.path.join(current_dir, '..', 'database')
+            # Create the `database` directory if it doesn't exist
+            os.makedirs(database_dir, exist_ok=True)
+            # Database file path
+            db_path = os.path.join(database_dir, 'car_rental.db')
+        self.db_path = db_path
+        self.pool = ConnectionPool(db_path, size=pool_size, pragmas=pragmas, cached_statements=cached_statements)
+        self._schema_ready = False
+        # apply_changes() writes through its own connection. PRAGMA data_version on it changes exactly when some
+        # other connection - another process, or a bulk write through the pool - has committed.
+        self._writer = None
+        self._writer_lock = threading.RLock()
 
     def connect(self):
-        self.db_connection = sqlite3.connect(self.db_path)
-        self.db_cursor = self.db_connection.cursor()
-        self.create_tables()
-
-    def create_tables(self):
-        # Create tables if they don't exist
-        self.db_cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                username TEXT PRIMARY KEY,
-                password TEXT,
-                role TEXT
-            )
-        ''')
-
-        self.db_cursor.execute('''
-            CREATE TABLE IF NOT EXISTS cars (
-                car_id TEXT PRIMARY KEY,
-                make TEXT,
-                model TEXT,
-                year INTEGER,
-                mileage INTEGER,
-                available BOOLEAN,
-                min_rent_period INTEGER,
-                max_rent_period INTEGER
-            )
-        ''')
-
-        self.db_cursor.execute('''
-            CREATE TABLE IF NOT EXISTS bookings (
-                booking_id TEXT PRIMARY KEY,
-                customer_username TEXT,
-                car_id TEXT,
-                start_date TEXT,
-                end_date TEXT,
-                status TEXT,
-                FOREIGN KEY (customer_username) REFERENCES users(username),
-                FOREIGN KEY (car_id) REFERENCES cars(car_id)
-            )
-        ''')
-        self.db_connection.commit()
+        """
+        Make sure the schema exists. Connections themselves are opened lazily by the pool and kept open.
+        """
+        if not self._schema_ready:
+            connection = self.pool.acquire()
+            try:
+                self.create_tables(connection)
+            finally:
+                self.pool.release(connection)
+            self._schema_ready = True
 
-    def load_users(self):
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a pooled connection for the duration of a with-block.
+        """
         self.connect()
-        self.db_cursor.execute('SELECT * FROM users')
-        users = [(username, password, role) for username, password, role in self.db_cursor.fetchall()]
-        self.close()
-        return users
+        connection = self.pool.acquire()
+        try:
+            yield connection
+        finally:
+            self.pool.release(connection)
+
+    @contextmanager
+    def write_transaction(self):
+        """
+        Run a with-block in a BEGIN IMMEDIATE transaction on the writer connection. The database write lock is
+        taken up front, so what the block reads cannot be changed by another writer before it commits.
+        """
+        with self._writer_lock:
+            connection = self._writer_connection()
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                yield connection
+            except BaseException:
+                connection.rollback()
+                raise
+            connection.commit()
+
+    def data_version(self):
+        """
+        Change counter of the database as seen by this manager's writes.
+
+        Returns:
+            Integer that differs from an earlier result if another process (or a bulk write) has committed since;
+            commits made by apply_changes() do not change it.
+        """
+        with self._writer_lock:
+            return self._writer_connection().execute('PRAGMA data_version').fetchone()[0]
+
+    def _writer_connection(self):
+        # Opened with the pool's settings but never handed out by it; callers hold _writer_lock
+        if self._writer is None:
+            self.connect()
+            self._writer = self.pool.open_connection()
+        return self._writer
 
+    def create_tables(self, connection):
+        # Create tables and indexes if they don't exist, applying any pending migrations
+        migrate(connection)
+
+    @timed()
+    def load_users(self):
+        with self.connection() as connection:
+            return connection.execute(SELECT_USERS).fetchall()
+
+    @timed()
     def load_cars(self):
-        self.connect()
-        self.db_cursor.execute('SELECT * FROM cars')
-        cars = [(car_id, make, model, year, mileage, available, min_rent_period, max_rent_period)
-                     for car_id, make, model, year, mileage, available, min_rent_period, max_rent_period in self.db_cursor.fetchall()]
-        self.close()
-        return cars
+        with self.connection() as connection:
+            return connection.execute(SELECT_CARS).fetchall()
 
+    @timed()
     def load_bookings(self):
-        self.connect()
-        self.db_cursor.execute('SELECT * FROM bookings')
-        bookings = [
-            (booking_id, customer_username, car_id, start_date, end_date, status)
-            for booking_id, customer_username, car_id, start_date, end_date, status in self.db_cursor.fetchall()
-        ]
-        self.close()
-        return bookings
+        with self.connection() as connection:
+            return connection.execute(SELECT_BOOKINGS).fetchall()
+
+    def stream(self, table, column=None, value=None, batch_size=STREAM_BATCH_SIZE, order_by=None):
+        """
+        Stream rows of a table without materializing the result set.
+
+        Args:
+            table: 'users', 'cars' or 'bookings'
+            column: Column to filter on (optional)
+            value: Value the column must equal
+            batch_size: Rows fetched per round trip
+            order_by: Column to sort by (optional)
+
+        Returns:
+            Generator of row tuples in TABLE_COLUMNS order.
+        """
+        sql, params = SELECT_STATEMENTS[table], ()
+        if column is not None:
+            sql += f" WHERE {self._column(table, column)} = ?"
+            params = (value,)
+        if order_by is not None:
+            sql += f" ORDER BY {self._column(table, order_by)}"
+        return self._stream_query(sql, params, batch_size)
+
+    def _stream_query(self, sql, params, batch_size=STREAM_BATCH_SIZE):
+        with self.connection() as connection:
+            cursor = connection.execute(sql, params)
+            try:
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield from rows
+            finally:
+                cursor.close()
+
+    def stream_available_cars(self, start_date, end_date, batch_size=STREAM_BATCH_SIZE):
+        """
+        Stream in-service cars with no approved booking overlapping [start_date, end_date), filtered in SQL.
+
+        Args:
+            start_date: First day (date)
+            end_date: Day after the last day (date)
+            batch_size: Rows fetched per round trip
+
+        Returns:
+            Generator of cars table rows.
+        """
+        sql = f"{SELECT_CARS} WHERE available = 1 AND {NOT_RESERVED}"
+        return self._stream_query(sql, (format_date(end_date), format_date(start_date)), batch_size)
 
+    def stream_bookings(self, status, start_date=None, end_date=None, car_id=None, customer=None,
+                        batch_size=STREAM_BATCH_SIZE):
+        """
+        Stream bookings with a status, filtered in SQL, earliest start first.
+
+        Args:
+            status: Booking status, e.g. 'Pending'
+            start_date: Only bookings that end after this day (date, optional)
+            end_date: Only bookings that start before this day (date, optional)
+            car_id: Only bookings of this car (optional)
+            customer: Only bookings of this customer (optional)
+            batch_size: Rows fetched per round trip
+
+        Returns:
+            Generator of bookings table rows.
+        """
+        conditions, params = ["status = ?"], [status]
+        if start_date is not None:
+            conditions.append("end_date > ?")
+            params.append(format_date(start_date))
+        if end_date is not None:
+            conditions.append("start_date < ?")
+            params.append(format_date(end_date))
+        if car_id is not None:
+            conditions.append("car_id = ?")
+            params.append(car_id)
+        if customer is not None:
+            conditions.append("customer_username = ?")
+            params.append(customer)
+        sql = f"{SELECT_BOOKINGS} WHERE {' AND '.join(conditions)} ORDER BY start_date, booking_id"
+        return self._stream_query(sql, params, batch_size)
+
+    @timed()
+    def recommend_cars(self, start_date, end_date, year=None, max_mileage=None, limit=None, offset=0):
+        """
+        Best-ranked free cars for a rental, filtered and sorted in SQL: lowest mileage, then newest year.
+
+        Args:
+            start_date: First day (date)
+            end_date: Day after the last day (date)
+            year: Exact production year (optional)
+            max_mileage: Maximum mileage (optional)
+            limit: Page size (optional, all matches if omitted)
+            offset: Number of matches to skip, for pagination
+
+        Returns:
+            List of cars table rows.
+        """
+        rental_days = (end_date - start_date).days
+        conditions, params = ["available = 1"], []
+        if year is not None:
+            conditions.append("year = ?")
+            params.append(year)
+        if max_mileage is not None:
+            conditions.append("mileage <= ?")
+            params.append(max_mileage)
+        conditions += ["min_rent_period <= ?", "max_rent_period >= ?", NOT_RESERVED]
+        params += [rental_days, rental_days, format_date(end_date), format_date(start_date)]
+        sql = (f"{SELECT_CARS} WHERE {' AND '.join(conditions)} "
+               f"ORDER BY mileage, year DESC, car_id LIMIT ? OFFSET ?")
+        params += [-1 if limit is None else limit, offset]
+        with self.connection() as connection:
+            return connection.execute(sql, params).fetchall()
+
+    @timed()
+    def free_cars(self, start_date, end_date, make=None, model=None, year=None, limit=None):
+        """
+        In-service cars of a make, model and/or year that accept the rental length and are free for
+        [start_date, end_date), filtered in SQL, by car_id.
+
+        Args:
+            start_date: First day (date)
+            end_date: Day after the last day (date)
+            make: Make, case-insensitive (optional)
+            model: Model, case-insensitive (optional)
+            year: Exact production year (optional)
+            limit: Maximum number of cars (optional, all matches if omitted)
+
+        Returns:
+            List of cars table rows.
+        """
+        rental_days = (end_date - start_date).days
+        conditions, params = ["available = 1"], []
+        for condition, value in (("make = ? COLLATE NOCASE", make), ("model = ? COLLATE NOCASE", model),
+                                 ("year = ?", year)):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        conditions += ["min_rent_period <= ?", "max_rent_period >= ?", NOT_RESERVED]
+        params += [rental_days, rental_days, format_date(end_date), format_date(start_date),
+                   -1 if limit is None else limit]
+        sql = f"{SELECT_CARS} WHERE {' AND '.join(conditions)} ORDER BY car_id LIMIT ?"
+        with self.connection() as connection:
+            return connection.execute(sql, params).fetchall()
+
+    @timed()
+    def fetch_one(self, table, key):
+        """
+        Read one row by primary key.
+
+        Returns:
+            Row tuple, or None if there is no such row.
+        """
+        key_column = TABLE_COLUMNS[table][0]
+        with self.connection() as connection:
+            return connection.execute(f"{SELECT_STATEMENTS[table]} WHERE {key_column} = ?", (key,)).fetchone()
+
+    @timed()
+    def count(self, table, column=None, value=None):
+        sql, params = f"SELECT COUNT(*) FROM {self._table(table)}", ()
+        if column is not None:
+            sql += f" WHERE {self._column(table, column)} = ?"
+            params = (value,)
+        with self.connection() as connection:
+            return connection.execute(sql, params).fetchone()[0]
+
+    @staticmethod
+    def _table(table):
+        if table not in TABLE_COLUMNS:
+            raise ValueError(f"Unknown table: {table}")
+        return table
+
+    @staticmethod
+    def _column(table, column):
+        # Column names are interpolated into SQL, so only known ones are allowed
+        if column not in TABLE_COLUMNS[table]:
+            raise ValueError(f"Unknown column {column} for table {table}")
+        return column
+
+    @timed()
+    def bulk_write(self, table, rows, batch_size=BULK_BATCH_SIZE, on_conflict='skip'):
+        """
+        Insert rows in chunks, one transaction per chunk, without materializing the input.
+
+        Args:
+            table: 'users', 'cars' or 'bookings'
+            rows: Iterable of row tuples in DATA_COLUMNS order
+            batch_size: Rows per executemany() transaction
+            on_conflict: 'skip' keeps existing rows, 'replace' overwrites them, 'error' raises sqlite3.IntegrityError
+
+        Returns:
+            Tuple (rows written, rows skipped because of existing keys).
+        """
+        sql = insert_statement(self._table(table), on_conflict)
+        written = skipped = 0
+        rows = iter(rows)
+        with self.connection() as connection:
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                with connection:
+                    cursor = connection.executemany(sql, batch)
+                    if table == 'bookings' and cursor.rowcount:
+                        # Rows written behind the service's back: recount the report totals before the next report
+                        connection.execute(SCHEDULE_TOTALS_BACKFILL)
+                written += cursor.rowcount
+                skipped += len(batch) - cursor.rowcount
+        return written, skipped
+
+    @timed()
     def save_users(self, users):
-        self.connect()
-        self.db_cursor.executemany('''
-            INSERT OR REPLACE INTO users (username, password, role) VALUES (?, ?, ?)
-        ''', [(user.username, user.password, user.role) for user in users])
-        self.db_connection.commit()
-        self.close()
+        with self.connection() as connection, connection:
+            connection.executemany(UPSERT_USERS, [user_row(user) for user in users])
 
+    @timed()
     def save_cars(self, cars):
-        self.connect()
-        self.db_cursor.executemany('''
-            INSERT OR REPLACE INTO cars (car_id, make, model, year, mileage, available, min_rent_period, max_rent_period) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', [(car.car_id, car.make, car.model, car.year, car.mileage, car.available, car.min_rent_period, car.max_rent_period) for car in cars])
-        self.db_connection.commit()
-        self.close()
+        with self.connection() as connection, connection:
+            connection.executemany(UPSERT_CARS, [car_row(car) for car in cars])
 
+    @timed()
     def save_bookings(self, bookings):
-        self.connect()
-        self.db_cursor.executemany('''
-            INSERT OR REPLACE INTO bookings (booking_id, customer_username, car_id, start_date, end_date, status) VALUES (?, ?, ?, ?, ?, ?)
-        ''', [(booking.booking_id, booking.customer_username, booking.car_id,
-               booking.start_date.strftime("%Y-%m-%d"), booking.end_date.strftime("%Y-%m-%d"), booking.status) for booking in bookings])
-        self.db_connection.commit()
-        self.close()
+        with self.connection() as connection, connection:
+            connection.executemany(UPSERT_BOOKINGS, [booking_row(booking) for booking in bookings])
+            connection.execute(SCHEDULE_TOTALS_BACKFILL)
+
+    @timed()
+    def apply_changes(self, changes):
+        """
+        Write a change set collected by the UnitOfWork in a single BEGIN IMMEDIATE transaction.
+
+        Updated and deleted rows must still have the version they were read with. New bookings must be for an
+        existing car in service, and new or approved bookings must not overlap another approved booking of the car;
+        both are checked inside the transaction. On success the versions of the updated objects are advanced.
+
+        Args:
+            changes: Dictionary mapping table name to {'insert': [...], 'update': [...], 'delete': [...]} object lists,
+                and 'ledger' to {booking_id: ledger row to count, or None to un-count} for the report totals
+
+        Raises:
+            ConflictError: If a row was changed, removed or inserted by someone else, or a booking conflicts. Nothing
+                is written in that case.
+        """
+        with self.write_transaction() as connection:
+            self.write_changes(connection, changes)
+        advance_versions(changes)
+
+    def write_changes(self, connection, changes):
+        """
+        The writes and checks of apply_changes(), inside a write_transaction() the caller commits. The versions of
+        the updated objects are left to advance_versions() once it has.
+        """
+        for table in ('users', 'cars', 'bookings'):
+            statements = CHANGE_STATEMENTS[table]
+            to_row = ROW_BUILDERS[table]
+            for obj in changes[table]['insert']:
+                try:
+                    connection.execute(statements['insert'], to_row(obj))
+                except sqlite3.IntegrityError:
+                    key = getattr(obj, statements['key'])
+                    raise ConflictError(f"{statements['noun']} {key} already exists.", table, key) from None
+            for obj in changes[table]['update']:
+                # The primary key is the first column of a row, but comes after the other columns in the UPDATE
+                row = to_row(obj)
+                if not connection.execute(statements['update'], row[1:] + row[:1] + (obj.version,)).rowcount:
+                    self._raise_stale(table, row[0])
+        # New bookings and approvals need a car in service
+        bookable = changes['bookings']['insert'] + [booking for booking in changes['bookings']['update']
+                                                    if booking.status == "Approved"]
+        for booking in bookable:
+            if not connection.execute(BOOKABLE_CAR, (booking.car_id,)).fetchone():
+                raise ConflictError("Car not found or not available.", 'cars', booking.car_id)
+        # A new booking must not ask for dates already reserved; an approval must not reserve them twice
+        reserving = [booking for booking in changes['bookings']['insert'] if booking.status != "Rejected"]
+        reserving += [booking for booking in changes['bookings']['update'] if booking.status == "Approved"]
+        for booking in reserving:
+            if connection.execute(OVERLAPPING_APPROVED, (booking.car_id, format_date(booking.end_date),
+                                                         format_date(booking.start_date),
+                                                         booking.booking_id)).fetchone():
+                raise ConflictError("Car is already booked for the selected dates.", 'bookings',
+                                    booking.booking_id)
+        # Delete children before parents
+        for table in ('bookings', 'cars', 'users'):
+            key_attr = CHANGE_STATEMENTS[table]['key']
+            for obj in changes[table]['delete']:
+                key = getattr(obj, key_attr)
+                if not connection.execute(CHANGE_STATEMENTS[table]['delete'], (key, obj.version)).rowcount:
+                    self._raise_stale(table, key)
+        # Report totals follow the approvals written above
+        ledger = changes.get('ledger', {})
+        self._uncount(connection, [booking_id for booking_id, row in ledger.items() if row is None])
+        self._count(connection, [row for row in ledger.values() if row is not None])
+
+    @staticmethod
+    def _count(connection, ledger_rows):
+        for row in ledger_rows:
+            if connection.execute(INSERT_LEDGER, row + row[:1]).rowcount:
+                connection.executemany(UPSERT_TOTALS, total_changes(row))
+
+    @staticmethod
+    def _uncount(connection, booking_ids):
+        for booking_id in booking_ids:
+            row = connection.execute(f"{SELECT_LEDGER} WHERE booking_id = ?", (booking_id,)).fetchone()
+            if row is not None:
+                connection.execute("DELETE FROM booking_ledger WHERE booking_id = ?", (booking_id,))
+                connection.executemany(UPSERT_TOTALS, total_changes(row, -1))
+
+    @timed()
+    def archive_bookings(self, before, batch_size=BULK_BATCH_SIZE):
+        """
+        Move bookings that ended on or before a day, and rejected bookings, to the archive, one transaction per batch.
+        Approved bookings not yet counted in the report totals stay until they are.
+
+        Args:
+            before: Last end date to archive (date)
+            batch_size: Bookings moved per transaction
+
+        Returns:
+            Number of bookings archived.
+        """
+        archived = 0
+        while True:
+            with self.write_transaction() as connection:
+                keys = connection.execute(ARCHIVABLE_BOOKINGS, (format_date(before), batch_size)).fetchall()
+                connection.executemany(ARCHIVE_BOOKING, keys)
+                connection.executemany("DELETE FROM bookings WHERE booking_id = ?", keys)
+            archived += len(keys)
+            if len(keys) < batch_size:
+                return archived
+
+    def stream_archived_bookings(self, start_date=None, end_date=None, car_id=None, customer=None, status=None,
+                                 batch_size=STREAM_BATCH_SIZE):
+        """
+        Stream archived bookings, filtered in SQL, earliest start first.
+
+        Args:
+            start_date: Only bookings that end after this day (date, optional)
+            end_date: Only bookings that start before this day (date, optional)
+            car_id: Only bookings of this car (optional)
+            customer: Only bookings of this customer (optional)
+            status: Only bookings with this status (optional)
+            batch_size: Rows fetched per round trip
+
+        Returns:
+            Generator of rows in bookings TABLE_COLUMNS order.
+        """
+        conditions, params = [], []
+        for condition, value in (("end_date > ?", start_date and format_date(start_date)),
+                                 ("start_date < ?", end_date and format_date(end_date)),
+                                 ("car_id = ?", car_id), ("customer_username = ?", customer),
+                                 ("status = ?", status)):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self._stream_query(f"{SELECT_ARCHIVE}{where} ORDER BY start_date, booking_id", params, batch_size)
+
+    def stream_uncounted_bookings(self, batch_size=STREAM_BATCH_SIZE):
+        """
+        Stream approved bookings that are not in the report totals yet, e.g. approved before the totals existed.
+
+        Returns:
+            Generator of rows: the bookings columns followed by the cars columns of its car (all None if the car
+            was deleted).
+        """
+        return self._stream_query(UNCOUNTED_BOOKINGS, (), batch_size)
+
+    @timed()
+    def count_bookings(self, ledger_rows, batch_size=BULK_BATCH_SIZE):
+        """
+        Add approved bookings to the report totals, one transaction per batch. Bookings that are already counted
+        or no longer approved are skipped, so this is safe to run while other processes approve and reject.
+
+        Args:
+            ledger_rows: Iterable of rows in LEDGER_COLUMNS order
+            batch_size: Rows counted per transaction
+        """
+        rows = iter(ledger_rows)
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                return
+            with self.write_transaction() as connection:
+                self._count(connection, batch)
+
+    @timed()
+    def uncount_stale_bookings(self):
+        """
+        Take bookings that are no longer approved, or no longer exist, out of the report totals.
+
+        Returns:
+            Number of bookings taken out.
+        """
+        with self.write_transaction() as connection:
+            booking_ids = [row[0] for row in connection.execute(STALE_LEDGER)]
+            self._uncount(connection, booking_ids)
+        return len(booking_ids)
+
+    def backfill_pending(self, name):
+        """
+        Whether a data migration left for the application, such as 'booking_totals', still has to run.
+        """
+        with self.connection() as connection:
+            return connection.execute("SELECT 1 FROM pending_backfills WHERE name = ?", (name,)).fetchone() is not None
+
+    def finish_backfill(self, name):
+        with self.write_transaction() as connection:
+            connection.execute("DELETE FROM pending_backfills WHERE name = ?", (name,))
+
+    @timed()
+    def booking_totals(self, grain, group_key='', month=''):
+        """
+        Report totals of one group, a single primary-key lookup.
+
+        Args:
+            grain: 'car', 'make' or 'fleet'
+            group_key: car_id or make ('' for the fleet)
+            month: 'YYYY-MM', or '' for all months
+
+        Returns:
+            Tuple (bookings, booked days, revenue in cents), zeros if nothing was booked.
+        """
+        with self.connection() as connection:
+            row = connection.execute(f"{SELECT_TOTALS} WHERE grain = ? AND group_key = ? AND month = ?",
+                                     (grain, group_key, month)).fetchone()
+        return (0, 0, 0) if row is None else row[1:]
+
+    @timed()
+    def list_booking_totals(self, grain, month=''):
+        """
+        Report totals of every group of a grain with bookings in the month ('' for all months).
+
+        Returns:
+            List of (group_key, bookings, booked days, revenue in cents) rows.
+        """
+        with self.connection() as connection:
+            return connection.execute(f"{SELECT_TOTALS} WHERE grain = ? AND month = ? AND booked_days != 0",
+                                      (grain, month)).fetchall()
+
+    @timed()
+    def count_by(self, table, column):
+        """
+        Number of rows per value of a column.
+
+        Returns:
+            Dictionary value -> count.
+        """
+        column = self._column(table, column)
+        with self.connection() as connection:
+            return dict(connection.execute(f"SELECT {column}, COUNT(*) FROM {self._table(table)} GROUP BY {column}"))
+
+    def check_booking_totals(self):
+        """
+        Recompute the report totals from scratch and compare them with the incrementally maintained ones.
+
+        Returns:
+            Dictionary with 'uncounted' (approved bookings missing from the ledger), 'stale' (ledger rows of bookings
+            no longer approved) and 'mismatched' (keys (grain, group_key, month) whose totals differ).
+        """
+        with self.connection() as connection:
+            uncounted = connection.execute(f"SELECT COUNT(*) FROM ({UNCOUNTED_BOOKINGS})").fetchone()[0]
+            stale = connection.execute(f"SELECT COUNT(*) FROM ({STALE_LEDGER})").fetchone()[0]
+            expected = {}
+            for row in connection.execute(SELECT_LEDGER):
+                for grain, key, month, *values in total_changes(row):
+                    totals = expected.setdefault((grain, key, month), [0, 0, 0])
+                    for i, value in enumerate(values):
+                        totals[i] += value
+            actual = {(grain, key, month): list(values) for grain, key, month, *values in connection.execute(
+                "SELECT grain, group_key, month, bookings, booked_days, revenue_cents FROM booking_totals")}
+        zero = [0, 0, 0]
+        mismatched = sorted(key for key in expected.keys() | actual.keys()
+                            if expected.get(key, zero) != actual.get(key, zero))
+        return {'uncounted': uncounted, 'stale': stale, 'mismatched': mismatched}
+
+    @staticmethod
+    def _raise_stale(table, key):
+        noun = CHANGE_STATEMENTS[table]['noun']
+        raise ConflictError(f"{noun} {key} was changed by another user in the meantime. Please try again.", table,
+                            key)
 
     def close(self):
-        if self.db_connection:
-            self.db_connection.close()
-            self.db_connection = None
-            self.db_cursor = None
\ No newline at end of file
+        """
+        Close all connections. The manager reopens them on the next call.
+        """
+        with self._writer_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        self.pool.close()
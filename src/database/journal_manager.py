@@ -0,0 +1,615 @@
+# database/journal_manager.py
+"""
+Append-only event journal: an alternative storage engine with the DatabaseManager interface of the in-memory
+service (query mode 'memory').
+
+Every change set written by the UnitOfWork becomes one journal record holding its domain events - a user registered,
+a car added, updated or deleted, a booking created, approved or rejected - instead of rewriting table rows. The
+current state is kept in memory and rebuilt at startup from the latest snapshot plus the records appended after it.
+A snapshot is written every compact_after records, so startup never replays more than that.
+
+Files in the journal directory:
+    snapshot.json - the state after record number "seq", replaced atomically (written aside, flushed, renamed)
+    journal.log   - records of a 4-byte length and a 4-byte CRC32, both little-endian, then the JSON payload
+                    [seq, [event, ...]]; an event is a list starting with its name, e.g. ["booking_approved", id]
+
+A crash can only tear the record being appended. Recovery stops at the first record that is cut short or fails its
+checksum and truncates the file there, so a change set is recovered completely or not at all. Records not newer
+than the snapshot were compacted into it by a run that stopped before emptying the journal, and are skipped.
+
+One process at a time may use a journal directory.
+"""
+import json
+import os
+import struct
+import threading
+import zlib
+from itertools import islice
+
+from src.database.database_manager import (BULK_BATCH_SIZE, CHANGE_STATEMENTS, ROW_BUILDERS, STREAM_BATCH_SIZE,
+                                           TABLE_COLUMNS, TOTALS_BACKFILL, ConflictError, total_changes)
+from src.database.unit_of_work import TABLE_ORDER
+from src.utils.dates import format_date
+from src.utils.instrumentation import timed
+
+SNAPSHOT_FILE = 'snapshot.json'
+JOURNAL_FILE = 'journal.log'
+RECORD_HEADER = struct.Struct('<II')  # Payload length, CRC32 of the payload
+DEFAULT_COMPACT_AFTER = 10_000  # Records appended before the state is snapshotted and the journal emptied
+
+# Event names per table; an insert or update event carries the row in DATA_COLUMNS order, a delete event the key
+INSERT_EVENTS = {'users': 'user_registered', 'cars': 'car_added', 'bookings': 'booking_created'}
+UPDATE_EVENTS = {'users': 'user_updated', 'cars': 'car_updated', 'bookings': 'booking_updated'}
+DELETE_EVENTS = {'users': 'user_deleted', 'cars': 'car_deleted', 'bookings': 'booking_deleted'}
+# A booking whose only change is its status is recorded by booking ID alone
+STATUS_EVENTS = {'Approved': 'booking_approved', 'Rejected': 'booking_rejected'}
+EVENT_TABLES = {event: table for events in (INSERT_EVENTS, UPDATE_EVENTS, DELETE_EVENTS)
+                for table, event in events.items()}
+EVENT_STATUSES = {event: status for status, event in STATUS_EVENTS.items()}
+STATUS_INDEX = TABLE_COLUMNS['bookings'].index('status')
+
+
+class JournalManager:
+    def __init__(self, journal_dir, compact_after=DEFAULT_COMPACT_AFTER, fsync=False):
+        """
+        Args:
+            journal_dir: Directory holding the snapshot and the journal, created if missing
+            compact_after: Records appended before a snapshot is taken (None: only when compact() is called)
+            fsync: Force every record to disk before returning, surviving power loss and not just a crash of the
+                process (like SQLite's synchronous=FULL; the default matches synchronous=NORMAL)
+        """
+        self.journal_dir = journal_dir
+        self.compact_after = compact_after
+        self.fsync = fsync
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._file = None  # journal.log, opened for appending
+        self._size = 0  # Bytes of complete records in journal.log
+        self._seq = 0  # Number of the last record applied
+        self._records = 0  # Records in journal.log since the last snapshot
+        self._rows = {table: {} for table in TABLE_COLUMNS}  # table -> key -> row list in TABLE_COLUMNS order
+        self._approved = {}  # car_id -> IDs of its approved bookings
+        self._ledger = {}  # booking_id -> ledger row of a booking counted in the report totals
+        self._totals = {}  # (grain, month) -> group_key -> [bookings, booked days, revenue in cents]
+        self._backfills = set()  # Names of pending backfills
+        self._archive = {}  # booking_id -> row list of an archived booking
+
+    def _path(self, name):
+        return os.path.join(self.journal_dir, name)
+
+    @timed()
+    def connect(self):
+        """
+        Recover the state from the snapshot and the journal on first use, and open the journal for appending.
+        Called by every other method.
+        """
+        with self._lock:
+            if not self._loaded:
+                os.makedirs(self.journal_dir, exist_ok=True)
+                try:
+                    with open(self._path(SNAPSHOT_FILE), encoding='utf-8') as snapshot_file:
+                        self._load_snapshot(json.load(snapshot_file))
+                except FileNotFoundError:
+                    self._backfills.add(TOTALS_BACKFILL)  # A new journal starts like a freshly migrated database
+                self._replay()
+                self._loaded = True
+            if self._file is None:
+                self._file = open(self._path(JOURNAL_FILE), 'ab')
+                self._size = os.fstat(self._file.fileno()).st_size
+
+    def _load_snapshot(self, snapshot):
+        self._seq = snapshot['seq']
+        for table in TABLE_COLUMNS:
+            self._rows[table] = {row[0]: row for row in snapshot[table]}
+        for row in self._rows['bookings'].values():
+            if row[STATUS_INDEX] == "Approved":
+                self._approved.setdefault(row[2], set()).add(row[0])
+        self._ledger = {row[0]: tuple(row) for row in snapshot['ledger']}
+        for grain, month, key, *totals in snapshot['totals']:
+            self._totals.setdefault((grain, month), {})[key] = totals
+        self._backfills = set(snapshot['backfills'])
+        self._archive = {row[0]: row for row in snapshot.get('archive', ())}  # Absent from older snapshots
+
+    def _replay(self):
+        try:
+            with open(self._path(JOURNAL_FILE), 'rb') as journal_file:
+                data = journal_file.read()
+        except FileNotFoundError:
+            return
+        offset = 0
+        while offset + RECORD_HEADER.size <= len(data):
+            length, checksum = RECORD_HEADER.unpack_from(data, offset)
+            payload = data[offset + RECORD_HEADER.size:offset + RECORD_HEADER.size + length]
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                break
+            seq, events = json.loads(payload)
+            if seq > self._seq:  # Older records are already part of the snapshot
+                for event in events:
+                    self._apply(event)
+                self._seq = seq
+            self._records += 1
+            offset += RECORD_HEADER.size + length
+        if offset < len(data):
+            # Torn tail of an append interrupted by a crash: drop it so new records follow the last complete one
+            with open(self._path(JOURNAL_FILE), 'r+b') as journal_file:
+                journal_file.truncate(offset)
+
+    def _append(self, events):
+        # Write one record, then apply it; callers hold the lock and have validated the events
+        payload = json.dumps([self._seq + 1, events], separators=(',', ':')).encode('utf-8')
+        record = RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+        try:
+            self._file.write(record)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+        except OSError:
+            # E.g. a full disk: cut off what was written, or later records would follow a torn one and be lost
+            self._file.close()
+            self._file = None
+            with open(self._path(JOURNAL_FILE), 'r+b') as journal_file:
+                journal_file.truncate(self._size)
+            raise
+        self._size += len(record)
+        self._seq += 1
+        self._records += 1
+        for event in events:
+            self._apply(event)
+        if self.compact_after is not None and self._records >= self.compact_after:
+            self.compact()
+
+    def _apply(self, event):
+        kind, *args = event
+        table = EVENT_TABLES.get(kind)
+        if kind in DELETE_EVENTS.values():
+            self._remove(table, args[0])
+        elif table is not None:
+            self._put(table, args)
+        elif kind in EVENT_STATUSES:
+            row = self._rows['bookings'][args[0]]
+            self._put('bookings', row[:STATUS_INDEX] + [EVENT_STATUSES[kind]] + row[STATUS_INDEX + 1:-1])
+        elif kind == 'booking_counted':
+            self._count(tuple(args))
+        elif kind == 'booking_uncounted':
+            self._uncount(args[0])
+        elif kind == 'backfill_scheduled':
+            self._backfills.add(args[0])
+        elif kind == 'backfill_finished':
+            self._backfills.discard(args[0])
+        elif kind == 'bookings_archived':
+            for booking_id in args:
+                row = self._rows['bookings'][booking_id]
+                self._remove('bookings', booking_id)
+                self._archive[booking_id] = row
+        else:
+            raise ValueError(f"Unknown journal event: {kind}")
+
+    def _put(self, table, row):
+        # Insert or replace a row; versions advance with every change, as in the database
+        rows = self._rows[table]
+        current = rows.get(row[0])
+        if table == 'bookings':
+            if current is not None and current[STATUS_INDEX] == "Approved":
+                self._approved[current[2]].discard(row[0])
+            if row[STATUS_INDEX] == "Approved":
+                self._approved.setdefault(row[2], set()).add(row[0])
+        rows[row[0]] = list(row) + [0 if current is None else current[-1] + 1]
+
+    def _remove(self, table, key):
+        row = self._rows[table].pop(key, None)
+        if table == 'bookings' and row is not None and row[STATUS_INDEX] == "Approved":
+            self._approved[row[2]].discard(key)
+
+    def _count(self, ledger_row):
+        # Same rule as the database: only approved bookings, and only once
+        booking = self._rows['bookings'].get(ledger_row[0])
+        if booking is None or booking[STATUS_INDEX] != "Approved" or ledger_row[0] in self._ledger:
+            return
+        self._ledger[ledger_row[0]] = ledger_row
+        self._add_totals(ledger_row, 1)
+
+    def _uncount(self, booking_id):
+        ledger_row = self._ledger.pop(booking_id, None)
+        if ledger_row is not None:
+            self._add_totals(ledger_row, -1)
+
+    def _add_totals(self, ledger_row, sign):
+        for grain, key, month, *values in total_changes(ledger_row, sign):
+            totals = self._totals.setdefault((grain, month), {}).setdefault(key, [0, 0, 0])
+            for i, value in enumerate(values):
+                totals[i] += value
+
+    @timed()
+    def compact(self):
+        """
+        Write the current state as the new snapshot and empty the journal.
+        """
+        with self._lock:
+            self.connect()
+            snapshot = {'seq': self._seq, **{table: list(rows.values()) for table, rows in self._rows.items()},
+                        'ledger': list(self._ledger.values()),
+                        'totals': [[grain, month, key, *values] for (grain, month), groups in self._totals.items()
+                                   for key, values in groups.items()],
+                        'backfills': sorted(self._backfills), 'archive': list(self._archive.values())}
+            temporary = self._path(SNAPSHOT_FILE + '.tmp')
+            with open(temporary, 'w', encoding='utf-8') as snapshot_file:
+                json.dump(snapshot, snapshot_file, separators=(',', ':'))
+                snapshot_file.flush()
+                os.fsync(snapshot_file.fileno())
+            os.replace(temporary, self._path(SNAPSHOT_FILE))
+            if self.fsync and hasattr(os, 'O_DIRECTORY'):
+                # Make the rename itself durable (POSIX only)
+                directory = os.open(self.journal_dir, os.O_RDONLY | os.O_DIRECTORY)
+                try:
+                    os.fsync(directory)
+                finally:
+                    os.close(directory)
+            # A crash before the truncate leaves records the snapshot already holds; replay skips them by seq
+            self._file.truncate(0)
+            self._size = self._records = 0
+
+    def data_version(self):
+        """
+        Always the same: no other process writes to the journal, and the manager's own writes don't count.
+        """
+        return 0
+
+    def stream(self, table, column=None, value=None, batch_size=STREAM_BATCH_SIZE, order_by=None):
+        """
+        Rows of a table, like DatabaseManager.stream(). Filtering scans the table in memory.
+
+        Returns:
+            Iterator of row tuples in TABLE_COLUMNS order.
+        """
+        columns = TABLE_COLUMNS[table]
+        with self._lock:
+            self.connect()
+            rows = self._rows[table].values()
+            if column is not None:
+                index = columns.index(column)
+                rows = [row for row in rows if row[index] == value]
+            rows = [tuple(row) for row in rows]
+        if order_by is not None:
+            index = columns.index(order_by)
+            rows.sort(key=lambda row: row[index])
+        return iter(rows)
+
+    def stream_bookings(self, status, start_date=None, end_date=None, car_id=None, customer=None,
+                        batch_size=STREAM_BATCH_SIZE):
+        """
+        Bookings with a status, optionally narrowed like DatabaseManager.stream_bookings(), earliest start first.
+        """
+        start_date = None if start_date is None else format_date(start_date)
+        end_date = None if end_date is None else format_date(end_date)
+        with self._lock:
+            self.connect()
+            rows = [tuple(row) for row in self._rows['bookings'].values()
+                    if row[STATUS_INDEX] == status
+                    and (start_date is None or row[4] > start_date) and (end_date is None or row[3] < end_date)
+                    and (car_id is None or row[2] == car_id) and (customer is None or row[1] == customer)]
+        rows.sort(key=lambda row: (row[3], row[0]))
+        return iter(rows)
+
+    def stream_available_cars(self, start_date, end_date, batch_size=STREAM_BATCH_SIZE):
+        """
+        In-service cars with no approved booking overlapping [start_date, end_date), like
+        DatabaseManager.stream_available_cars(). Scans the cars and bookings in memory.
+        """
+        with self._lock:
+            self.connect()
+            reserved = self._reserved_cars(start_date, end_date)
+            rows = [tuple(row) for row in self._rows['cars'].values() if row[5] and row[0] not in reserved]
+        return iter(rows)
+
+    def free_cars(self, start_date, end_date, make=None, model=None, year=None, limit=None):
+        """
+        Free cars of a class, as DatabaseManager.free_cars(). Scans the cars and bookings in memory.
+        """
+        rental_days = (end_date - start_date).days
+        make, model = make and make.lower(), model and model.lower()
+        with self._lock:
+            self.connect()
+            reserved = self._reserved_cars(start_date, end_date)
+            rows = sorted(tuple(row) for row in self._rows['cars'].values()
+                          if row[5] and row[0] not in reserved and row[6] <= rental_days <= row[7]
+                          and (make is None or row[1].lower() == make) and (model is None or row[2].lower() == model)
+                          and (year is None or row[3] == year))
+        return rows[:limit]
+
+    def _reserved_cars(self, start_date, end_date):
+        # IDs of the cars with an approved booking overlapping [start_date, end_date); the caller holds the lock
+        start_date, end_date = format_date(start_date), format_date(end_date)
+        return {row[2] for row in self._rows['bookings'].values()
+                if row[STATUS_INDEX] == 'Approved' and row[3] < end_date and row[4] > start_date}
+
+    def fetch_one(self, table, key):
+        with self._lock:
+            self.connect()
+            row = self._rows[table].get(key)
+            return None if row is None else tuple(row)
+
+    def count(self, table, column=None, value=None):
+        with self._lock:
+            self.connect()
+            if column is None:
+                return len(self._rows[table])
+            index = TABLE_COLUMNS[table].index(column)
+            return sum(row[index] == value for row in self._rows[table].values())
+
+    def count_by(self, table, column):
+        index = TABLE_COLUMNS[table].index(column)
+        counts = {}
+        with self._lock:
+            self.connect()
+            for row in self._rows[table].values():
+                counts[row[index]] = counts.get(row[index], 0) + 1
+        return counts
+
+    @timed()
+    def bulk_write(self, table, rows, batch_size=BULK_BATCH_SIZE, on_conflict='skip'):
+        """
+        Add rows in chunks, one journal record per chunk, like DatabaseManager.bulk_write().
+
+        Args:
+            table: 'users', 'cars' or 'bookings'
+            rows: Iterable of row tuples in DATA_COLUMNS order
+            batch_size: Rows per record
+            on_conflict: 'skip' keeps an existing row with the same key, 'replace' overwrites it, 'error' raises
+                ValueError
+
+        Returns:
+            Tuple (rows written, rows skipped because of existing keys).
+        """
+        if on_conflict not in ('skip', 'replace', 'error'):
+            raise ValueError(f"Unknown conflict handling: {on_conflict}")
+        written = skipped = 0
+        rows = iter(rows)
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                return written, skipped
+            with self._lock:
+                self.connect()
+                existing = self._rows[table]
+                events, keys = [], set()
+                for row in batch:
+                    if row[0] in existing or row[0] in keys:
+                        if on_conflict == 'error':
+                            raise ValueError(f"{CHANGE_STATEMENTS[table]['noun']} {row[0]} already exists.")
+                        if on_conflict == 'skip':
+                            skipped += 1
+                            continue
+                        events.append([UPDATE_EVENTS[table], *row])
+                    else:
+                        events.append([INSERT_EVENTS[table], *row])
+                    keys.add(row[0])
+                if events and table == 'bookings':
+                    # Written behind the service's back: recount the report totals before the next report
+                    events.append(['backfill_scheduled', TOTALS_BACKFILL])
+                if events:
+                    self._append(events)
+                written += len(keys)
+
+    @timed()
+    def apply_changes(self, changes):
+        """
+        Record a change set collected by the UnitOfWork as one journal record, with the checks of
+        DatabaseManager.apply_changes(): row versions, bookable cars and overlapping approved bookings.
+
+        Raises:
+            ConflictError: If a row was changed, removed or inserted in the meantime, or a booking conflicts. Nothing
+                is recorded in that case.
+        """
+        with self._lock:
+            self.connect()
+            events = self._change_events(changes)
+            if events:
+                self._append(events)
+        for table in TABLE_ORDER:
+            for obj in changes[table]['update']:
+                obj.version += 1
+
+    def _change_events(self, changes):
+        events = []
+        for table in TABLE_ORDER:
+            rows = self._rows[table]
+            to_row = ROW_BUILDERS[table]
+            for obj in changes[table]['insert']:
+                row = to_row(obj)
+                if row[0] in rows:
+                    noun = CHANGE_STATEMENTS[table]['noun']
+                    raise ConflictError(f"{noun} {row[0]} already exists.", table, row[0])
+                events.append([INSERT_EVENTS[table], *row])
+            for obj in changes[table]['update']:
+                row = to_row(obj)
+                current = rows.get(row[0])
+                if current is None or current[-1] != obj.version:
+                    self._raise_stale(table, row[0])
+                if table == 'bookings' and row[:STATUS_INDEX] == tuple(current[:STATUS_INDEX]) \
+                        and row[STATUS_INDEX] in STATUS_EVENTS:
+                    events.append([STATUS_EVENTS[row[STATUS_INDEX]], row[0]])
+                else:
+                    events.append([UPDATE_EVENTS[table], *row])
+        self._check_bookings(changes)
+        # Delete children before parents
+        for table in reversed(TABLE_ORDER):
+            key_attr = CHANGE_STATEMENTS[table]['key']
+            for obj in changes[table]['delete']:
+                key = getattr(obj, key_attr)
+                current = self._rows[table].get(key)
+                if current is None or current[-1] != obj.version:
+                    self._raise_stale(table, key)
+                events.append([DELETE_EVENTS[table], key])
+        for booking_id, ledger_row in changes.get('ledger', {}).items():
+            if ledger_row is None:
+                if booking_id in self._ledger:
+                    events.append(['booking_uncounted', booking_id])
+            else:
+                events.append(['booking_counted', *ledger_row])
+        return events
+
+    def _check_bookings(self, changes):
+        # New and approved bookings need a car in service and must not overlap an approved booking, counting the
+        # approvals of this change set
+        cars = {car.car_id: car.available for car in changes['cars']['insert'] + changes['cars']['update']}
+        bookings = changes['bookings']
+        changed = {booking.booking_id: booking for booking in bookings['insert'] + bookings['update']}
+        approving = {}  # car_id -> bookings approved by this change set
+        for booking in changed.values():
+            if booking.status == "Approved":
+                approving.setdefault(booking.car_id, []).append(booking)
+        for booking in bookings['insert'] + [booking for booking in bookings['update'] if booking.status == "Approved"]:
+            available = cars.get(booking.car_id)
+            if available is None:
+                row = self._rows['cars'].get(booking.car_id)
+                available = row is not None and row[5]
+            if not available:
+                raise ConflictError("Car not found or not available.", 'cars', booking.car_id)
+        reserving = [booking for booking in bookings['insert'] if booking.status != "Rejected"]
+        reserving += [booking for booking in bookings['update'] if booking.status == "Approved"]
+        for booking in reserving:
+            start_date, end_date = format_date(booking.start_date), format_date(booking.end_date)
+            periods = [(format_date(other.start_date), format_date(other.end_date), other.booking_id)
+                       for other in approving.get(booking.car_id, ())]
+            for booking_id in self._approved.get(booking.car_id, ()):
+                if booking_id not in changed:  # Changed bookings were taken into account with their new state
+                    row = self._rows['bookings'][booking_id]
+                    periods.append((row[3], row[4], booking_id))
+            for other_start, other_end, booking_id in periods:
+                if booking_id != booking.booking_id and other_start < end_date and other_end > start_date:
+                    raise ConflictError("Car is already booked for the selected dates.", 'bookings',
+                                        booking.booking_id)
+
+    @staticmethod
+    def _raise_stale(table, key):
+        noun = CHANGE_STATEMENTS[table]['noun']
+        raise ConflictError(f"{noun} {key} was changed by another user in the meantime. Please try again.", table,
+                            key)
+
+    # Booking archive, as in DatabaseManager
+
+    @timed()
+    def archive_bookings(self, before, batch_size=BULK_BATCH_SIZE):
+        """
+        Move bookings that ended on or before a day, and rejected bookings, to the archive, one record per batch.
+        Approved bookings not yet counted in the report totals stay until they are.
+
+        Returns:
+            Number of bookings archived.
+        """
+        before = format_date(before)
+        with self._lock:
+            self.connect()
+            booking_ids = [row[0] for row in self._rows['bookings'].values()
+                           if (row[STATUS_INDEX] == "Rejected" or row[4] <= before)
+                           and (row[STATUS_INDEX] != "Approved" or row[0] in self._ledger)]
+            for start in range(0, len(booking_ids), batch_size):
+                self._append([['bookings_archived', *booking_ids[start:start + batch_size]]])
+        return len(booking_ids)
+
+    def stream_archived_bookings(self, start_date=None, end_date=None, car_id=None, customer=None, status=None,
+                                 batch_size=STREAM_BATCH_SIZE):
+        """
+        Archived bookings, filtered like DatabaseManager.stream_archived_bookings(), earliest start first.
+        """
+        start_date = None if start_date is None else format_date(start_date)
+        end_date = None if end_date is None else format_date(end_date)
+        with self._lock:
+            self.connect()
+            rows = [tuple(row) for row in self._archive.values()
+                    if (start_date is None or row[4] > start_date) and (end_date is None or row[3] < end_date)
+                    and (car_id is None or row[2] == car_id) and (customer is None or row[1] == customer)
+                    and (status is None or row[STATUS_INDEX] == status)]
+        rows.sort(key=lambda row: (row[3], row[0]))
+        return iter(rows)
+
+    def _archived_approved_ids(self):
+        return {booking_id for booking_id, row in self._archive.items() if row[STATUS_INDEX] == "Approved"}
+
+    # Report totals, as in DatabaseManager
+
+    def stream_uncounted_bookings(self, batch_size=STREAM_BATCH_SIZE):
+        with self._lock:
+            self.connect()
+            cars = self._rows['cars']
+            blank = [None] * len(TABLE_COLUMNS['cars'])
+            rows = [tuple(self._rows['bookings'][booking_id] + cars.get(self._rows['bookings'][booking_id][2], blank))
+                    for booking_id in self._approved_ids() - self._ledger.keys()]
+        return iter(rows)
+
+    @timed()
+    def count_bookings(self, ledger_rows, batch_size=BULK_BATCH_SIZE):
+        rows = iter(ledger_rows)
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                return
+            with self._lock:
+                self.connect()
+                self._append([['booking_counted', *row] for row in batch])
+
+    @timed()
+    def uncount_stale_bookings(self):
+        with self._lock:
+            self.connect()
+            approved = self._approved_ids() | self._archived_approved_ids()
+            stale = [booking_id for booking_id in self._ledger if booking_id not in approved]
+            if stale:
+                self._append([['booking_uncounted', booking_id] for booking_id in stale])
+        return len(stale)
+
+    def _approved_ids(self):
+        return set().union(*self._approved.values())
+
+    def backfill_pending(self, name):
+        with self._lock:
+            self.connect()
+            return name in self._backfills
+
+    def finish_backfill(self, name):
+        with self._lock:
+            self.connect()
+            if name in self._backfills:
+                self._append([['backfill_finished', name]])
+
+    def booking_totals(self, grain, group_key='', month=''):
+        with self._lock:
+            self.connect()
+            totals = self._totals.get((grain, month), {}).get(group_key)
+        return (0, 0, 0) if totals is None else tuple(totals)
+
+    def list_booking_totals(self, grain, month=''):
+        with self._lock:
+            self.connect()
+            return [(key, *totals) for key, totals in self._totals.get((grain, month), {}).items() if totals[1]]
+
+    def check_booking_totals(self):
+        """
+        Recompute the report totals from the ledger and compare them, like DatabaseManager.check_booking_totals().
+        """
+        with self._lock:
+            self.connect()
+            approved = self._approved_ids()
+            uncounted = len(approved - self._ledger.keys())
+            stale = len(self._ledger.keys() - approved - self._archived_approved_ids())
+            expected = {}
+            for ledger_row in self._ledger.values():
+                for grain, key, month, *values in total_changes(ledger_row):
+                    totals = expected.setdefault((grain, key, month), [0, 0, 0])
+                    for i, value in enumerate(values):
+                        totals[i] += value
+            actual = {(grain, key, month): values for (grain, month), groups in self._totals.items()
+                      for key, values in groups.items()}
+        zero = [0, 0, 0]
+        mismatched = sorted(key for key in expected.keys() | actual.keys()
+                            if expected.get(key, zero) != actual.get(key, zero))
+        return {'uncounted': uncounted, 'stale': stale, 'mismatched': mismatched}
+
+    def close(self):
+        """
+        Close the journal file. The state stays in memory; the next call reopens the file.
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,165 @@
+# database/migrations.py
+"""
+Versioned schema migrations. The version applied to a database file is kept in SQLite's PRAGMA user_version,
+so each migration runs exactly once per file, in order, inside its own transaction.
+"""
+
+# (version, description, statements). Append new migrations; never edit one that has shipped.
+MIGRATIONS = (
+    (1, "initial schema", (
+        '''
+        CREATE TABLE IF NOT EXISTS users (
+            username TEXT PRIMARY KEY,
+            password TEXT,
+            role TEXT
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS cars (
+            car_id TEXT PRIMARY KEY,
+            make TEXT,
+            model TEXT,
+            year INTEGER,
+            mileage INTEGER,
+            available BOOLEAN,
+            min_rent_period INTEGER,
+            max_rent_period INTEGER
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS bookings (
+            booking_id TEXT PRIMARY KEY,
+            customer_username TEXT,
+            car_id TEXT,
+            start_date TEXT,
+            end_date TEXT,
+            status TEXT,
+            FOREIGN KEY (customer_username) REFERENCES users(username),
+            FOREIGN KEY (car_id) REFERENCES cars(car_id)
+        )
+        ''',
+    )),
+    (2, "secondary indexes for filtered queries", (
+        # In-service cars by year, then mileage: serves recommendations in ranking order
+        'CREATE INDEX IF NOT EXISTS idx_cars_available_year_mileage ON cars (available, year, mileage)',
+        # Reservations of one car by date: serves overlap checks and per-car loading
+        'CREATE INDEX IF NOT EXISTS idx_bookings_car_dates ON bookings (car_id, start_date, end_date)',
+        # Approved bookings only, by end date: the availability probe skips past history and never reads the table
+        "CREATE INDEX IF NOT EXISTS idx_bookings_reserved ON bookings (car_id, end_date, start_date) "
+        "WHERE status = 'Approved'",
+        'CREATE INDEX IF NOT EXISTS idx_bookings_status ON bookings (status)',
+        'CREATE INDEX IF NOT EXISTS idx_bookings_customer ON bookings (customer_username)',
+        'ANALYZE',
+    )),
+    (3, "row versions for optimistic concurrency", (
+        # Bumped by every update; writers only change a row if it still has the version they read
+        'ALTER TABLE users ADD COLUMN version INTEGER NOT NULL DEFAULT 0',
+        'ALTER TABLE cars ADD COLUMN version INTEGER NOT NULL DEFAULT 0',
+        'ALTER TABLE bookings ADD COLUMN version INTEGER NOT NULL DEFAULT 0',
+    )),
+    (4, "pending bookings by start date", (
+        # Requests waiting for review in the order bulk review decides them, without sorting the whole table
+        "CREATE INDEX IF NOT EXISTS idx_bookings_pending ON bookings (start_date, booking_id) "
+        "WHERE status = 'Pending'",
+    )),
+    (5, "booking totals for reports", (
+        # Approved bookings summed per car, make and the whole fleet, per month ('YYYY-MM') and overall (''):
+        # bookings and revenue count in the month a rental starts, booked days in the month they fall in
+        '''
+        CREATE TABLE IF NOT EXISTS booking_totals (
+            grain TEXT NOT NULL,
+            group_key TEXT NOT NULL,
+            month TEXT NOT NULL,
+            bookings INTEGER NOT NULL DEFAULT 0,
+            booked_days INTEGER NOT NULL DEFAULT 0,
+            revenue_cents INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (grain, group_key, month)
+        ) WITHOUT ROWID
+        ''',
+        # What each approved booking was counted with, so un-approving it subtracts exactly that
+        '''
+        CREATE TABLE IF NOT EXISTS booking_ledger (
+            booking_id TEXT PRIMARY KEY,
+            car_id TEXT NOT NULL,
+            make TEXT NOT NULL,
+            start_date TEXT NOT NULL,
+            end_date TEXT NOT NULL,
+            revenue_cents INTEGER NOT NULL
+        )
+        ''',
+        # Data migrations the application finishes itself because they need more than SQL, e.g. prices
+        'CREATE TABLE IF NOT EXISTS pending_backfills (name TEXT PRIMARY KEY)',
+        "INSERT OR IGNORE INTO pending_backfills (name) VALUES ('booking_totals')",
+        # Cars per make, the capacity a make's utilization is measured against
+        'CREATE INDEX IF NOT EXISTS idx_cars_make ON cars (make)',
+    )),
+    (6, "booking archive", (
+        # Finished and rejected bookings moved out of the working set; same columns as bookings
+        '''
+        CREATE TABLE IF NOT EXISTS bookings_archive (
+            booking_id TEXT PRIMARY KEY,
+            customer_username TEXT,
+            car_id TEXT,
+            start_date TEXT,
+            end_date TEXT,
+            status TEXT,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+        ''',
+        # History queries: per customer, per car, or over all bookings by date
+        'CREATE INDEX IF NOT EXISTS idx_archive_customer ON bookings_archive (customer_username, start_date)',
+        'CREATE INDEX IF NOT EXISTS idx_archive_car ON bookings_archive (car_id, start_date)',
+        'CREATE INDEX IF NOT EXISTS idx_archive_start ON bookings_archive (start_date, booking_id)',
+        # Bookings that have ended, found by the archive sweep without scanning the table
+        'CREATE INDEX IF NOT EXISTS idx_bookings_end ON bookings (end_date)',
+    )),
+)
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(connection):
+    return connection.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(connection, target=SCHEMA_VERSION):
+    """
+    Bring a database up to the target schema version.
+
+    Args:
+        connection: sqlite3.Connection to migrate
+        target: Version to stop at (optional, defaults to the latest)
+
+    Returns:
+        List of the versions that were applied, empty if the database was already current.
+
+    Raises:
+        ValueError: If the database was written by a newer version of the application.
+
+    Several processes may open the same database at once: each step takes the write lock before reading the
+    version, so a step another process has applied in the meantime is skipped rather than run twice.
+    """
+    current = schema_version(connection)
+    if current > SCHEMA_VERSION:
+        raise ValueError(f"Database schema version {current} is newer than this application ({SCHEMA_VERSION}).")
+    applied = []
+    for version, description, statements in MIGRATIONS:
+        if version <= current or version > target:
+            continue
+        # Explicit BEGIN: sqlite3 would otherwise autocommit each DDL statement on its own. IMMEDIATE takes the
+        # write lock up front (waiting out the busy timeout), instead of failing to upgrade a read lock later.
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            current = schema_version(connection)  # Another process may have migrated while we waited
+            if version <= current:
+                connection.rollback()
+                continue
+            for statement in statements:
+                connection.execute(statement)
+            connection.execute(f'PRAGMA user_version = {int(version)}')
+        except Exception:
+            connection.rollback()
+            raise
+        connection.commit()
+        applied.append(version)
+    return applied
@@ -0,0 +1,410 @@
+# database/sharded_manager.py
+"""
+Sharded storage: cars and bookings partitioned across several SQLite files, with the DatabaseManager interface.
+
+A car and all of its bookings (with their report ledger rows) live in the same shard, chosen by a placement function
+of the car_id; by default a hash of it. Users are not partitioned and live in the first shard, the home shard.
+Every shard has the full schema, so each is an ordinary database a DatabaseManager can open.
+
+Lookups by car_id go to one shard. Everything else is asked of every shard and the answers are merged: counts and
+report totals are added up, sorted results are merged in order. The search queries of query mode 'sql' - available
+cars, recommendations and booking searches - run on a process pool, one shard per worker at a time, so a large fleet
+is searched on several cores at once.
+
+A change set is written in one transaction per shard it touches. The transactions are opened in shard order, so two
+writers never wait on each other, and all are rolled back if any check fails; they are committed one after another,
+so a crash between two commits can leave a change set written to only some shards.
+
+The placement must stay the same for the life of the files: a shard directory is created with a number of shards
+and always opened with that number.
+"""
+import functools
+import glob
+import heapq
+import multiprocessing
+import os
+import threading
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from itertools import chain, islice, repeat
+from operator import itemgetter
+
+from src.database.database_manager import (BULK_BATCH_SIZE, DATA_COLUMNS, LEDGER_COLUMNS, STREAM_BATCH_SIZE,
+                                           TABLE_COLUMNS, DatabaseManager, advance_versions)
+from src.database.unit_of_work import TABLE_ORDER
+from src.utils.instrumentation import timed
+
+DEFAULT_SHARDS = 4  # Shards of a new shard directory
+SHARD_FILE = 'shard-{}.db'
+HOME_SHARD = 0  # Holds the users
+
+# Position of the car_id that places a row
+CAR_INDEX = {table: DATA_COLUMNS[table].index('car_id') for table in ('cars', 'bookings')}
+LEDGER_CAR_INDEX = LEDGER_COLUMNS.index('car_id')
+MILEAGE_INDEX = TABLE_COLUMNS['cars'].index('mileage')
+YEAR_INDEX = TABLE_COLUMNS['cars'].index('year')
+BOOKING_ORDER = itemgetter(TABLE_COLUMNS['bookings'].index('start_date'),
+                           TABLE_COLUMNS['bookings'].index('booking_id'))  # stream_bookings order
+
+
+def hash_placement(car_id, shards):
+    """
+    Default placement: a stable hash of the car_id (unlike hash(), the same in every process and run).
+    """
+    return zlib.crc32(str(car_id).encode()) % shards
+
+
+def shard_paths(directory, count=None):
+    """
+    Paths of the shard files in a directory: the existing ones, or count new ones if there are none yet.
+
+    Raises:
+        ValueError: If count differs from the number of existing shards, or shard files are missing.
+    """
+    existing = glob.glob(os.path.join(directory, SHARD_FILE.format('*')))
+    if not existing:
+        os.makedirs(directory, exist_ok=True)
+        return [os.path.join(directory, SHARD_FILE.format(i)) for i in range(count or DEFAULT_SHARDS)]
+    paths = [os.path.join(directory, SHARD_FILE.format(i)) for i in range(len(existing))]
+    if sorted(existing) != sorted(paths):
+        raise ValueError(f"Shard files missing in {directory}.")
+    if count is not None and count != len(paths):
+        raise ValueError(f"{directory} holds {len(paths)} shards, not {count}; cars cannot be moved between shards.")
+    return paths
+
+
+# Shards opened by a worker process of the pool, by path
+_worker_shards = {}
+
+
+def _query_shard(db_path, method, args):
+    # Runs in a worker process: one DatabaseManager per shard file, kept for the life of the worker
+    manager = _worker_shards.get(db_path)
+    if manager is None:
+        manager = _worker_shards[db_path] = DatabaseManager(db_path)
+    return list(getattr(manager, method)(*args))
+
+
+def _recommendation_key(row):
+    # recommend_cars order: lowest mileage, then newest year, then car_id
+    return row[MILEAGE_INDEX], -row[YEAR_INDEX], row[0]
+
+
+class ShardedDatabaseManager:
+    def __init__(self, paths, placement=None, workers=None, pool_size=1, pragmas=None):
+        """
+        Args:
+            paths: Database file of each shard, e.g. from shard_paths(); the first one also holds the users
+            placement: Function (car_id, number of shards) -> index of the shard holding the car and its bookings
+                (optional, defaults to hash_placement)
+            workers: Processes searching shards in parallel (optional, defaults to one per shard up to the number
+                of CPUs; 0 searches the shards one after another in this process)
+            pool_size: Connections per shard kept open for multi-threaded callers
+            pragmas: SQLite pragmas applied to every shard, as for DatabaseManager
+        """
+        if not paths:
+            raise ValueError("At least one shard is needed.")
+        self.paths = list(paths)
+        self.shards = [DatabaseManager(path, pool_size=pool_size, pragmas=pragmas) for path in self.paths]
+        self.home = self.shards[HOME_SHARD]
+        self.placement = placement or hash_placement
+        if workers is None:
+            workers = min(len(self.shards), os.cpu_count() or 1)
+        self.workers = workers if len(self.shards) > 1 else 0
+        self._executor = None  # Started by the first parallel search
+        self._executor_lock = threading.Lock()
+
+    def shard_of(self, car_id):
+        """
+        Index of the shard holding a car and its bookings.
+        """
+        return self.placement(car_id, len(self.shards))
+
+    def _shards_for(self, table, column=None, value=None):
+        # Shards that can hold rows of a table where column = value
+        if table == 'users':
+            return [self.home]
+        if column == 'car_id':
+            return [self.shards[self.shard_of(value)]]
+        return self.shards
+
+    def _pool(self):
+        with self._executor_lock:
+            if self._executor is None:
+                # Spawned, not forked: a fork would copy this process's open connections and threads
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def _search(self, method, *args):
+        # Run a DatabaseManager search on every shard, in parallel on the pool if there is one; a list per shard
+        if not self.workers:
+            return [list(getattr(shard, method)(*args)) for shard in self.shards]
+        return list(self._pool().map(_query_shard, self.paths, repeat(method), repeat(args)))
+
+    def connect(self):
+        for shard in self.shards:
+            shard.connect()
+
+    def data_version(self):
+        """
+        Change counter over all shards; each shard's only ever grows, so the sum changes whenever one does.
+        """
+        return sum(shard.data_version() for shard in self.shards)
+
+    @timed()
+    def load_users(self):
+        return self.home.load_users()
+
+    @timed()
+    def load_cars(self):
+        return [row for shard in self.shards for row in shard.load_cars()]
+
+    @timed()
+    def load_bookings(self):
+        return [row for shard in self.shards for row in shard.load_bookings()]
+
+    def stream(self, table, column=None, value=None, batch_size=STREAM_BATCH_SIZE, order_by=None):
+        """
+        Stream rows of a table from the shards that can hold them, as DatabaseManager.stream() does. With order_by
+        the shards' sorted streams are merged.
+        """
+        streams = [shard.stream(table, column, value, batch_size, order_by)
+                   for shard in self._shards_for(table, column, value)]
+        if order_by is None or len(streams) == 1:
+            return chain.from_iterable(streams)
+        return heapq.merge(*streams, key=itemgetter(TABLE_COLUMNS[table].index(order_by)))
+
+    @timed()
+    def stream_available_cars(self, start_date, end_date, batch_size=STREAM_BATCH_SIZE):
+        """
+        In-service cars free for [start_date, end_date), searched on every shard in parallel.
+        """
+        return chain.from_iterable(self._search('stream_available_cars', start_date, end_date, batch_size))
+
+    @timed()
+    def stream_bookings(self, status, start_date=None, end_date=None, car_id=None, customer=None,
+                        batch_size=STREAM_BATCH_SIZE):
+        """
+        Bookings with a status, filtered as DatabaseManager.stream_bookings() does, earliest start first. The
+        bookings of one car are read from its shard, other searches run on every shard in parallel.
+        """
+        if car_id is not None:
+            return self.shards[self.shard_of(car_id)].stream_bookings(status, start_date, end_date, car_id, customer,
+                                                                      batch_size)
+        results = self._search('stream_bookings', status, start_date, end_date, None, customer, batch_size)
+        return heapq.merge(*results, key=BOOKING_ORDER)
+
+    @timed()
+    def recommend_cars(self, start_date, end_date, year=None, max_mileage=None, limit=None, offset=0):
+        """
+        Best-ranked free cars, as DatabaseManager.recommend_cars(). Every shard returns its best offset + limit
+        matches in parallel, and the page is cut from their merge.
+        """
+        per_shard = None if limit is None else offset + limit
+        results = self._search('recommend_cars', start_date, end_date, year, max_mileage, per_shard, 0)
+        merged = heapq.merge(*results, key=_recommendation_key)
+        return list(islice(merged, offset, per_shard))
+
+    @timed()
+    def free_cars(self, start_date, end_date, make=None, model=None, year=None, limit=None):
+        """
+        Free cars of a class, as DatabaseManager.free_cars(). Every shard returns its first matches in parallel,
+        and they are merged by car_id.
+        """
+        results = self._search('free_cars', start_date, end_date, make, model, year, limit)
+        return list(islice(heapq.merge(*results), limit))
+
+    @timed()
+    def fetch_one(self, table, key):
+        if table == 'bookings':
+            # Bookings are placed by their car, so one by ID can be in any shard
+            return next((row for row in (shard.fetch_one(table, key) for shard in self.shards) if row is not None),
+                        None)
+        return self._shards_for(table, 'car_id' if table == 'cars' else None, key)[0].fetch_one(table, key)
+
+    @timed()
+    def count(self, table, column=None, value=None):
+        return sum(shard.count(table, column, value) for shard in self._shards_for(table, column, value))
+
+    @timed()
+    def count_by(self, table, column):
+        counts = {}
+        for shard in self._shards_for(table):
+            for value, count in shard.count_by(table, column).items():
+                counts[value] = counts.get(value, 0) + count
+        return counts
+
+    def _by_shard(self, rows, car_index):
+        # Rows grouped by the shard of the car_id at row[car_index], in shard order
+        groups = {}
+        for row in rows:
+            groups.setdefault(self.shard_of(row[car_index]), []).append(row)
+        return sorted(groups.items())
+
+    @timed()
+    def bulk_write(self, table, rows, batch_size=BULK_BATCH_SIZE, on_conflict='skip'):
+        """
+        Insert rows into the shards that hold them, batch_size input rows at a time, as DatabaseManager.bulk_write().
+
+        Returns:
+            Tuple (rows written, rows skipped because of existing keys).
+        """
+        if table == 'users':
+            return self.home.bulk_write(table, rows, batch_size, on_conflict)
+        written = skipped = 0
+        rows = iter(rows)
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                return written, skipped
+            for index, shard_rows in self._by_shard(batch, CAR_INDEX[table]):
+                shard_written, shard_skipped = self.shards[index].bulk_write(table, shard_rows, batch_size, on_conflict)
+                written += shard_written
+                skipped += shard_skipped
+
+    @timed()
+    def save_users(self, users):
+        self.home.save_users(users)
+
+    @timed()
+    def save_cars(self, cars):
+        for index, shard_cars in self._by_objects(cars):
+            self.shards[index].save_cars(shard_cars)
+
+    @timed()
+    def save_bookings(self, bookings):
+        for index, shard_bookings in self._by_objects(bookings):
+            self.shards[index].save_bookings(shard_bookings)
+
+    def _by_objects(self, objects):
+        groups = {}
+        for obj in objects:
+            groups.setdefault(self.shard_of(obj.car_id), []).append(obj)
+        return sorted(groups.items())
+
+    def _split_changes(self, changes):
+        # Change set -> {shard index: the part of it that shard holds}
+        parts = {}
+
+        def part(index):
+            if index not in parts:
+                parts[index] = {table: {'insert': [], 'update': [], 'delete': []} for table in TABLE_ORDER}
+                parts[index]['ledger'] = {}
+            return parts[index]
+
+        for kind, users in changes['users'].items():
+            if users:
+                part(HOME_SHARD)['users'][kind].extend(users)
+        booking_shards = {}
+        for table in ('cars', 'bookings'):
+            for kind, objects in changes[table].items():
+                for obj in objects:
+                    index = self.shard_of(obj.car_id)
+                    part(index)[table][kind].append(obj)
+                    if table == 'bookings':
+                        booking_shards[obj.booking_id] = index
+        for booking_id, ledger_row in changes.get('ledger', {}).items():
+            if ledger_row is not None:
+                part(self.shard_of(ledger_row[LEDGER_CAR_INDEX]))['ledger'][booking_id] = ledger_row
+            elif booking_id in booking_shards:
+                part(booking_shards[booking_id])['ledger'][booking_id] = None
+            else:
+                # Not known which shard counted it; un-counting is a no-op where there is no ledger row
+                for index in range(len(self.shards)):
+                    part(index)['ledger'][booking_id] = None
+        return parts
+
+    @timed()
+    def apply_changes(self, changes):
+        """
+        Write a change set collected by the UnitOfWork, checked as DatabaseManager.apply_changes() does, in one
+        transaction per shard it touches.
+
+        Raises:
+            ConflictError: If a row was changed, removed or inserted by someone else, or a booking conflicts.
+                Nothing is written to any shard in that case.
+        """
+        parts = self._split_changes(changes)
+        with ExitStack() as transactions:
+            for index in sorted(parts):
+                shard = self.shards[index]
+                shard.write_changes(transactions.enter_context(shard.write_transaction()), parts[index])
+        advance_versions(changes)
+
+    @timed()
+    def archive_bookings(self, before, batch_size=BULK_BATCH_SIZE):
+        """
+        Archive finished and rejected bookings in every shard; a booking's archive row stays in its car's shard.
+        """
+        return sum(shard.archive_bookings(before, batch_size) for shard in self.shards)
+
+    def stream_archived_bookings(self, start_date=None, end_date=None, car_id=None, customer=None, status=None,
+                                 batch_size=STREAM_BATCH_SIZE):
+        shards = [self.shards[self.shard_of(car_id)]] if car_id is not None else self.shards
+        return heapq.merge(*(shard.stream_archived_bookings(start_date, end_date, car_id, customer, status, batch_size)
+                             for shard in shards), key=BOOKING_ORDER)
+
+    def stream_uncounted_bookings(self, batch_size=STREAM_BATCH_SIZE):
+        return chain.from_iterable(shard.stream_uncounted_bookings(batch_size) for shard in self.shards)
+
+    @timed()
+    def count_bookings(self, ledger_rows, batch_size=BULK_BATCH_SIZE):
+        rows = iter(ledger_rows)
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                return
+            for index, shard_rows in self._by_shard(batch, LEDGER_CAR_INDEX):
+                self.shards[index].count_bookings(shard_rows, batch_size)
+
+    @timed()
+    def uncount_stale_bookings(self):
+        return sum(shard.uncount_stale_bookings() for shard in self.shards)
+
+    def backfill_pending(self, name):
+        return any(shard.backfill_pending(name) for shard in self.shards)
+
+    def finish_backfill(self, name):
+        for shard in self.shards:
+            shard.finish_backfill(name)
+
+    @timed()
+    def booking_totals(self, grain, group_key='', month=''):
+        """
+        Report totals of one group: a car's from its shard, a make's or the fleet's added up over the shards.
+        """
+        shards = [self.shards[self.shard_of(group_key)]] if grain == 'car' else self.shards
+        return tuple(map(sum, zip(*(shard.booking_totals(grain, group_key, month) for shard in shards))))
+
+    @timed()
+    def list_booking_totals(self, grain, month=''):
+        totals = {}
+        for shard in self.shards:
+            for group_key, *values in shard.list_booking_totals(grain, month):
+                current = totals.get(group_key)
+                totals[group_key] = values if current is None else [a + b for a, b in zip(current, values)]
+        return [(group_key, *values) for group_key, values in totals.items()]
+
+    def check_booking_totals(self):
+        """
+        Recompute every shard's report totals and compare them with the maintained ones.
+
+        Returns:
+            Dictionary as DatabaseManager.check_booking_totals(), summed over the shards.
+        """
+        checks = [shard.check_booking_totals() for shard in self.shards]
+        return {'uncounted': sum(check['uncounted'] for check in checks),
+                'stale': sum(check['stale'] for check in checks),
+                'mismatched': sorted(functools.reduce(set.union, (set(check['mismatched']) for check in checks)))}
+
+    def close(self):
+        """
+        Close every shard's connections and stop the worker processes. Both are started again on demand.
+        """
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+        for shard in self.shards:
+            shard.close()
@@ -0,0 +1,168 @@
+# database/unit_of_work.py
+from src.models.user import User
+from src.models.car import Car
+from src.models.booking import Booking
+
+# Table name and primary key attribute for every tracked model class
+TRACKED_MODELS = {
+    User: ('users', 'username'),
+    Car: ('cars', 'car_id'),
+    Booking: ('bookings', 'booking_id'),
+}
+
+# Order in which tables are written; deletes are applied in reverse order
+TABLE_ORDER = ('users', 'cars', 'bookings')
+
+
+class UnitOfWork:
+    """
+    Track new, modified and deleted User/Car/Booking objects so that only those rows are written on commit.
+    """
+
+    def __init__(self):
+        self.new = {}  # (table, key) -> object inserted since the last commit
+        self.dirty = {}  # (table, key) -> object modified since the last commit
+        self.deleted = {}  # (table, key) -> object deleted since the last commit
+        self.ledger = {}  # booking_id -> ledger row to add to the report totals, or None to take it out
+
+    @staticmethod
+    def _identity(obj):
+        table, key_attr = TRACKED_MODELS[type(obj)]
+        return table, getattr(obj, key_attr)
+
+    def register_new(self, obj):
+        """
+        Mark an object as newly created.
+
+        Args:
+            obj: User, Car or Booking object
+        """
+        identity = self._identity(obj)
+        self.deleted.pop(identity, None)
+        self.new[identity] = obj
+
+    def register_dirty(self, obj):
+        """
+        Mark an object as modified. Objects that are still new are written by their insert.
+
+        Args:
+            obj: User, Car or Booking object
+        """
+        identity = self._identity(obj)
+        if identity not in self.new and identity not in self.deleted:
+            self.dirty[identity] = obj
+
+    def register_deleted(self, obj):
+        """
+        Mark an object as deleted. Objects that were never written are simply forgotten.
+
+        Args:
+            obj: User, Car or Booking object
+        """
+        identity = self._identity(obj)
+        self.dirty.pop(identity, None)
+        if self.new.pop(identity, None) is None:
+            self.deleted[identity] = obj
+
+    def register_counted(self, booking_id, ledger_row):
+        """
+        Add an approved booking to the report totals when the changes are written.
+
+        Args:
+            booking_id: Booking ID
+            ledger_row: Row in DatabaseManager LEDGER_COLUMNS order
+        """
+        self.ledger.pop(booking_id, None)  # Keep registrations in order, the latest one wins
+        self.ledger[booking_id] = ledger_row
+
+    def register_uncounted(self, booking_id):
+        """
+        Take a booking that is no longer approved out of the report totals when the changes are written.
+        """
+        self.ledger.pop(booking_id, None)
+        self.ledger[booking_id] = None
+
+    def has_changes(self):
+        return bool(self.new or self.dirty or self.deleted or self.ledger)
+
+    def collect(self):
+        """
+        Take the pending changes and reset the tracker.
+
+        Returns:
+            Dictionary mapping table name to {'insert': [...], 'update': [...], 'delete': [...]} object lists,
+            and 'ledger' to the report totals changes.
+        """
+        changes = {table: {'insert': [], 'update': [], 'delete': []} for table in TABLE_ORDER}
+        for kind, tracked in (('insert', self.new), ('update', self.dirty), ('delete', self.deleted)):
+            for (table, _), obj in tracked.items():
+                changes[table][kind].append(obj)
+        changes['ledger'] = self.ledger
+        self.clear()
+        return changes
+
+    def restore(self, changes):
+        """
+        Put collected changes back, e.g. after a failed commit, without overriding newer registrations.
+
+        Args:
+            changes: Change set previously returned by collect()
+        """
+        for table in TABLE_ORDER:
+            for obj in changes[table]['insert']:
+                self.new.setdefault(self._identity(obj), obj)
+            for obj in changes[table]['update']:
+                self.register_dirty(obj)
+            for obj in changes[table]['delete']:
+                self.deleted.setdefault(self._identity(obj), obj)
+        for booking_id, ledger_row in changes.get('ledger', {}).items():
+            self.ledger.setdefault(booking_id, ledger_row)
+
+    def merge(self, changes):
+        """
+        Add a change set collected later than the pending changes on top of them, as if its objects had been
+        registered here: an object updated twice is written once, an object created and deleted is never written.
+
+        Args:
+            changes: Change set returned by collect()
+        """
+        for table in TABLE_ORDER:
+            for obj in changes[table]['insert']:
+                self.register_new(obj)
+            for obj in changes[table]['update']:
+                self.register_dirty(obj)
+            for obj in changes[table]['delete']:
+                self.register_deleted(obj)
+        for booking_id, ledger_row in changes.get('ledger', {}).items():
+            if ledger_row is None:
+                self.register_uncounted(booking_id)
+            else:
+                self.register_counted(booking_id, ledger_row)
+
+    def size(self):
+        """
+        Number of rows the pending changes write.
+        """
+        return len(self.new) + len(self.dirty) + len(self.deleted) + len(self.ledger)
+
+    def commit(self, db_manager):
+        """
+        Write all pending changes to the database in a single transaction.
+
+        Args:
+            db_manager: DatabaseManager used to apply the changes
+        """
+        if not self.has_changes():
+            return
+        changes = self.collect()
+        try:
+            db_manager.apply_changes(changes)
+        except Exception:
+            self.restore(changes)
+            raise
+
+    def clear(self):
+        self.new = {}
+        self.dirty = {}
+        self.deleted = {}
+        self.ledger = {}
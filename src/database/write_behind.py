@@ -0,0 +1,199 @@
+# database/write_behind.py
+"""
+Write-behind persistence: change sets are queued and committed by a background thread, so saving returns at once.
+
+Queued change sets are merged into one pending UnitOfWork, so a row changed several times between commits is written
+once. The writer commits everything pending in one transaction (a group commit) when the oldest queued change has
+waited flush_interval seconds, or as soon as flush_rows rows are pending, whichever comes first.
+
+What a crash can lose is bounded by the durability level chosen by the caller (see DURABILITY_LEVELS in
+src/system/rental_service.py): with write-behind, the changes of the last flush_interval seconds.
+"""
+import threading
+import time
+
+from src.database.database_manager import ConflictError
+from src.database.unit_of_work import UnitOfWork
+from src.utils.instrumentation import metrics, timed
+
+DEFAULT_FLUSH_INTERVAL = 0.1  # Seconds a change may wait before it is committed
+DEFAULT_FLUSH_ROWS = 1000  # Pending rows that trigger a commit before the interval is up
+RETRY_INTERVAL = 1.0  # Seconds before a commit that failed for another reason than a conflict is retried
+
+
+class WriteBehind:
+    """
+    Background writer committing queued change sets in groups. Methods are thread-safe.
+    """
+
+    def __init__(self, db_manager, flush_interval=DEFAULT_FLUSH_INTERVAL, flush_rows=DEFAULT_FLUSH_ROWS,
+                 clock=time.monotonic):
+        """
+        Args:
+            db_manager: DatabaseManager whose apply_changes() writes the groups
+            flush_interval: Longest time in seconds a queued change waits before being committed
+            flush_rows: Number of pending rows that triggers a commit right away
+            clock: Function returning the current time in seconds
+        """
+        if flush_interval <= 0:
+            raise ValueError("flush_interval must be positive.")
+        if flush_rows < 1:
+            raise ValueError("flush_rows must be at least 1.")
+        self.db_manager = db_manager
+        self.flush_interval = flush_interval
+        self.flush_rows = flush_rows
+        self.clock = clock
+        self._condition = threading.Condition()
+        self._pending = UnitOfWork()  # Queued changes, merged
+        self._oldest = None  # When the oldest pending change was queued
+        self._committing = False  # A group is being written
+        self._error = None  # ConflictError of a group that could not be written, until taken
+        self._retry_at = None  # When a group that failed with another error is tried again
+        self._stopping = False
+        self._thread = None
+        self.commits = self.rows_written = 0
+
+    def _start(self):
+        # Called with the condition held; the thread starts with the first change
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+            self._thread.start()
+
+    def submit(self, changes):
+        """
+        Queue a change set collected by a UnitOfWork.
+        """
+        with self._condition:
+            if self._stopping:
+                raise RuntimeError("The write-behind writer is closed.")
+            self._pending.merge(changes)
+            first = self._oldest is None
+            if first:
+                self._oldest = self.clock()
+            self._start()
+            if first or self._pending.size() >= self.flush_rows:
+                self._condition.notify_all()  # The writer sleeps until there is something to wait for
+
+    def pending(self):
+        """
+        Whether changes are queued or being written.
+        """
+        with self._condition:
+            return self._pending.has_changes() or self._committing
+
+    def take_error(self):
+        """
+        The ConflictError of a group that could not be written, if any, and forget it. The group is dropped, and
+        so is everything queued after it, since it may build on the dropped changes; the caller reloads its data.
+        """
+        with self._condition:
+            error, self._error = self._error, None
+            if error is not None:
+                self._pending.clear()
+                self._oldest = None
+            return error
+
+    def flush(self):
+        """
+        Commit everything queued so far and wait for it.
+
+        Raises:
+            ConflictError: If a group could not be written (also reported by take_error()).
+            Exception: The last error of a group that keeps failing for another reason, e.g. a locked database.
+        """
+        with self._condition:
+            while True:
+                while self._committing:
+                    self._condition.wait()
+                if self._error is not None:
+                    raise self.take_error()
+                if not self._pending.has_changes():
+                    return
+                self._commit_locked()
+
+    def _commit_locked(self):
+        # Write the pending group from the calling thread; the condition is held, and released while writing
+        while self._committing:
+            self._condition.wait()
+        if not self._pending.has_changes():
+            return
+        changes = self._pending.collect()
+        self._oldest = None
+        self._committing = True
+        self._condition.release()
+        try:
+            self._write(changes)
+        finally:
+            self._condition.acquire()
+            self._committing = False
+            self._condition.notify_all()
+
+    @timed()
+    def _write(self, changes):
+        rows = sum(len(objects) for table, kinds in changes.items() if table != 'ledger'
+                   for objects in kinds.values()) + len(changes.get('ledger', {}))
+        try:
+            self.db_manager.apply_changes(changes)
+        except ConflictError as error:
+            with self._condition:
+                self._error = error
+            metrics.increment('write_behind_conflicts')
+            return
+        except Exception:
+            with self._condition:
+                self._pending.restore(changes)
+                self._oldest = self._oldest or self.clock()
+                self._retry_at = self.clock() + RETRY_INTERVAL
+            metrics.increment('write_behind_retries')
+            raise
+        with self._condition:
+            self._retry_at = None
+            self.commits += 1
+            self.rows_written += rows
+        metrics.increment('write_behind_commits')
+        metrics.increment('write_behind_rows', rows)
+
+    def _due(self):
+        # Seconds until the pending group must be written (0: now), None if nothing is pending
+        if not self._pending.has_changes() or self._committing or self._error is not None:
+            return None
+        if self._stopping:
+            return 0
+        if self._retry_at is not None:
+            return max(0, self._retry_at - self.clock())
+        if self._pending.size() >= self.flush_rows:
+            return 0
+        return max(0, self._oldest + self.flush_interval - self.clock())
+
+    def _run(self):
+        with self._condition:
+            while True:
+                due = self._due()
+                if due is None and self._stopping:
+                    return
+                if due is None or due > 0:
+                    self._condition.wait(due)
+                    continue
+                try:
+                    self._commit_locked()
+                except Exception:
+                    if self._stopping:
+                        return  # close() is raising it
+                    # Otherwise kept pending and retried after RETRY_INTERVAL; flush() raises it to its caller
+
+    def close(self):
+        """
+        Write what is still queued and stop the writer thread.
+
+        Raises:
+            ConflictError or another exception, as flush() does, if the last changes could not be written.
+        """
+        try:
+            self.flush()
+        finally:
+            with self._condition:
+                self._stopping = True
+                self._condition.notify_all()
+                thread = self._thread
+            if thread is not None:
+                thread.join()
@@ -1,4 +1,14 @@
+import argparse
+
+from src.database.database_manager import DatabaseManager
+from src.database.journal_manager import JournalManager
+from src.database.sharded_manager import ShardedDatabaseManager, shard_paths
+from src.database.write_behind import DEFAULT_FLUSH_INTERVAL, DEFAULT_FLUSH_ROWS, WriteBehind
 from src.system.car_rental_system import CarRentalSystem
+from src.system.pricing import PricingEngine, RateTable
+from src.system.query_cache import DEFAULT_MAX_ENTRIES, DEFAULT_TTL, QueryCache
+from src.system.rental_service import DURABILITY_LEVELS
+from src.utils.instrumentation import metrics
 
 
 def display_welcome_banner():
@@ -12,7 +22,88 @@ def display_welcome_banner():
     print(r"       CarRentalSystem          ")
     print(r"----------------------------------")
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Command-line car rental system")
+    parser.add_argument('--lazy', action='store_true',
+                        help="read users, cars and bookings from the database on demand instead of at startup")
+    parser.add_argument('--query-mode', choices=('memory', 'sql'), default='memory',
+                        help="filter searches in Python ('memory') or with indexed SQL queries ('sql')")
+    parser.add_argument('--fast-start', action='store_true',
+                        help="show the menu immediately and load data on first use, e.g. the first login")
+    parser.add_argument('--db', help="database file (default: src/database/car_rental.db)")
+    parser.add_argument('--journal', metavar='DIR',
+                        help="store data as an append-only event journal in DIR instead of the SQLite database "
+                             "(query mode memory only)")
+    parser.add_argument('--shards', metavar='DIR',
+                        help="partition cars and bookings across the SQLite files in DIR (created with "
+                             "--shard-count files if empty); best with --query-mode sql, which searches the shards "
+                             "in parallel")
+    parser.add_argument('--shard-count', type=int, help="number of shards of a new --shards directory (default 4)")
+    parser.add_argument('--shard-workers', type=int,
+                        help="processes searching shards in parallel (default: one per shard up to the CPU count)")
+    parser.add_argument('--metrics', metavar='PATH',
+                        help="record operation and SQL timings and write them to PATH on exit "
+                             "(Prometheus text if PATH ends in .prom, JSON otherwise)")
+    parser.add_argument('--slow-ms', type=float, help="with --metrics, log operations slower than this")
+    parser.add_argument('--rates', metavar='PATH',
+                        help="JSON rate table with per-car, per-model or per-make daily rates, seasonal and weekend "
+                             "multipliers and long-rental discounts (default: a flat daily rate)")
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_ENTRIES,
+                        help="available-car, recommendation and fee results cached (0 disables the cache)")
+    parser.add_argument('--cache-ttl', type=float, default=DEFAULT_TTL,
+                        help="seconds a cached result stays valid (0 keeps it until a change invalidates it)")
+    parser.add_argument('--durability', choices=DURABILITY_LEVELS, default='normal',
+                        help="'full' syncs every save to disk before the next prompt, 'normal' may lose the last "
+                             "saves on power loss, 'deferred' saves in the background and may lose the last "
+                             "--flush-ms on a crash")
+    parser.add_argument('--flush-ms', type=float, default=DEFAULT_FLUSH_INTERVAL * 1000,
+                        help="with --durability deferred, longest time a change waits before it is committed")
+    parser.add_argument('--flush-rows', type=int, default=DEFAULT_FLUSH_ROWS,
+                        help="with --durability deferred, pending rows that are committed without waiting")
+    args = parser.parse_args()
+    if args.journal and (args.db or args.query_mode == 'sql'):
+        parser.error("--journal cannot be combined with --db or --query-mode sql")
+    if args.shards and (args.db or args.journal):
+        parser.error("--shards cannot be combined with --db or --journal")
+    if args.shards:
+        try:
+            args.shard_paths = shard_paths(args.shards, args.shard_count)
+        except ValueError as error:
+            parser.error(str(error))
+    if args.durability == 'deferred' and (args.journal or args.lazy):
+        parser.error("--durability deferred cannot be combined with --journal or --lazy")
+    if args.flush_ms <= 0 or args.flush_rows < 1:
+        parser.error("--flush-ms must be positive and --flush-rows at least 1")
+    return args
+
+
+def open_database(args):
+    """
+    Database manager for the storage and durability chosen on the command line, and the background writer if any.
+    """
+    full = args.durability == 'full'
+    if args.journal:
+        return JournalManager(args.journal, fsync=full), None
+    pragmas = {'synchronous': 'FULL'} if full else None
+    if args.shards:
+        db_manager = ShardedDatabaseManager(args.shard_paths, workers=args.shard_workers, pragmas=pragmas)
+    else:
+        db_manager = DatabaseManager(args.db, pragmas=pragmas)
+    if args.durability == 'deferred':
+        return db_manager, WriteBehind(db_manager, args.flush_ms / 1000, args.flush_rows)
+    return db_manager, None
+
+
 if __name__ == "__main__":
+    args = parse_args()
+    if args.metrics:
+        metrics.enable(slow_threshold=None if args.slow_ms is None else args.slow_ms / 1000)
     display_welcome_banner()
-    system = CarRentalSystem()
-    system.run()
\ No newline at end of file
+    pricing = PricingEngine(RateTable.from_file(args.rates)) if args.rates else None
+    query_cache = QueryCache(args.cache_size, args.cache_ttl or None)
+    db_manager, write_behind = open_database(args)
+    system = CarRentalSystem(db_manager, lazy=args.lazy, query_mode=args.query_mode, fast_start=args.fast_start,
+                             pricing=pricing, query_cache=query_cache, write_behind=write_behind)
+    system.run()
+    if args.metrics:
+        metrics.write(args.metrics)
\ No newline at end of file
@@ -1,6 +1,9 @@
 # models/car.py
 class Car:
-    def __init__(self, car_id, make, model, year, mileage, available, min_rent_period, max_rent_period):
+    __slots__ = ('car_id', 'make', 'model', 'year', 'mileage', 'available', 'min_rent_period', 'max_rent_period',
+                 'version', '__weakref__')
+
+    def __init__(self, car_id, make, model, year, mileage, available, min_rent_period, max_rent_period, version=0):
         self.car_id = car_id
         self.make = make
         self.model = model
@@ -9,6 +12,7 @@ class Car:
         self.available = available
         self.min_rent_period = min_rent_period
         self.max_rent_period = max_rent_period
+        self.version = version  # Row version read from the database, checked when the change is saved
 
     def __str__(self):
         availability_str = "Available" if self.available else "Not Available"
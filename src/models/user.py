@@ -1,9 +1,12 @@
 # models/user.py
 class User:
-    def __init__(self, username, password, role):
+    __slots__ = ('username', 'password', 'role', 'version', '__weakref__')
+
+    def __init__(self, username, password, role, version=0):
         self.username = username
         self.password = password
         self.role = role
+        self.version = version  # Row version read from the database, checked when the change is saved
 
     def __str__(self):
         return f"Username: {self.username}, Role: {self.role}"
\ No newline at end of file
@@ -0,0 +1,125 @@
+from bisect import bisect_right, insort
+
+
+class CarRequest:
+    """
+    A request for any car matching a make, model and/or year for [start_date, end_date), rather than a given car.
+    """
+
+    __slots__ = ('request_id', 'customer_username', 'start_date', 'end_date', 'make', 'model', 'year')
+
+    def __init__(self, request_id, customer_username, start_date, end_date, make=None, model=None, year=None):
+        """
+        Args:
+            request_id: Caller's ID for the request, reported back with the outcome
+            customer_username: Customer the booking is for
+            start_date: First day (date)
+            end_date: Day after the last day (date)
+            make: Required make (optional, case-insensitive)
+            model: Required model (optional, case-insensitive)
+            year: Required model year (optional)
+        """
+        self.request_id = request_id
+        self.customer_username = customer_username
+        self.start_date = start_date
+        self.end_date = end_date
+        self.make = make
+        self.model = model
+        self.year = year
+
+    def car_class(self):
+        """
+        Key of the cars the request accepts: (make, model, year) with None for any.
+        """
+        return (None if self.make is None else self.make.lower(), None if self.model is None else self.model.lower(),
+                None if self.year is None else int(self.year))
+
+    def accepts(self, car):
+        """
+        Whether the car is in service, of the requested class and rentable for the request's length.
+        """
+        length = (self.end_date - self.start_date).days
+        return (car.available and _matches(car, self.car_class())
+                and car.min_rent_period <= length <= car.max_rent_period)
+
+    def __str__(self):
+        wanted = ' '.join(str(part) for part in (self.year, self.make, self.model) if part is not None) or 'any car'
+        return (f"Request {self.request_id}: {wanted} for {self.customer_username} "
+                f"from {self.start_date} to {self.end_date}")
+
+
+def _matches(car, car_class):
+    make, model, year = car_class
+    return ((make is None or car.make.lower() == make) and (model is None or car.model.lower() == model)
+            and (year is None or int(car.year) == year))
+
+
+class FleetAllocator:
+    """
+    Assigns class-level car requests to concrete cars so that as many requests as possible are served.
+
+    Requests are taken in order of their end date and each goes to the matching car that became free most recently
+    before the request starts (best fit), which leaves the cars that have been free longest for requests that
+    start earlier. On cars of one class with no other bookings this serves the largest possible number of requests;
+    with overlapping classes or existing bookings in the way it is a heuristic. Cars out of service and cars whose
+    rent period does not accept the request's length are not used.
+
+    Each class keeps its cars sorted by the end of the last request given to them, so finding the best fit is a
+    binary search plus a walk past cars that are reserved by existing bookings or don't accept the length.
+    """
+
+    def __init__(self, cars, availability):
+        """
+        Args:
+            cars: Iterable of Car objects to allocate from
+            availability: AvailabilityIndex of the existing reservations; it is only read
+        """
+        self.cars = [car for car in cars if car.available]
+        self.availability = availability
+
+    def allocate(self, requests):
+        """
+        Assign requests to cars. Nothing is reserved; the caller books the assignments.
+
+        Args:
+            requests: Iterable of CarRequest objects
+
+        Returns:
+            Tuple (assignments, unassigned): a list of (CarRequest, Car) pairs in allocation order, and a list of
+            the requests no car could take, in input order.
+        """
+        requests = list(requests)
+        classes = {}  # (make, model, year) -> sorted list of (free_from ordinal, car_id)
+        for car_class in {request.car_class() for request in requests}:
+            classes[car_class] = sorted((0, car.car_id) for car in self.cars if _matches(car, car_class))
+        memberships = {}  # car_id -> lists of the classes the car is in
+        for members in classes.values():
+            for entry in members:
+                memberships.setdefault(entry[1], []).append(members)
+        cars = {car.car_id: car for car in self.cars}
+        free_from = dict.fromkeys(memberships, 0)  # car_id -> end of the last request assigned to the car
+        is_free = self.availability.is_free
+
+        assignments, assigned = [], set()
+        order = sorted(range(len(requests)), key=lambda i: (requests[i].end_date, requests[i].start_date))
+        for i in order:
+            request = requests[i]
+            start, end = request.start_date.toordinal(), request.end_date.toordinal()
+            length = end - start
+            members = classes[request.car_class()]
+            # Cars free since `start` at the latest, most recently freed first
+            j = bisect_right(members, (start, '\uffff'))
+            while j > 0:
+                j -= 1
+                car = cars[members[j][1]]
+                if car.min_rent_period <= length <= car.max_rent_period and is_free(car.car_id, start, end):
+                    break
+            else:
+                continue
+            for class_members in memberships[car.car_id]:
+                del class_members[bisect_right(class_members, (free_from[car.car_id], car.car_id)) - 1]
+                insort(class_members, (end, car.car_id))
+            free_from[car.car_id] = end
+            assignments.append((request, car))
+            assigned.add(i)
+        return assignments, [request for i, request in enumerate(requests) if i not in assigned]
@@ -0,0 +1,182 @@
+"""
+Password hashing and verification with a salted key derivation function from hashlib.
+
+Hashes are stored as self-describing strings, so the KDF or its cost can change without invalidating existing
+passwords:
+    scrypt$<n>$<r>$<p>$<salt hex>$<hash hex>
+    pbkdf2_sha256$<iterations>$<salt hex>$<hash hex>
+Unsalted MD5 hex digests written by earlier versions are still accepted and flagged for re-hashing.
+
+hashlib releases the GIL while deriving a key, so hashing on a thread pool lets concurrent logins use several
+cores instead of queueing behind each other.
+"""
+import hashlib
+import hmac
+import os
+import threading
+
+SALT_BYTES = 16
+DEFAULT_WORKERS = min(8, os.cpu_count() or 1)
+
+
+class ScryptKdf:
+    """
+    scrypt (memory-hard). The defaults need 16 MB per hash: n * r * 128 bytes.
+    """
+
+    name = 'scrypt'
+
+    def __init__(self, n=2 ** 14, r=8, p=1, dklen=32):
+        self.n = n
+        self.r = r
+        self.p = p
+        self.dklen = dklen
+
+    def derive(self, password, salt):
+        return hashlib.scrypt(password, salt=salt, n=self.n, r=self.r, p=self.p, dklen=self.dklen,
+                              maxmem=self.n * self.r * 128 * 2)
+
+    def params(self):
+        return [str(self.n), str(self.r), str(self.p)]
+
+    @classmethod
+    def from_params(cls, params, dklen):
+        n, r, p = (int(value) for value in params)
+        return cls(n, r, p, dklen)
+
+
+class Pbkdf2Kdf:
+    """
+    PBKDF2-HMAC-SHA256, for platforms where OpenSSL lacks scrypt.
+    """
+
+    name = 'pbkdf2_sha256'
+
+    def __init__(self, iterations=600_000, dklen=32):
+        self.iterations = iterations
+        self.dklen = dklen
+
+    def derive(self, password, salt):
+        return hashlib.pbkdf2_hmac('sha256', password, salt, self.iterations, self.dklen)
+
+    def params(self):
+        return [str(self.iterations)]
+
+    @classmethod
+    def from_params(cls, params, dklen):
+        (iterations,) = params
+        return cls(int(iterations), dklen)
+
+
+KDFS = {kdf.name: kdf for kdf in (ScryptKdf, Pbkdf2Kdf)}
+
+
+def default_kdf():
+    # hashlib.scrypt only exists when Python is linked against an OpenSSL that provides it
+    return ScryptKdf() if hasattr(hashlib, 'scrypt') else Pbkdf2Kdf()
+
+
+def is_legacy_hash(stored):
+    """
+    Check whether a stored password is an unsalted MD5 digest from earlier versions.
+    """
+    return '$' not in stored and len(stored) == 32
+
+
+class AuthService:
+    """
+    Hashes and verifies passwords on a shared thread pool.
+    """
+
+    def __init__(self, kdf=None, workers=DEFAULT_WORKERS):
+        """
+        Args:
+            kdf: ScryptKdf or Pbkdf2Kdf used for new hashes (optional, scrypt when available)
+            workers: Threads that run hash computations
+        """
+        self.kdf = kdf or default_kdf()
+        self.workers = workers
+        self._executor = None  # Started on the first hash, so creating the service costs nothing at startup
+        self._executor_lock = threading.Lock()
+        self._dummy_hash = None  # Checked for unknown usernames so failed logins take as long either way
+
+    def hash_password(self, password):
+        """
+        Hash a password with a fresh salt, on the calling thread.
+
+        Returns:
+            Encoded hash string for storage.
+        """
+        salt = os.urandom(SALT_BYTES)
+        digest = self.kdf.derive(password.encode('utf-8'), salt)
+        return '$'.join([self.kdf.name] + self.kdf.params() + [salt.hex(), digest.hex()])
+
+    def check_password(self, password, stored):
+        """
+        Verify a password against a stored hash, on the calling thread.
+
+        Args:
+            password: Password as typed by the user
+            stored: Stored hash string (KDF format or legacy MD5 hex)
+
+        Returns:
+            Tuple (matches, new hash). The new hash is set when the password matched but the stored hash is legacy
+            or uses other KDF settings than the current ones, and should replace the stored hash.
+        """
+        password_bytes = password.encode('utf-8')
+        if is_legacy_hash(stored):
+            legacy = hashlib.md5(password_bytes, usedforsecurity=False).hexdigest()
+            matches = hmac.compare_digest(legacy, stored)
+            return matches, self.hash_password(password) if matches else None
+
+        try:
+            name, *params, salt, digest = stored.split('$')
+            expected = bytes.fromhex(digest)
+            kdf = KDFS[name].from_params(params, len(expected))
+            salt = bytes.fromhex(salt)
+        except (KeyError, ValueError):
+            return False, None  # Unknown or damaged hash format
+        matches = hmac.compare_digest(kdf.derive(password_bytes, salt), expected)
+        outdated = kdf.name != self.kdf.name or kdf.params() != self.kdf.params() or kdf.dklen != self.kdf.dklen
+        return matches, self.hash_password(password) if matches and outdated else None
+
+    def hash_password_async(self, password):
+        """
+        Hash a password on the thread pool.
+
+        Returns:
+            concurrent.futures.Future with the encoded hash.
+        """
+        return self._pool().submit(self.hash_password, password)
+
+    def check_password_async(self, password, stored):
+        """
+        Verify a password on the thread pool. A stored hash of None (unknown user) is checked against a dummy
+        hash and never matches.
+
+        Returns:
+            concurrent.futures.Future with the (matches, new hash) tuple of check_password().
+        """
+        if stored is None:
+            return self._pool().submit(self._reject_unknown, password)
+        return self._pool().submit(self.check_password, password, stored)
+
+    def _pool(self):
+        with self._executor_lock:
+            if self._executor is None:
+                # Imported here: concurrent.futures pulls in logging, which a cold start doesn't otherwise need
+                from concurrent.futures import ThreadPoolExecutor
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='auth')
+            return self._executor
+
+    def _reject_unknown(self, password):
+        if self._dummy_hash is None:
+            self._dummy_hash = self.hash_password(os.urandom(SALT_BYTES).hex())
+        self.check_password(password, self._dummy_hash)
+        return False, None
+
+    def close(self):
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
@@ -0,0 +1,195 @@
+from array import array
+from bisect import bisect_left, bisect_right
+
+
+def _ordinal(day):
+    # Accept datetime.date objects or day ordinals
+    return day if isinstance(day, int) else day.toordinal()
+
+
+class _CarSchedule:
+    """
+    Reserved day ranges of one car as sorted, non-overlapping [start, end) ordinals.
+    """
+
+    __slots__ = ('starts', 'ends', 'booking_ids')
+
+    def __init__(self):
+        self.starts = array('l')  # Start day ordinals, ascending
+        self.ends = array('l')  # End day ordinals (exclusive); ascending too because ranges don't overlap
+        self.booking_ids = []  # Booking ID of each range
+
+    def add(self, start, end, booking_id):
+        """
+        Insert the range [start, end) in order.
+
+        Returns:
+            False, leaving the schedule unchanged, if the range overlaps one already in it.
+        """
+        i = bisect_left(self.starts, start)
+        if (i > 0 and self.ends[i - 1] > start) or (i < len(self.starts) and self.starts[i] < end):
+            return False
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.booking_ids.insert(i, booking_id)
+        return True
+
+
+class AvailabilityIndex:
+    """
+    Per-car interval index of reserved (approved) bookings.
+
+    Answers "is car X free for [start, end)" with one binary search, and "which cars are free for [start, end)"
+    with one check per candidate car. There is no fleet-level structure, so the latter is linear in the number of
+    candidate cars; narrow the candidates first (by class or in SQL) where the fleet is large.
+    """
+
+    def __init__(self):
+        self._schedules = {}  # car_id -> _CarSchedule
+
+    def load(self, bookings):
+        """
+        Rebuild the index from bookings. Ranges that overlap an earlier one are skipped.
+
+        Args:
+            bookings: Iterable of reserved Booking objects
+        """
+        self._schedules = {}
+        for booking in sorted(bookings, key=lambda b: (b.car_id, b.start_date)):
+            try:
+                self.reserve(booking.car_id, booking.start_date, booking.end_date, booking.booking_id)
+            except ValueError:
+                pass
+
+    def reserve(self, car_id, start, end, booking_id):
+        """
+        Reserve a car for [start, end).
+
+        Args:
+            car_id: Car to reserve
+            start: First day (date or ordinal)
+            end: Day after the last day (date or ordinal)
+            booking_id: Booking that holds the reservation
+
+        Raises:
+            ValueError: If the range overlaps an existing reservation of the car.
+        """
+        start, end = _ordinal(start), _ordinal(end)
+        schedule = self._schedule(car_id)
+        if schedule is None:
+            schedule = self._schedules[car_id] = _CarSchedule()
+        if not schedule.add(start, end, booking_id):
+            raise ValueError(f"Car {car_id} is already reserved between {start} and {end}.")
+
+    def release(self, car_id, start, booking_id):
+        """
+        Remove the reservation held by a booking.
+
+        Args:
+            car_id: Reserved car
+            start: First day of the reservation (date or ordinal)
+            booking_id: Booking that holds the reservation
+        """
+        schedule = self._schedule(car_id)
+        if schedule is None:
+            return
+        start = _ordinal(start)
+        for i in range(bisect_left(schedule.starts, start), bisect_right(schedule.starts, start)):
+            if schedule.booking_ids[i] == booking_id:
+                del schedule.starts[i]
+                del schedule.ends[i]
+                del schedule.booking_ids[i]
+                return
+
+    def remove_car(self, car_id):
+        self._schedules.pop(car_id, None)
+
+    def _schedule(self, car_id):
+        return self._schedules.get(car_id)
+
+    def conflicts(self, car_id, start, end):
+        """
+        Booking IDs whose reservation of the car overlaps [start, end).
+
+        Returns:
+            List of booking IDs, empty if the car is free.
+        """
+        schedule = self._schedule(car_id)
+        if schedule is None:
+            return []
+        start, end = _ordinal(start), _ordinal(end)
+        # Ranges starting before `end` are on the left of i; walk back while they still end after `start`
+        i = bisect_left(schedule.starts, end)
+        found = []
+        while i > 0 and schedule.ends[i - 1] > start:
+            i -= 1
+            found.append(schedule.booking_ids[i])
+        found.reverse()
+        return found
+
+    def is_free(self, car_id, start, end):
+        """
+        Check whether a car has no reservation overlapping [start, end).
+        """
+        schedule = self._schedule(car_id)
+        if schedule is None or not schedule.starts:
+            return True
+        start, end = _ordinal(start), _ordinal(end)
+        if schedule.ends[-1] <= start:
+            return True  # Everything is booked before the requested range, the common case for history
+        i = bisect_left(schedule.starts, end)
+        return i == 0 or schedule.ends[i - 1] <= start
+
+    def free_cars(self, cars, start, end):
+        """
+        Filter cars down to those free for [start, end).
+
+        Takes O(log n) per candidate car, so a call is linear in the number of cars passed in, not in the number of
+        free ones. The generator is lazy: stop early (e.g. with next()) to check only as many cars as needed.
+
+        Args:
+            cars: Iterable of Car objects (or anything with a car_id attribute)
+            start: First day (date or ordinal)
+            end: Day after the last day (date or ordinal)
+
+        Returns:
+            Generator of the free cars, in input order.
+        """
+        start, end = _ordinal(start), _ordinal(end)
+        is_free = self.is_free
+        return (car for car in cars if is_free(car.car_id, start, end))
+
+    def reservation_count(self):
+        return sum(len(schedule.starts) for schedule in self._schedules.values())
+
+
+class LazyAvailabilityIndex(AvailabilityIndex):
+    """
+    Availability index that reads a car's reservations from the database the first time the car is queried.
+    """
+
+    def __init__(self, load_reservations):
+        """
+        Args:
+            load_reservations: Callable taking a car_id and returning that car's reserved Booking objects
+        """
+        super().__init__()
+        self._load_reservations = load_reservations
+
+    def load(self, bookings=()):
+        """
+        Forget every loaded schedule; they are read again on demand.
+        """
+        self._schedules = {}
+
+    def _schedule(self, car_id):
+        schedule = self._schedules.get(car_id)
+        if schedule is None:
+            # Filled before it is published (which also marks the car as loaded), so that a concurrent reader never
+            # sees the car without its reservations. Readers loading the same car at once keep the first schedule.
+            # A range overlapping an earlier one is skipped, as in load().
+            schedule = _CarSchedule()
+            for booking in sorted(self._load_reservations(car_id), key=lambda b: b.start_date):
+                schedule.add(booking.start_date.toordinal(), booking.end_date.toordinal(), booking.booking_id)
+            schedule = self._schedules.setdefault(car_id, schedule)
+        return schedule
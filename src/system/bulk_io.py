@@ -0,0 +1,300 @@
+"""
+Streaming bulk import and export of cars and bookings (CSV or JSON Lines).
+
+Import runs as a generator pipeline: read records -> validate them against the Car/Booking rules -> write them
+in chunked executemany transactions. Export streams rows from the database straight into the file. Neither side
+holds a whole table in memory.
+
+Usage (from the repository root):
+    python -m src.system.bulk_io import cars fleet.csv --batch-size 5000
+    python -m src.system.bulk_io export bookings bookings.jsonl
+"""
+import argparse
+import csv
+import json
+import os
+import uuid
+
+from src.database.database_manager import BULK_BATCH_SIZE, STREAM_BATCH_SIZE, DATA_COLUMNS, DatabaseManager
+from src.system.availability import AvailabilityIndex
+from src.system.repositories import BookingRepository
+from src.utils.dates import parse_date
+
+BOOKING_STATUSES = ("Pending", "Approved", "Rejected")
+FORMATS = ('csv', 'jsonl')
+MAX_REPORTED_ERRORS = 100  # Rejected rows listed in an ImportReport; the rest are only counted
+
+
+class ImportReport:
+    """
+    Outcome of an import: rows read, written, skipped as duplicates and rejected by validation.
+    """
+
+    def __init__(self):
+        self.read = 0
+        self.written = 0
+        self.skipped = 0
+        self.rejected = 0
+        self.errors = []  # (line number, message) of the first MAX_REPORTED_ERRORS rejected rows
+
+    def reject(self, line, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    def __str__(self):
+        summary = (f"Read {self.read} rows: {self.written} imported, {self.skipped} skipped (already present), "
+                   f"{self.rejected} rejected.")
+        details = [f"  line {line}: {message}" for line, message in self.errors]
+        if self.rejected > len(self.errors):
+            details.append(f"  ... and {self.rejected - len(self.errors)} more")
+        return "\n".join([summary] + details)
+
+
+def detect_format(path, fmt=None):
+    """
+    Pick the file format from the explicit argument or the file extension.
+
+    Raises:
+        ValueError: If the format is unknown.
+    """
+    fmt = (fmt or os.path.splitext(path)[1].lstrip('.')).lower()
+    if fmt == 'json':
+        fmt = 'jsonl'
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported file format: {fmt or path}. Use .csv or .jsonl.")
+    return fmt
+
+
+def read_records(path, fmt=None):
+    """
+    Stream records from a CSV (with header row) or JSON Lines file.
+
+    Returns:
+        Generator of (line number, dict) pairs; the dict is None for a line that could not be decoded.
+    """
+    fmt = detect_format(path, fmt)
+    with open(path, newline='', encoding='utf-8') as file:
+        if fmt == 'csv':
+            reader = csv.DictReader(file)
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            for line_number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None
+                yield line_number, record if isinstance(record, dict) else None
+
+
+def _text(record, field):
+    value = record.get(field)
+    if value is None or str(value).strip() == "":
+        raise ValueError(f"missing {field}")
+    return str(value).strip()
+
+
+def _whole_number(record, field, minimum=0):
+    text = _text(record, field)
+    try:
+        value = int(text)
+    except ValueError as error:
+        raise ValueError(f"{field} must be a whole number") from error
+    if value < minimum:
+        raise ValueError(f"{field} must be at least {minimum}")
+    return value
+
+
+def _flag(value, default=True):
+    if value is None or str(value).strip() == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ('1', 'true', 'yes', 'y'):
+        return True
+    if text in ('0', 'false', 'no', 'n'):
+        return False
+    raise ValueError(f"available must be true or false, not {value!r}")
+
+
+def validate_cars(records, report):
+    """
+    Turn car records into cars table rows, rejecting invalid ones.
+
+    Args:
+        records: Iterable of (line number, dict) pairs from read_records()
+        report: ImportReport that collects rejected rows
+
+    Returns:
+        Generator of row tuples in DATA_COLUMNS['cars'] order.
+    """
+    for line, record in records:
+        report.read += 1
+        if record is None:
+            report.reject(line, "malformed record")
+            continue
+        try:
+            car_id = str(record.get('car_id') or "").strip() or str(uuid.uuid4())
+            make = _text(record, 'make')
+            model = _text(record, 'model')
+            year = _whole_number(record, 'year', minimum=1886)
+            mileage = _whole_number(record, 'mileage')
+            min_rent_period = _whole_number(record, 'min_rent_period', minimum=1)
+            max_rent_period = _whole_number(record, 'max_rent_period', minimum=1)
+            if max_rent_period < min_rent_period:
+                raise ValueError("max_rent_period must not be less than min_rent_period")
+            available = _flag(record.get('available'))
+        except ValueError as error:
+            report.reject(line, str(error))
+            continue
+        yield car_id, make, model, year, mileage, available, min_rent_period, max_rent_period
+
+
+def validate_bookings(records, report, db_manager):
+    """
+    Turn booking records into bookings table rows, rejecting invalid ones.
+
+    A booking must reference an existing customer and car, have a valid date range within the car's rent-period
+    bounds and a known status. Approved bookings must not overlap another approved booking of the same car, whether
+    it is already stored or earlier in the same file.
+
+    Args:
+        records: Iterable of (line number, dict) pairs from read_records()
+        report: ImportReport that collects rejected rows
+        db_manager: DatabaseManager used to look up customers, cars and existing reservations
+
+    Returns:
+        Generator of row tuples in DATA_COLUMNS['bookings'] order.
+    """
+    customers = {row[0] for row in db_manager.stream('users')}
+    rent_windows = {row[0]: (int(row[6]), int(row[7])) for row in db_manager.stream('cars')}
+    reservations = AvailabilityIndex()  # Compact per-car arrays, filled with one pass over approved bookings
+    reservations.load(BookingRepository.from_row(row) for row in db_manager.stream('bookings', 'status', "Approved"))
+
+    for line, record in records:
+        report.read += 1
+        if record is None:
+            report.reject(line, "malformed record")
+            continue
+        try:
+            booking_id = str(record.get('booking_id') or "").strip() or str(uuid.uuid4())
+            customer_username = _text(record, 'customer_username')
+            if customer_username not in customers:
+                raise ValueError(f"unknown customer {customer_username}")
+            car_id = _text(record, 'car_id')
+            if car_id not in rent_windows:
+                raise ValueError(f"unknown car {car_id}")
+            start_text, end_text = _text(record, 'start_date'), _text(record, 'end_date')
+            try:
+                start_date, end_date = parse_date(start_text), parse_date(end_text)
+            except ValueError as error:
+                raise ValueError("dates must be YYYY-MM-DD") from error
+            rental_days = (end_date - start_date).days
+            if rental_days <= 0:
+                raise ValueError("end_date must be after start_date")
+            min_rent_period, max_rent_period = rent_windows[car_id]
+            if not min_rent_period <= rental_days <= max_rent_period:
+                raise ValueError(f"rental period must be between {min_rent_period} and {max_rent_period} days")
+            status = str(record.get('status') or "Pending").strip().capitalize()
+            if status not in BOOKING_STATUSES:
+                raise ValueError(f"status must be one of {', '.join(BOOKING_STATUSES)}")
+            if status == "Approved":
+                conflicts = reservations.conflicts(car_id, start_date, end_date)
+                if any(conflict != booking_id for conflict in conflicts):
+                    raise ValueError("overlaps an approved booking of the same car")
+                if not conflicts:  # A re-imported booking already holds its own reservation
+                    reservations.reserve(car_id, start_date, end_date, booking_id)
+        except ValueError as error:
+            report.reject(line, str(error))
+            continue
+        yield booking_id, customer_username, car_id, start_date.isoformat(), end_date.isoformat(), status
+
+
+VALIDATORS = {
+    'cars': lambda records, report, db_manager: validate_cars(records, report),
+    'bookings': validate_bookings,
+}
+
+
+def import_file(db_manager, table, path, fmt=None, batch_size=BULK_BATCH_SIZE, on_conflict='skip'):
+    """
+    Import cars or bookings from a CSV or JSON Lines file.
+
+    Args:
+        db_manager: DatabaseManager to write to
+        table: 'cars' or 'bookings'
+        path: Input file
+        fmt: 'csv' or 'jsonl' (optional, taken from the file extension)
+        batch_size: Rows committed per transaction
+        on_conflict: 'skip', 'replace' or 'error' for rows whose ID already exists
+
+    Returns:
+        ImportReport with the outcome.
+    """
+    if table not in VALIDATORS:
+        raise ValueError(f"Cannot import {table}; use cars or bookings.")
+    report = ImportReport()
+    rows = VALIDATORS[table](read_records(path, fmt), report, db_manager)
+    report.written, report.skipped = db_manager.bulk_write(table, rows, batch_size, on_conflict)
+    return report
+
+
+def export_table(db_manager, table, path, fmt=None, batch_size=STREAM_BATCH_SIZE):
+    """
+    Stream a table to a CSV or JSON Lines file.
+
+    Returns:
+        Number of rows written.
+    """
+    if table == 'users':
+        raise ValueError("Users cannot be exported; the file would contain password hashes.")
+    if table not in DATA_COLUMNS:
+        raise ValueError(f"Cannot export {table}; use cars or bookings.")
+    fmt = detect_format(path, fmt)
+    columns = DATA_COLUMNS[table]
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file) if fmt == 'csv' else None
+        if writer:
+            writer.writerow(columns)
+        for row in db_manager.stream(table, batch_size=batch_size):
+            row = row[:-1]  # The row version only means something inside this database
+            if table == 'cars':
+                row = row[:5] + (bool(row[5]),) + row[6:]
+            if writer:
+                writer.writerow(row)
+            else:
+                file.write(json.dumps(dict(zip(columns, row))))
+                file.write("\n")
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=('import', 'export'))
+    parser.add_argument('table', choices=('cars', 'bookings'))
+    parser.add_argument('path')
+    parser.add_argument('--format', choices=FORMATS, help="file format (default: from the file extension)")
+    parser.add_argument('--batch-size', type=int, default=BULK_BATCH_SIZE, help="rows per transaction on import")
+    parser.add_argument('--on-conflict', choices=('skip', 'replace', 'error'), default='skip',
+                        help="what to do with rows whose ID already exists")
+    parser.add_argument('--db', help="database file (default: src/database/car_rental.db)")
+    args = parser.parse_args()
+
+    db_manager = DatabaseManager(args.db)
+    try:
+        if args.command == 'import':
+            print(import_file(db_manager, args.table, args.path, args.format, args.batch_size, args.on_conflict))
+        else:
+            print(f"Exported {export_table(db_manager, args.table, args.path, args.format)} rows.")
+    finally:
+        db_manager.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,60 +1,16 @@
-import uuid  # Import the uuid module for generating unique identifiers
-import datetime  # Import the datetime module for handling dates and times
+from itertools import islice  # Take one page at a time from streamed results
 
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import hashes
+from src.system.rental_service import RentalService, ServiceError, requires_data  # Business logic without console I/O
 
-from src.models.user import User  # Import the User class from the models.user module
-from src.models.car import Car  # Import the Car class from the models.car module
-from src.models.booking import Booking  # Import the Booking class from the models.booking module
-from src.database.database_manager import \
-    DatabaseManager  # Import the DatabaseManager class from the database.database_manager module
+RECOMMENDATION_PAGE_SIZE = 10  # Recommended cars shown per page in the customer menu
+LIST_PAGE_SIZE = 20  # Cars or bookings shown per page when listing them
 
 
-class CarRentalSystem:
+class CarRentalSystem(RentalService):
     """
-    Car rental system class responsible for managing users, cars, and bookings, and interacting with the database.
+    Console front end of the car rental system: menus, prompts and printed results on top of RentalService.
     """
 
-    def __init__(self):
-        """
-        Initialize the car rental system, create lists for users, cars, and bookings, and an instance of the database manager. Load data from the database.
-        """
-        self.users = []  # List of users, storing User objects
-        self.cars = []  # List of cars, storing Car objects
-        self.bookings = []  # List of bookings, storing Booking objects
-        self.db_manager = DatabaseManager()  # Instance of the database manager
-        self.load_data()  # Load data from the database
-
-    def load_data(self):
-        """
-        Load user, car, and booking data from the database.
-        """
-        # Load user data
-        user_data = self.db_manager.load_users()
-        self.users = [User(username, password, role) for username, password, role in user_data]
-
-        # Load car data
-        car_data = self.db_manager.load_cars()
-        self.cars = [Car(car_id, make, model, year, mileage, available, min_rent_period, max_rent_period)
-                     for car_id, make, model, year, mileage, available, min_rent_period, max_rent_period in car_data]
-
-        # Load booking data
-        booking_data = self.db_manager.load_bookings()
-        self.bookings = [
-            Booking(booking_id, customer_username, car_id, datetime.datetime.strptime(start_date, "%Y-%m-%d").date(),
-                    datetime.datetime.strptime(end_date, "%Y-%m-%d").date(), status)
-            for booking_id, customer_username, car_id, start_date, end_date, status in booking_data
-        ]
-
-    def save_data(self):
-        """
-        Save user, car, and booking data to the database.
-        """
-        self.db_manager.save_users(self.users)
-        self.db_manager.save_cars(self.cars)
-        self.db_manager.save_bookings(self.bookings)
-
     def register_user(self, username, password, role):
         """
         Register a new user.
@@ -67,13 +23,11 @@ class CarRentalSystem:
         Returns:
             True if registration is successful, False if the username already exists.
         """
-        if any(user.username == username for user in self.users):
-            print("Username already exists.")
+        try:
+            super().register_user(username, password, role)
+        except ServiceError as error:
+            print(error)
             return False
-        hashed_password = self._hash_password(password)
-        user = User(username, hashed_password, role)
-        self.users.append(user)
-        self.save_data()
         print("User registered successfully.")
         return True
 
@@ -88,14 +42,11 @@ class CarRentalSystem:
         Returns:
             User object if the username and password match, otherwise None.
         """
-        hashed_password = self._hash_password(password)
-        user = next((user for user in self.users if user.username == username and user.password == hashed_password),
-                    None)
-
-        if user:
-            return user
-        print("Invalid username or password.")
-        return None
+        try:
+            return super().login_user(username, password)
+        except ServiceError as error:
+            print(error)
+            return None
 
     def add_car(self, make, model, year, mileage, min_rent_period, max_rent_period):
         """
@@ -109,10 +60,11 @@ class CarRentalSystem:
             min_rent_period: Minimum rental period (days)
             max_rent_period: Maximum rental period (days)
         """
-        car_id = str(uuid.uuid4())  # Generate a unique car ID
-        car = Car(car_id, make, model, year, mileage, True, min_rent_period, max_rent_period)
-        self.cars.append(car)
-        self.save_data()
+        try:
+            super().add_car(make, model, year, mileage, min_rent_period, max_rent_period)
+        except ServiceError as error:
+            print(error)
+            return
         print("Car added successfully.")
 
     def update_car(self, car_id, make=None, model=None, year=None, mileage=None, available=None, min_rent_period=None,
@@ -130,19 +82,12 @@ class CarRentalSystem:
             min_rent_period: New minimum rental period (optional)
             max_rent_period: New maximum rental period (optional)
         """
-        car = next((car for car in self.cars if car.car_id == car_id), None)
-        if car:
-            if make: car.make = make
-            if model: car.model = model
-            if year: car.year = year
-            if mileage: car.mileage = mileage
-            if available is not None: car.available = available
-            if min_rent_period: car.min_rent_period = min_rent_period
-            if max_rent_period: car.max_rent_period = max_rent_period
-            self.save_data()
-            print("Car updated successfully.")
-        else:
-            print("Car not found.")
+        try:
+            super().update_car(car_id, make, model, year, mileage, available, min_rent_period, max_rent_period)
+        except ServiceError as error:
+            print(error)
+            return
+        print("Car updated successfully.")
 
     def delete_car(self, car_id):
         """
@@ -151,20 +96,26 @@ class CarRentalSystem:
         Args:
             car_id: ID of the car to delete
         """
-        # Check if the car exists
-        car_to_delete = next((car for car in self.cars if car.car_id == car_id), None)
-        if car_to_delete:
-            self.cars = [car for car in self.cars if car.car_id != car_id]
-            self.save_data()
-            print("Car deleted successfully.")
-        else:
-            print("Car not found.")
+        try:
+            super().delete_car(car_id)
+        except ServiceError as error:
+            print(error)
+            return
+        print("Car deleted successfully.")
 
-    def view_available_cars(self):
+    def view_available_cars(self, start_date_str=None, end_date_str=None):
         """
-        View all available cars.
+        View all cars that are in service and not reserved for the given dates.
+
+        Args:
+            start_date_str: Rental start date (YYYY-MM-DD, optional, defaults to today)
+            end_date_str: Rental end date (YYYY-MM-DD, optional, defaults to the day after the start date)
         """
-        available_cars = [car for car in self.cars if car.available]
+        try:
+            available_cars = self.available_cars(start_date_str, end_date_str)
+        except ServiceError as error:
+            print(error)
+            return
         if available_cars:
             print("Available Cars:")
             for car in available_cars:
@@ -183,35 +134,30 @@ class CarRentalSystem:
             end_date_str: Booking end date (YYYY-MM-DD)
         """
         try:
-            start_date = datetime.datetime.strptime(start_date_str, "%Y-%m-%d").date()
-            end_date = datetime.datetime.strptime(end_date_str, "%Y-%m-%d").date()
-        except ValueError:
-            print("Invalid date format. Please use YYYY-MM-DD.")
-            return
-
-        if start_date >= end_date:
-            print("End date must be after start date.")
-            return
-
-        # Check if the start date is in the past
-        if start_date < datetime.date.today():
-            print("Start date cannot be in the past.")
+            super().book_car(customer, car_id, start_date_str, end_date_str)
+        except ServiceError as error:
+            print(error)
             return
+        print("Booking created successfully.")
 
-        car = next((car for car in self.cars if car.car_id == car_id and car.available), None)
-        if not car:
-            print("Car not found or not available.")
-            return
+    def book_any_car(self, customer, start_date_str, end_date_str, make=None, model=None, year=None):
+        """
+        Book a free car matching the make, model and/or year.
 
-        if (end_date - start_date).days < car.min_rent_period or (end_date - start_date).days > car.max_rent_period:
-            print(f"Rental period must be between {car.min_rent_period} and {car.max_rent_period} days.")
+        Args:
+            customer: Customer booking the car (User object)
+            start_date_str: Booking start date (YYYY-MM-DD)
+            end_date_str: Booking end date (YYYY-MM-DD)
+            make: Required make (optional)
+            model: Required model (optional)
+            year: Required model year (optional)
+        """
+        try:
+            booking = super().book_any_car(customer, start_date_str, end_date_str, make, model, year)
+        except ServiceError as error:
+            print(error)
             return
-
-        booking_id = str(uuid.uuid4())  # Generate a unique booking ID
-        booking = Booking(booking_id, customer.username, car_id, start_date, end_date)
-        self.bookings.append(booking)
-        self.save_data()
-        print("Booking created successfully.")
+        print(f"Booking created successfully for {self.cars.get(booking.car_id)}")
 
     def calculate_rental_fee(self, car_id, start_date_str, end_date_str):
         """
@@ -226,57 +172,151 @@ class CarRentalSystem:
             Rental fee, or None if the car is not found or the date format is invalid.
         """
         try:
-            start_date = datetime.datetime.strptime(start_date_str, "%Y-%m-%d").date()
-            end_date = datetime.datetime.strptime(end_date_str, "%Y-%m-%d").date()
-        except ValueError:
-            print("Invalid date format. Please use YYYY-MM-DD.")
-            return None
-
-        car = next((car for car in self.cars if car.car_id == car_id), None)
-        if not car:
-            print("Car not found.")
+            return super().calculate_rental_fee(car_id, start_date_str, end_date_str)
+        except ServiceError as error:
+            print(error)
             return None
 
-        rental_days = (end_date - start_date).days
-        if rental_days < car.min_rent_period or rental_days > car.max_rent_period:
-            print(f"Rental period must be between {car.min_rent_period} and {car.max_rent_period} days.")
-            return None
-
-        # Assuming a fixed rate per day for simplicity
-        rate_per_day = 50  # Example rate
-        total_fee = rental_days * rate_per_day
-        return total_fee
-
     def manage_bookings(self):
         """
-        Manage bookings by approving or rejecting them.
+        Manage bookings by approving or rejecting them, one at a time or in bulk.
         """
         print("Manage Bookings:")
-        for booking in self.bookings:
-            print(booking)
+        print("1. Review One Booking")
+        print("2. Bulk Review Pending Bookings")
+        if input("Enter your choice: ") == '2':
+            self.bulk_review_bookings()
+            return
+
+        # Only the requests waiting for review are listed; other bookings can still be managed by ID
+        self._print_paged(self.list_bookings("Pending"), LIST_PAGE_SIZE)
 
         booking_id = input("Enter booking ID to manage (It's recommended to copy and paste the ID): ")
+        try:
+            self.get_booking(booking_id)
+            action = input("Approve or Reject? (a/r): ").lower()
+            if action == 'a':
+                self.approve_booking(booking_id)
+                print("Booking approved.")
+            elif action == 'r':
+                self.reject_booking(booking_id)
+                print("Booking rejected.")
+            else:
+                print("Invalid action.")
+        except ServiceError as error:
+            print(error)
+
+    def bulk_review_bookings(self):
+        """
+        Approve or reject all pending bookings matching filters, committing them in batches. Requests that overlap
+        an approved booking are rejected automatically when approving.
+        """
+        start_date = input("Only bookings ending after (YYYY-MM-DD, or press Enter to skip): ")
+        end_date = input("Only bookings starting before (YYYY-MM-DD, or press Enter to skip): ")
+        car_id = input("Only bookings of car ID (or press Enter to skip): ")
+        customer = input("Only bookings of customer (or press Enter to skip): ")
+        try:
+            bookings = self.find_bookings("Pending", start_date or None, end_date or None, car_id or None,
+                                          customer or None)
+        except ServiceError as error:
+            print(error)
+            return
+        if not bookings:
+            print("No pending bookings match.")
+            return
+        print(f"{len(bookings)} pending bookings match, earliest first:")
+        self._print_paged(bookings, LIST_PAGE_SIZE)
+        action = input("Approve or Reject all of them? (a/r, or press Enter to cancel): ").lower()
+        if action not in ('a', 'r'):
+            print("Cancelled.")
+            return
+        print(self.review_bookings(bookings, 'approve' if action == 'a' else 'reject'))
 
-        booking = next((booking for booking in self.bookings if booking.booking_id == booking_id), None)
-        if not booking:
-            print("Booking not found.")
+    def fleet_report(self):
+        """
+        Print bookings, booked days, revenue and utilization for the whole fleet, per make or per car.
+        """
+        group = {'f': 'fleet', 'm': 'make', 'c': 'car'}.get(
+            input("Report for the Fleet, each Make or each Car? (f/m/c): ").lower())
+        if group is None:
+            print("Invalid choice.")
+            return
+        month = input("Month (YYYY-MM, or press Enter for all months): ")
+        try:
+            rows = [self.report(month=month or None)] if group == 'fleet' else self.report_groups(group, month or None)
+        except ServiceError as error:
+            print(error)
             return
+        if not rows:
+            print("No approved bookings in that period.")
+            return
+        self._print_paged(map(self._format_report_row, rows), LIST_PAGE_SIZE)
 
-        action = input("Approve or Reject? (a/r): ").lower()
-        if action == 'a':
-            booking.status = "Approved"
-            car = booking.get_car(self)  # Get the car associated with the booking
-            if car:
-                car.available = False  # Set the car to unavailable
-            print("Booking approved.")
-        elif action == 'r':
-            booking.status = "Rejected"
-            print("Booking rejected.")
-        else:
-            print("Invalid action.")
-        self.save_data()
+    def allocate_requests_file(self, path):
+        """
+        Book requests for any matching car read from a CSV or JSON Lines file with the fields customer,
+        start_date, end_date and optionally make, model and year. Lines that are not valid requests are reported
+        and skipped.
+
+        Args:
+            path: Input file (.csv or .jsonl)
+        """
+        # Imported on first use; most sessions never read files
+        from src.system.bulk_io import read_records
+        requests = []
+        try:
+            for line, record in read_records(path):
+                if record is None:
+                    print(f"Line {line}: not a JSON object")
+                    continue
+                try:
+                    requests.append(self.car_request(record.get('customer'), record.get('start_date'),
+                                                     record.get('end_date'), record.get('make'),
+                                                     record.get('model'), record.get('year'), request_id=line))
+                except ServiceError as error:
+                    print(f"Line {line}: {error}")
+        except (OSError, ValueError) as error:
+            print(error)
+            return
+        report = self.allocate_requests(requests)
+        print(report)
+        if report.unassigned:
+            print("Requests without a free matching car:")
+            self._print_paged(report.unassigned, LIST_PAGE_SIZE)
 
-    def recommend_cars(self, year, mileage, start_date_str, end_date_str):
+    def archive_old_bookings(self):
+        """
+        Move bookings that have ended, and rejected bookings, into the archive.
+        """
+        before = input("Archive bookings ended on or before (YYYY-MM-DD, or press Enter for today): ")
+        try:
+            print(f"Archived {self.archive_bookings(before or None)} bookings.")
+        except ServiceError as error:
+            print(error)
+
+    def view_booking_history(self):
+        """
+        List archived bookings matching filters, earliest first.
+        """
+        start_date = input("Only bookings ending after (YYYY-MM-DD, or press Enter to skip): ")
+        end_date = input("Only bookings starting before (YYYY-MM-DD, or press Enter to skip): ")
+        car_id = input("Only bookings of car ID (or press Enter to skip): ")
+        customer = input("Only bookings of customer (or press Enter to skip): ")
+        status = input("Only bookings with status (Approved/Rejected/Pending, or press Enter to skip): ")
+        try:
+            history = self.booking_history(customer or None, car_id or None, start_date or None, end_date or None,
+                                           status or None)
+            self._print_paged(history, LIST_PAGE_SIZE)
+        except ServiceError as error:
+            print(error)
+
+    @staticmethod
+    def _format_report_row(row):
+        utilization = '' if row['utilization'] is None else f", {row['utilization']:.1%} utilized"
+        return (f"{row['key'] or 'Fleet'}: {row['bookings']} bookings, {row['booked_days']} days booked, "
+                f"revenue {row['revenue']:.2f}{utilization}")
+
+    def recommend_cars(self, year, mileage, start_date_str, end_date_str, limit=None, offset=0, order_by='mileage'):
         """
         Recommend cars based on year, mileage, and rental dates.
 
@@ -285,62 +325,87 @@ class CarRentalSystem:
             mileage: Maximum mileage (optional)
             start_date_str: Rental start date (YYYY-MM-DD)
             end_date_str: Rental end date (YYYY-MM-DD)
+            limit: Maximum number of cars to return (optional, all matches if omitted)
+            offset: Number of best matches to skip, for paging through results
+            order_by: 'mileage' (lowest mileage, then newest year) or 'price' (lowest rental fee)
 
         Returns:
-            List of cars that match the criteria.
+            List of cars that match the criteria, best first.
         """
         try:
-            start_date = datetime.datetime.strptime(start_date_str, "%Y-%m-%d").date()
-            end_date = datetime.datetime.strptime(end_date_str, "%Y-%m-%d").date()
-        except ValueError:
-            print("Invalid date format. Please use YYYY-MM-DD.")
+            return super().recommend_cars(year, mileage, start_date_str, end_date_str, limit, offset, order_by)
+        except ServiceError as error:
+            print(error)
             return []
 
-        rental_days = (end_date - start_date).days
-
-        # Check if year is an empty string, if so, set it to None
-        if year == "":
-            year = None
-
-        # Check if mileage is an empty string, if so, set it to None
-        if mileage == "":
-            mileage = None
-
-        recommended_cars = [
-            car for car in self.cars
-            if car.available and
-               (year is None or car.year == int(year)) and
-               (mileage is None or car.mileage <= int(mileage)) and
-               rental_days >= car.min_rent_period and rental_days <= car.max_rent_period
-        ]
-        return recommended_cars
-
-    def view_all_cars(self):
+    @requires_data
+    def view_all_cars(self, page_size=LIST_PAGE_SIZE):
         """
         View all cars, including available and unavailable ones.
+
+        Args:
+            page_size: Cars shown before asking to continue (optional, None shows all at once)
         """
         if self.cars:
             print("All Cars:")
-            for car in self.cars:
-                print(car)
+            self._print_paged(self.cars, page_size)
         else:
             print("No cars found.")
 
-    def _hash_password(self, password):
+    def import_data(self, table, path):
         """
-        Hashes the password using MD5.
+        Import cars or bookings from a CSV or JSON Lines file, then reload the in-memory state.
 
         Args:
-            password: The password to hash.
+            table: 'cars' or 'bookings'
+            path: Input file (.csv or .jsonl)
+        """
+        try:
+            print(super().import_data(table, path))
+        except ServiceError as error:
+            print(error)
 
-        Returns:
-            The hexadecimal representation of the hashed password.
+    def export_data(self, table, path):
         """
-        password_bytes = password.encode('utf-8')
-        hasher = hashes.Hash(hashes.MD5(), backend=default_backend())
-        hasher.update(password_bytes)
-        hashed_password = hasher.finalize()
-        return hashed_password.hex()
+        Export cars or bookings to a CSV or JSON Lines file.
+
+        Args:
+            table: 'cars' or 'bookings'
+            path: Output file (.csv or .jsonl)
+        """
+        try:
+            count = super().export_data(table, path)
+        except ServiceError as error:
+            print(error)
+            return
+        print(f"Exported {count} {table} to {path}.")
+
+    def _print_paged(self, items, page_size):
+        """
+        Print items page by page, asking before each further page. Items are consumed lazily, so a streamed
+        result set is only read as far as the user looks.
+
+        Args:
+            items: Iterable of objects to print
+            page_size: Items per page (None prints everything without asking)
+        """
+        if page_size is None:
+            for item in items:
+                print(item)
+            return
+        iterator = iter(items)
+        try:
+            page = list(islice(iterator, page_size))
+            while page:
+                for item in page:
+                    print(item)
+                page = list(islice(iterator, page_size))
+                if page and input("Press Enter to see more, or 'q' to stop listing: ").lower() == 'q':
+                    break
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close:
+                close()  # Release the database cursor of a streamed result
 
     def run(self):
         """
@@ -354,6 +419,7 @@ class CarRentalSystem:
                 print("0. Exit")
 
                 choice = input("Enter your choice: ")
+                self.refresh()  # Pick up changes other terminals committed while this one waited for input
 
                 if choice == '1':
                     username = input("Enter username: ")
@@ -373,14 +439,28 @@ class CarRentalSystem:
 
                 elif choice == '0':
                     print("Exiting Car Rental System.")
-                    self.db_manager.close()  # Close the database connection
+                    self.close()  # Save what is still queued and close the database connection
                     break
 
                 else:
                     print("Invalid choice. Please try again.")
         except KeyboardInterrupt:
             print("\nProgram interrupted by user.")
-            self.db_manager.close()  # Ensure the database connection is closed when the program is interrupted
+            self.close()  # Ensure queued changes are saved and the connection is closed when the program is interrupted
+
+    def close(self):
+        """
+        Save what is still queued and close the database connection.
+
+        Returns:
+            True if everything was saved, False if the last changes were lost to a conflict.
+        """
+        try:
+            super().close()
+        except ServiceError as error:
+            print(f"Your last changes could not be saved: {error}")
+            return False
+        return True
 
     def user_menu(self, user):
         """
@@ -398,12 +478,16 @@ class CarRentalSystem:
                 print("2. Book a Car")
                 print("3. Calculate Rental Fee")
                 print("4. Smart Recommend Cars")  # Smart recommendation option
+                print("5. Book Any Matching Car")
                 print("0. Logout")
 
                 choice = input("Enter your choice: ")
+                self.refresh()
 
                 if choice == '1':
-                    self.view_available_cars()
+                    start_date = input("Enter start date (YYYY-MM-DD, or press Enter for today): ")
+                    end_date = input("Enter end date (YYYY-MM-DD, or press Enter for one day): ")
+                    self.view_available_cars(start_date, end_date)
                 elif choice == '2':
                     car_id = input("Enter car ID to book (It's recommended to copy and paste the ID): ")
                     start_date = input("Enter start date (YYYY-MM-DD): ")
@@ -415,26 +499,47 @@ class CarRentalSystem:
                     end_date = input("Enter end date (YYYY-MM-DD): ")
                     fee = self.calculate_rental_fee(car_id, start_date, end_date)
                     if fee is not None:
-                        print(f"Total rental fee: ${fee}")
+                        print(f"Total rental fee: ${fee:.2f}")
+                elif choice == '5':
+                    make = input("Enter car make (or press Enter for any): ")
+                    model = input("Enter car model (or press Enter for any): ")
+                    year = input("Enter car year (or press Enter for any): ")
+                    start_date = input("Enter start date (YYYY-MM-DD): ")
+                    end_date = input("Enter end date (YYYY-MM-DD): ")
+                    self.book_any_car(user, start_date, end_date, make or None, model or None, year or None)
                 elif choice == '4':  # Handle smart recommendation
                     year = input("Enter desired car year (or press Enter to skip): ")
                     mileage = input("Enter maximum car mileage (or press Enter to skip): ")
                     start_date = input("Enter start date (YYYY-MM-DD): ")
                     end_date = input("Enter end date (YYYY-MM-DD): ")
-                    recommended_cars = self.recommend_cars(year, mileage, start_date, end_date)
-                    if recommended_cars:
+                    order_by = 'price' if input("Rank by (m)ileage or (p)rice? [m]: ").lower() == 'p' else 'mileage'
+                    offset = 0
+                    while True:
+                        recommended_cars = self.recommend_cars(year, mileage, start_date, end_date,
+                                                               limit=RECOMMENDATION_PAGE_SIZE, offset=offset,
+                                                               order_by=order_by)
+                        if not recommended_cars:
+                            print("No cars match your criteria." if offset == 0 else "No more cars.")
+                            break
+                        fees = self.quote_cars([car.car_id for car in recommended_cars], start_date, end_date)
                         print("Recommended Cars:")
                         for i, car in enumerate(recommended_cars):
-                            print(f"{i + 1}. {car}")
-                        car_index = input("Enter the number of the car to book (or press Enter to skip): ")
+                            print(f"{offset + i + 1}. {car} - ${fees[car.car_id]:.2f}")
+                        car_index = input("Enter the number of the car to book, 'n' for more cars "
+                                          "(or press Enter to skip): ")
+                        if car_index.lower() == 'n':
+                            offset += RECOMMENDATION_PAGE_SIZE  # Show the next page of recommendations
+                            continue
                         if car_index:
                             try:
-                                selected_car = recommended_cars[int(car_index) - 1]
+                                position = int(car_index) - 1 - offset
+                                if position < 0:
+                                    raise IndexError
+                                selected_car = recommended_cars[position]
                                 self.book_car(user, selected_car.car_id, start_date, end_date)
                             except (ValueError, IndexError):
                                 print("Invalid car selection.")
-                    else:
-                        print("No cars match your criteria.")
+                        break
                 elif choice == '0':
                     print("Logging out.")
                     break  # Exit the user menu
@@ -447,9 +552,16 @@ class CarRentalSystem:
                 print("3. Delete Car")
                 print("4. Manage Bookings")
                 print("5. View All Cars")  # Add option to view all cars
+                print("6. Import Cars/Bookings")
+                print("7. Export Cars/Bookings")
+                print("8. Fleet Report")
+                print("9. Archive Old Bookings")
+                print("10. Booking History")
+                print("11. Allocate Car Requests")
                 print("0. Logout")
 
                 choice = input("Enter your choice: ")
+                self.refresh()
 
                 if choice == '1':
                     make = input("Enter car make: ")
@@ -483,6 +595,29 @@ class CarRentalSystem:
                 elif choice == '5':  # Handle view all cars option
                     self.view_all_cars()
 
+                elif choice in ('6', '7'):
+                    table = input("Enter what to transfer (cars/bookings): ").strip().lower()
+                    if table not in ('cars', 'bookings'):
+                        print("Please enter cars or bookings.")
+                        continue
+                    path = input("Enter file path (.csv or .jsonl): ").strip()
+                    if choice == '6':
+                        self.import_data(table, path)
+                    else:
+                        self.export_data(table, path)
+
+                elif choice == '8':
+                    self.fleet_report()
+
+                elif choice == '9':
+                    self.archive_old_bookings()
+
+                elif choice == '10':
+                    self.view_booking_history()
+
+                elif choice == '11':
+                    self.allocate_requests_file(input("Enter requests file path (.csv or .jsonl): ").strip())
+
                 elif choice == '0':
                     print("Logging out.")
                     break
@@ -0,0 +1,221 @@
+"""
+Rental prices from a rate table: a daily rate per car, per model or per make (DEFAULT_DAILY_RATE otherwise),
+multiplied day by day by a seasonal (monthly) factor and a weekend factor, with a discount for long rentals.
+
+The day factors are kept as a prefix sum over a calendar window, so the price of any period is
+    daily rate * (prefix[end] - prefix[start]) * discount(rental days)
+whatever its length. Batch quotes - many cars over one period, or one car over many periods - are computed in one
+vectorized pass with NumPy when it is installed, and with plain Python otherwise.
+
+Rate tables are JSON files; every key is optional:
+    {"default_rate": 50, "makes": {"BMW": 80}, "models": {"Toyota Corolla": 45}, "cars": {"<car_id>": 120},
+     "months": {"7": 1.25, "8": 1.25}, "weekend": 1.15, "long_rental": [[7, 0.9], [28, 0.8]]}
+"long_rental" lists (minimum rental days, price multiplier) pairs; the largest minimum reached applies.
+"""
+import bisect
+import datetime
+import itertools
+import json
+
+DEFAULT_DAILY_RATE = 50
+WINDOW_MARGIN_DAYS = 366  # Extra days of prefix sums built around a requested period, so neighbours reuse them
+MAX_WINDOW_DAYS = 50 * 366  # Periods spread further apart than this are refused instead of building huge windows
+WEEKEND = (5, 6)  # date.weekday() of Saturday and Sunday
+
+
+_numpy = None  # The numpy module once imported, False if it is not installed
+
+
+def load_numpy():
+    """
+    Import NumPy on first use, keeping it off the startup path.
+
+    Returns:
+        The numpy module, or None if it is not installed.
+    """
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy = False  # Batch quotes fall back to plain Python
+    return _numpy or None
+
+
+def _positive(name, value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+        raise ValueError(f"{name} must be a positive number, got {value!r}")
+    return value
+
+
+class RateTable:
+    """
+    Daily rates and price multipliers. The defaults charge DEFAULT_DAILY_RATE for every day.
+    """
+
+    def __init__(self, default_rate=DEFAULT_DAILY_RATE, makes=None, models=None, cars=None, months=None,
+                 weekend=1.0, long_rental=()):
+        """
+        Args:
+            default_rate: Daily rate of cars without a more specific rate
+            makes: Make -> daily rate
+            models: "Make Model" -> daily rate, preferred over the make's rate
+            cars: car_id -> daily rate, preferred over everything else
+            months: Month number (1-12) -> multiplier for days in that month
+            weekend: Multiplier for Saturdays and Sundays
+            long_rental: (minimum rental days, multiplier) pairs applied to the whole price
+
+        Raises:
+            ValueError: If a rate or multiplier is not a positive number or a month is not 1-12.
+        """
+        self.default_rate = _positive('default_rate', default_rate)
+        self.makes = {make: _positive(f"Rate of {make}", rate) for make, rate in (makes or {}).items()}
+        self.models = {model: _positive(f"Rate of {model}", rate) for model, rate in (models or {}).items()}
+        self.cars = {car_id: _positive(f"Rate of car {car_id}", rate) for car_id, rate in (cars or {}).items()}
+        self.months = {}
+        for month, multiplier in (months or {}).items():
+            if int(month) not in range(1, 13):
+                raise ValueError(f"Unknown month: {month!r}")
+            self.months[int(month)] = _positive(f"Multiplier of month {month}", multiplier)
+        self.weekend = _positive('weekend', weekend)
+        tiers = sorted((int(days), _positive(f"Multiplier for {days} days", multiplier))
+                       for days, multiplier in long_rental)
+        self.discount_days = [days for days, _ in tiers]  # Sorted minimum rental days
+        self.discount_multipliers = [1.0] + [multiplier for _, multiplier in tiers]  # Index = tiers reached
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('default_rate', DEFAULT_DAILY_RATE), data.get('makes'), data.get('models'),
+                   data.get('cars'), data.get('months'), data.get('weekend', 1.0), data.get('long_rental', ()))
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Read a rate table from a JSON file in the format described in the module docstring.
+        """
+        with open(path, encoding='utf-8') as file:
+            return cls.from_dict(json.load(file))
+
+    def daily_rate(self, car):
+        rate = self.cars.get(car.car_id)
+        if rate is None:
+            rate = self.models.get(f"{car.make} {car.model}")
+            if rate is None:
+                rate = self.makes.get(car.make, self.default_rate)
+        return rate
+
+    def day_factor(self, ordinal):
+        """
+        Multiplier of one day's price, for a day given as date.toordinal().
+        """
+        day = datetime.date.fromordinal(ordinal)
+        return self.months.get(day.month, 1.0) * (self.weekend if day.weekday() in WEEKEND else 1.0)
+
+    def discount(self, rental_days):
+        return self.discount_multipliers[bisect.bisect_right(self.discount_days, rental_days)]
+
+
+class PricingEngine:
+    """
+    Quotes rental prices from a RateTable. Safe to share between threads.
+    """
+
+    def __init__(self, rates=None, vectorize=True):
+        """
+        Args:
+            rates: RateTable (optional, defaults to DEFAULT_DAILY_RATE for every day)
+            vectorize: Use NumPy for batch quotes when it is installed
+        """
+        self.rates = rates or RateTable()
+        self.vectorize = vectorize
+        # (first day ordinal, prefix sums): prefix[i] is the sum of the day factors of the i days from the first.
+        # Replaced as a whole when it grows, so readers on other threads always see a consistent pair.
+        self._window = (0, [0.0])
+        self._array = (None, None)  # (prefix list, the same as a NumPy array) for vectorized lookups
+
+    def _prefix(self, first, last):
+        """
+        Prefix sums covering the days first..last (ordinals, last exclusive), growing the window if needed.
+
+        Returns:
+            Tuple (origin ordinal, list of prefix sums).
+        """
+        origin, prefix = self._window
+        if origin <= first and last <= origin + len(prefix) - 1:
+            return origin, prefix
+        if last - first > MAX_WINDOW_DAYS:
+            raise ValueError("Rental periods are too far apart to price together.")
+        if len(prefix) > 1 and max(last, origin + len(prefix) - 1) - min(first, origin) <= MAX_WINDOW_DAYS:
+            first, last = min(first, origin), max(last, origin + len(prefix) - 1)  # Keep the days already covered
+        origin = max(1, first - WINDOW_MARGIN_DAYS)
+        end = min(datetime.date.max.toordinal() + 1, last + WINDOW_MARGIN_DAYS)
+        factors = map(self.rates.day_factor, range(origin, end))
+        prefix = list(itertools.accumulate(factors, initial=0.0))
+        self._window = (origin, prefix)
+        return origin, prefix
+
+    def _numpy(self):
+        return load_numpy() if self.vectorize else None
+
+    def period_factor(self, start_date, end_date):
+        """
+        Price of the period for a daily rate of 1, discount included.
+        """
+        start, end = start_date.toordinal(), end_date.toordinal()
+        origin, prefix = self._prefix(start, end)
+        return (prefix[end - origin] - prefix[start - origin]) * self.rates.discount(end - start)
+
+    def quote(self, car, start_date, end_date):
+        """
+        Price of renting a car from start_date up to end_date (exclusive), rounded to the cent.
+        """
+        return round(self.rates.daily_rate(car) * self.period_factor(start_date, end_date), 2)
+
+    def quote_cars(self, cars, start_date, end_date):
+        """
+        Prices of many cars for the same period.
+
+        Returns:
+            List of prices, in the order of cars.
+        """
+        factor = self.period_factor(start_date, end_date)
+        daily_rate = self.rates.daily_rate
+        np = self._numpy()
+        if np is not None:
+            rates = np.fromiter(map(daily_rate, cars), dtype=float)
+            return np.round(rates * factor, 2).tolist()
+        return [round(daily_rate(car) * factor, 2) for car in cars]
+
+    def quote_periods(self, car, periods):
+        """
+        Prices of one car for many periods.
+
+        Args:
+            car: Car to price
+            periods: Sequence of (start date, end date) pairs
+
+        Returns:
+            List of prices, in the order of periods.
+        """
+        if not periods:
+            return []
+        starts = [start.toordinal() for start, _ in periods]
+        ends = [end.toordinal() for _, end in periods]
+        origin, prefix = self._prefix(min(starts), max(ends))
+        rate = self.rates.daily_rate(car)
+        np = self._numpy()
+        if np is not None:
+            cached, array = self._array
+            if cached is not prefix:
+                array = np.array(prefix)
+                self._array = (prefix, array)
+            prefix = array
+            starts = np.array(starts) - origin
+            ends = np.array(ends) - origin
+            discounts = np.array(self.rates.discount_multipliers)[
+                np.searchsorted(self.rates.discount_days, ends - starts, side='right')]
+            return np.round(rate * ((prefix[ends] - prefix[starts]) * discounts), 2).tolist()
+        discount = self.rates.discount
+        return [round(rate * ((prefix[end - origin] - prefix[start - origin]) * discount(end - start)), 2)
+                for start, end in zip(starts, ends)]
@@ -0,0 +1,128 @@
+"""
+Bounded cache of query results (available cars, recommendations, fee quotes), keyed by normalized parameters.
+
+Results are invalidated by generation counters instead of by searching the cache: every entry remembers the
+generations it was computed from, and is discarded on lookup if one of them has moved on since.
+    fleet generation  - advanced by any change to a car or to reserved dates; covers results over the whole fleet
+    car generations   - advanced by changes to one car; cover results that depend only on the cars they name
+Entries also expire after a time-to-live, and the least recently used entry is dropped when the cache is full.
+"""
+import collections
+import threading
+import time
+
+from src.utils.instrumentation import metrics
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL = 300  # Seconds; a safety net, since changes made through the service invalidate entries anyway
+
+
+class QueryCache:
+    """
+    LRU cache with a time-to-live and generation-based invalidation. All methods are thread-safe.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL, clock=time.monotonic):
+        """
+        Args:
+            max_entries: Entries kept before the least recently used is dropped; 0 disables caching
+            ttl: Seconds an entry stays valid (None keeps entries until they are invalidated or evicted)
+            clock: Function returning the current time in seconds
+        """
+        if max_entries < 0:
+            raise ValueError("max_entries must not be negative.")
+        if ttl is not None and ttl <= 0:
+            raise ValueError("ttl must be positive.")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()  # key -> (value, expiry time, generations), least recent first
+        self._epoch = 0  # Advanced by clear(), so results computed before it are never stored as current
+        self._fleet_generation = 0
+        self._car_generations = {}  # car_id -> generation, 0 for cars never changed
+        self.hits = self.misses = self.invalidated = self.expired = self.evictions = 0
+
+    def _generations(self, car_ids):
+        if car_ids is None:
+            return self._epoch, self._fleet_generation
+        return self._epoch, tuple(self._car_generations.get(car_id, 0) for car_id in car_ids)
+
+    def get_or_compute(self, key, compute, car_ids=None):
+        """
+        Cached result for a key, computed and stored on a miss. Exceptions raised by compute are not cached.
+
+        Args:
+            key: Hashable, normalized query parameters; the first item names the query, e.g. ('available_cars', ...)
+            compute: Zero-argument function computing the result
+            car_ids: IDs of the only cars the result depends on (optional, the whole fleet by default)
+
+        Returns:
+            The result. Cached results are shared, so callers must not modify them.
+        """
+        if not self.max_entries:
+            return compute()
+        with self._lock:
+            generations = self._generations(car_ids)
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires, entry_generations = entry
+                if entry_generations != generations:
+                    self.invalidated += 1
+                    del self._entries[key]
+                elif expires is not None and self.clock() >= expires:
+                    self.expired += 1
+                    del self._entries[key]
+                else:
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                    metrics.increment('query_cache_hits', query=key[0])
+                    return value
+            self.misses += 1
+        metrics.increment('query_cache_misses', query=key[0])
+        # Computed outside the lock; generations were read before, so a change made meanwhile makes the entry stale
+        value = compute()
+        with self._lock:
+            self._entries[key] = (value, None if self.ttl is None else self.clock() + self.ttl, generations)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def invalidate_car(self, car_id):
+        """
+        A car was added, changed or deleted: drop results that depend on it, including every fleet-wide result.
+        """
+        with self._lock:
+            self._car_generations[car_id] = self._car_generations.get(car_id, 0) + 1
+            self._fleet_generation += 1
+
+    def invalidate_fleet(self):
+        """
+        Reserved dates changed: drop fleet-wide results. Results about single cars, such as fees, are kept.
+        """
+        with self._lock:
+            self._fleet_generation += 1
+
+    def clear(self):
+        """
+        Drop every entry, e.g. after the data was reloaded from the database.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._epoch += 1
+
+    def stats(self):
+        """
+        Hit/miss statistics.
+
+        Returns:
+            Dictionary with hits, misses, entries dropped as invalidated, expired or evicted, and the current size.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses,
+                    'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                    'invalidated': self.invalidated, 'expired': self.expired, 'evictions': self.evictions,
+                    'size': len(self._entries), 'max_entries': self.max_entries, 'ttl': self.ttl}
@@ -0,0 +1,121 @@
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice
+
+
+class RecommendationIndex:
+    """
+    Index of in-service cars for recommend_cars.
+
+    Cars are bucketed by year, then grouped by their (min_rent_period, max_rent_period) window. Each group keeps
+    its cars sorted by score so a query only touches groups that accept the rental length, and inside a group only
+    the cars under the mileage limit. Results come out best-first: lowest mileage, then newest year.
+    """
+
+    def __init__(self):
+        self._years = {}  # year -> {(min_rent_period, max_rent_period): sorted list of score keys}
+        self._periods = {}  # year -> sorted list of (min_rent_period, max_rent_period) windows in that year
+        self._entries = {}  # car_id -> (year, window, score key) as currently indexed
+
+    @staticmethod
+    def score(car):
+        """
+        Sort key of a car; smaller is better.
+
+        Returns:
+            Tuple (mileage, -year, car_id) with year and mileage converted to int.
+        """
+        return int(car.mileage), -int(car.year), car.car_id
+
+    def load(self, cars):
+        """
+        Rebuild the index from cars. Cars that are out of service are left out.
+        """
+        self._years = {}
+        self._periods = {}
+        self._entries = {}
+        groups = {}
+        for car in cars:
+            if car.available:
+                key = self.score(car)
+                window = (int(car.min_rent_period), int(car.max_rent_period))
+                groups.setdefault((-key[1], window), []).append(key)
+                self._entries[car.car_id] = (-key[1], window, key)
+        for (year, window), keys in groups.items():
+            keys.sort()
+            self._years.setdefault(year, {})[window] = keys
+        for year, windows in self._years.items():
+            self._periods[year] = sorted(windows)
+
+    def add(self, car):
+        """
+        Index a car, or re-index it after its attributes changed.
+        """
+        self.remove(car.car_id)
+        if not car.available:
+            return
+        key = self.score(car)
+        year = -key[1]
+        window = (int(car.min_rent_period), int(car.max_rent_period))
+        windows = self._years.setdefault(year, {})
+        if window not in windows:
+            windows[window] = []
+            insort(self._periods.setdefault(year, []), window)
+        insort(windows[window], key)
+        self._entries[car.car_id] = (year, window, key)
+
+    update = add
+
+    def remove(self, car_id):
+        entry = self._entries.pop(car_id, None)
+        if entry is None:
+            return
+        year, window, key = entry
+        keys = self._years[year][window]
+        del keys[bisect_left(keys, key)]
+        if not keys:
+            del self._years[year][window]
+            self._periods[year].remove(window)
+            if not self._years[year]:
+                del self._years[year]
+                del self._periods[year]
+
+    def _candidates(self, year, max_mileage, rental_days):
+        # One ascending iterator of score keys per matching (year, window) group
+        years = [year] if year is not None else list(self._years)
+        for y in years:
+            windows = self._periods.get(y)
+            if not windows:
+                continue
+            # Windows are sorted by minimum period; only those with min <= rental_days can match
+            for window in islice(windows, bisect_right(windows, (rental_days, float('inf')))):
+                if window[1] < rental_days:
+                    continue
+                keys = self._years[y][window]
+                end = len(keys) if max_mileage is None else bisect_left(keys, (max_mileage + 1,))
+                if end:
+                    yield islice(keys, end)
+
+    def query(self, year=None, max_mileage=None, rental_days=1, accept=None, limit=None, offset=0):
+        """
+        Best-scored car IDs matching the criteria.
+
+        Args:
+            year: Exact production year (optional)
+            max_mileage: Maximum mileage (optional)
+            rental_days: Rental length that must fit the car's rent-period window
+            accept: Predicate on car_id for checks the index does not cover, e.g. date availability (optional)
+            limit: Page size (optional, all matches if omitted)
+            offset: Number of matches to skip, for pagination
+
+        Returns:
+            List of car IDs, best score first.
+        """
+        matches = heapq.merge(*self._candidates(year, max_mileage, rental_days))
+        if accept is not None:
+            matches = (key for key in matches if accept(key[2]))
+        page = islice(matches, offset, None if limit is None else offset + limit)
+        return [key[2] for key in page]
+
+    def __len__(self):
+        return len(self._entries)
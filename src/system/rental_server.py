@@ -0,0 +1,549 @@
+"""
+Asyncio network service exposing RentalService to many concurrent counter terminals.
+
+Protocol: newline-delimited JSON over TCP. Each request is one line
+    {"id": 1, "op": "login", "args": {"username": "alice", "password": "secret"}}
+and gets one response line
+    {"id": 1, "ok": true, "result": {...}}   or   {"id": 1, "ok": false, "error": {"code": "...", "message": "..."}}
+A connection is a session: after "login" the connection acts as that user until "logout". With --metrics, admins
+can fetch the server's metrics with {"op": "metrics", "args": {"format": "json" | "prometheus"}}, and the hit/miss
+statistics of the query cache with {"op": "cache_stats"}. Admins move ended and rejected bookings out of the working
+set with {"op": "archive_bookings"} (or every --archive-every hours); "booking_history" queries the archive.
+
+Reads run concurrently on a thread pool. Writes are queued to a single writer task and applied one at a time, with
+reads held off while a write runs, so the in-memory state is never read half-updated. Reads never write: the writer
+saves pending changes after each batch, and reports, which may first count bookings missing from the report totals,
+go through the writer. Password hashing runs on the AuthService pool and holds no lock. Changes committed by other
+processes (console terminals, other servers) are picked up before each batch of writes and at least every
+REFRESH_INTERVAL seconds.
+
+Usage (from the repository root):
+    python -m src.system.rental_server --port 8765 --lazy --query-mode sql
+"""
+import argparse
+import asyncio
+import functools
+import json
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from itertools import islice
+
+from src.database.database_manager import DatabaseManager
+from src.database.journal_manager import JournalManager
+from src.database.sharded_manager import ShardedDatabaseManager, shard_paths
+from src.system.pricing import PricingEngine, RateTable
+from src.system.query_cache import DEFAULT_MAX_ENTRIES, DEFAULT_TTL, QueryCache
+from src.system.rental_service import USER_ROLES, RentalService, ServiceError
+from src.utils.instrumentation import describe_arguments, metrics
+
+DEFAULT_PORT = 8765
+DEFAULT_READ_WORKERS = 8
+DEFAULT_PAGE_SIZE = 100  # Items returned by list operations when the request gives no limit
+MAX_LINE_BYTES = 1 << 20
+REFRESH_INTERVAL = 1.0  # Seconds between checks for changes committed by other processes
+
+
+class ReadWriteLock:
+    """
+    Asyncio lock shared by any number of readers or held by one writer. A waiting writer blocks new readers so
+    writes are not starved by a steady stream of reads.
+    """
+
+    def __init__(self):
+        self._readers = 0
+        self._writing = False
+        self._writers_waiting = 0
+        self._condition = asyncio.Condition()
+
+    @asynccontextmanager
+    async def reading(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: not self._writing and not self._writers_waiting)
+            self._readers += 1
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @asynccontextmanager
+    async def writing(self):
+        async with self._condition:
+            self._writers_waiting += 1
+            try:
+                await self._condition.wait_for(lambda: not self._writing and not self._readers)
+            finally:
+                self._writers_waiting -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+
+def user_json(user):
+    return {'username': user.username, 'role': user.role}
+
+
+def car_json(car):
+    return {'car_id': car.car_id, 'make': car.make, 'model': car.model, 'year': car.year, 'mileage': car.mileage,
+            'available': bool(car.available), 'min_rent_period': car.min_rent_period,
+            'max_rent_period': car.max_rent_period}
+
+
+def booking_json(booking):
+    return {'booking_id': booking.booking_id, 'customer_username': booking.customer_username,
+            'car_id': booking.car_id, 'start_date': booking.start_date.isoformat(),
+            'end_date': booking.end_date.isoformat(), 'status': booking.status}
+
+
+def _page(items, limit, offset):
+    limit = DEFAULT_PAGE_SIZE if limit is None else int(limit)
+    offset = int(offset or 0)
+    return list(islice(items, offset, offset + limit))
+
+
+class RentalServer:
+    """
+    Serves a RentalService over the JSON line protocol described in the module docstring.
+    """
+
+    def __init__(self, service, read_workers=DEFAULT_READ_WORKERS, archive_interval=None):
+        """
+        Args:
+            service: RentalService holding the data
+            read_workers: Threads that run read operations concurrently
+            archive_interval: Seconds between archiving bookings that have ended (optional, never if omitted)
+        """
+        self.service = service
+        # Reads run concurrently and must not write: the writer saves pending changes after every batch instead
+        service.sync_queries = False
+        self.archive_interval = archive_interval
+        self._lock = ReadWriteLock()
+        self._read_executor = ThreadPoolExecutor(max_workers=read_workers, thread_name_prefix='read')
+        self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='write')
+        self._writes = None  # asyncio.Queue of (call, future), created on the server's event loop
+        self._writer_task = None
+        self._refresh_task = None
+        self._archive_task = None
+        self._server = None
+
+    async def start(self, host='127.0.0.1', port=DEFAULT_PORT):
+        """
+        Start listening. Port 0 picks a free port.
+
+        Returns:
+            (host, port) the server is bound to.
+        """
+        self._writes = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._write_loop())
+        self._refresh_task = asyncio.create_task(self._refresh_loop())
+        if self.archive_interval:
+            self._archive_task = asyncio.create_task(self._archive_loop())
+        self._server = await asyncio.start_server(self._handle_client, host, port, limit=MAX_LINE_BYTES)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+        self._writer_task.cancel()
+        self._refresh_task.cancel()
+        if self._archive_task is not None:
+            self._archive_task.cancel()
+        self._read_executor.shutdown(wait=True)
+        self._write_executor.shutdown(wait=True)
+
+    async def read(self, function, *args):
+        """
+        Run a read-only call on the reader pool, concurrently with other reads.
+        """
+        async with self._lock.reading():
+            return await asyncio.get_running_loop().run_in_executor(self._read_executor,
+                                                                    functools.partial(function, *args))
+
+    async def write(self, function, *args):
+        """
+        Queue a state-changing call for the writer task and wait for its result.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._writes.put((functools.partial(function, *args), future))
+        return await future
+
+    async def _write_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            call, future = await self._writes.get()
+            async with self._lock.writing():
+                # Writes are checked against the database anyway; refreshing first avoids needless conflicts
+                try:
+                    await loop.run_in_executor(self._write_executor, self.service.refresh)
+                except Exception:
+                    pass  # Retried before the next batch; the writes below are still checked by the database
+                # Apply every write queued so far while readers are held off, instead of one per lock round trip
+                while True:
+                    try:
+                        result = await loop.run_in_executor(self._write_executor, call)
+                    except Exception as error:
+                        if not future.done():
+                            future.set_exception(error)
+                    else:
+                        if not future.done():
+                            future.set_result(result)
+                    if self._writes.empty():
+                        break
+                    call, future = self._writes.get_nowait()
+                # Leave nothing unsaved for the readers' database queries
+                try:
+                    await loop.run_in_executor(self._write_executor, self.service.sync)
+                except Exception:
+                    pass  # The failed save reloaded the data; the next batch starts from the database's state
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(REFRESH_INTERVAL)
+            try:
+                await self.write(self.service.refresh)
+            except Exception:
+                pass  # Tried again on the next tick
+
+    async def _archive_loop(self):
+        while True:
+            await asyncio.sleep(self.archive_interval)
+            try:
+                await self.write(self.service.archive_bookings)
+            except Exception:
+                pass  # Tried again on the next tick
+
+    async def _handle_client(self, reader, writer):
+        session = {'user': None}
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    break  # Line over MAX_LINE_BYTES or connection reset
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                writer.write(json.dumps(await self._dispatch(session, line)).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass  # Client went away, or the server is shutting down
+        finally:
+            writer.close()
+
+    async def _dispatch(self, session, line):
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError
+            request_id = request.get('id')
+            args = request.get('args') or {}
+            handler = getattr(self, f"_op_{request.get('op')}", None)
+            if handler is None or not isinstance(args, dict):
+                raise ServiceError(f"Unknown operation: {request.get('op')}")
+            return {'id': request_id, 'ok': True, 'result': await self._call(request['op'], handler, session, args)}
+        except ServiceError as error:
+            return {'id': request_id, 'ok': False, 'error': {'code': error.code, 'message': str(error)}}
+        except (ValueError, TypeError):
+            message = "Malformed request." if request_id is None else f"Invalid arguments for {request.get('op')}."
+            return {'id': request_id, 'ok': False, 'error': {'code': 'invalid', 'message': message}}
+        except Exception:
+            return {'id': request_id, 'ok': False, 'error': {'code': 'internal', 'message': "Internal error."}}
+
+    @staticmethod
+    async def _call(op, handler, session, args):
+        if not metrics.enabled:
+            return await handler(session, **args)
+        # Time spent waiting for the lock and the writer queue is included: it is what the client sees
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = await handler(session, **args)
+            failed = False
+            return result
+        finally:
+            seconds = time.perf_counter() - started
+            slow = metrics.slow_threshold is not None and seconds >= metrics.slow_threshold
+            metrics.observe(f"server.{op}", seconds, failed, describe_arguments(args.items()) if slow else None)
+
+    @staticmethod
+    def _require(session, role=None):
+        user = session['user']
+        if user is None:
+            raise ServiceError("Please log in first.", 'unauthorized')
+        if role is not None and user.role != role:
+            raise ServiceError(f"This operation is only available to {role}s.", 'unauthorized')
+        return user
+
+    # Operations. Each takes the session and the request arguments and returns a JSON-serializable result.
+
+    async def _op_ping(self, session):
+        return 'pong'
+
+    async def _op_register(self, session, username, password, role):
+        service = self.service
+        if role not in USER_ROLES:
+            raise ServiceError(f"Role must be {' or '.join(USER_ROLES)}.")
+        if role == 'admin':
+            self._require(session, 'admin')  # Only administrators can create administrators
+        if await self.read(service.users.__contains__, username):
+            raise ServiceError("Username already exists.", 'conflict')
+        password_hash = await asyncio.wrap_future(service.auth.hash_password_async(password))
+        return user_json(await self.write(service.create_user, username, password_hash, role))
+
+    async def _op_login(self, session, username, password):
+        service = self.service
+        user = await self.read(service.users.get, username)
+        matches, new_hash = await asyncio.wrap_future(
+            service.auth.check_password_async(password, user.password if user else None))
+        if not matches:
+            raise ServiceError("Invalid username or password.", 'unauthorized')
+        if new_hash:
+            await self.write(service.rehash_password, user, new_hash)
+        session['user'] = user
+        return user_json(user)
+
+    async def _op_logout(self, session):
+        session['user'] = None
+        return None
+
+    async def _op_available_cars(self, session, start_date=None, end_date=None, limit=None, offset=0):
+        cars = await self.read(self.service.available_cars, start_date, end_date)
+        return [car_json(car) for car in _page(cars, limit, offset)]
+
+    async def _op_recommend_cars(self, session, start_date, end_date, year=None, mileage=None, limit=10, offset=0,
+                                 order_by='mileage'):
+        cars = await self.read(self.service.recommend_cars, year, mileage, start_date, end_date, limit, offset,
+                               order_by)
+        return [car_json(car) for car in cars]
+
+    async def _op_calculate_fee(self, session, car_id, start_date, end_date):
+        return await self.read(self.service.calculate_rental_fee, car_id, start_date, end_date)
+
+    async def _op_quote(self, session, car_ids=None, start_date=None, end_date=None, car_id=None, periods=None):
+        # Either many cars for one period, or one car for many periods
+        if car_ids is not None and start_date is not None and end_date is not None:
+            return await self.read(self.service.quote_cars, list(car_ids), start_date, end_date)
+        if car_id is not None and periods is not None:
+            return await self.read(self.service.quote_periods, car_id, [tuple(period) for period in periods])
+        raise ServiceError("Give car_ids with start_date and end_date, or car_id with periods.")
+
+    async def _op_list_cars(self, session, limit=None, offset=0):
+        cars = await self.read(_page, self.service.cars, limit, offset)
+        return [car_json(car) for car in cars]
+
+    async def _op_book_car(self, session, car_id, start_date, end_date):
+        user = self._require(session, 'customer')
+        return booking_json(await self.write(self.service.book_car, user, car_id, start_date, end_date))
+
+    async def _op_book_any_car(self, session, start_date, end_date, make=None, model=None, year=None):
+        user = self._require(session, 'customer')
+        return booking_json(await self.write(self.service.book_any_car, user, start_date, end_date, make, model,
+                                             year))
+
+    async def _op_my_bookings(self, session, limit=None, offset=0):
+        user = self._require(session)
+        bookings = await self.read(lambda: _page(self.service.bookings.by_customer(user.username), limit, offset))
+        return [booking_json(booking) for booking in bookings]
+
+    async def _op_list_bookings(self, session, status=None, limit=None, offset=0):
+        self._require(session, 'admin')
+        bookings = await self.read(lambda: _page(self.service.list_bookings(status), limit, offset))
+        return [booking_json(booking) for booking in bookings]
+
+    async def _op_find_bookings(self, session, status="Pending", start_date=None, end_date=None, car_id=None,
+                                customer=None, limit=None, offset=0):
+        self._require(session, 'admin')
+        bookings = await self.read(lambda: _page(self.service.find_bookings(status, start_date, end_date, car_id,
+                                                                           customer), limit, offset))
+        return [booking_json(booking) for booking in bookings]
+
+    async def _op_allocate_requests(self, session, requests):
+        # Each request: {"customer", "start_date", "end_date", optional "make", "model", "year" and "id"}
+        self._require(session, 'admin')
+        service = self.service
+
+        def allocate():
+            checked = []
+            for index, request in enumerate(requests):
+                try:
+                    checked.append(service.car_request(request.get('customer'), request.get('start_date'),
+                                                       request.get('end_date'), request.get('make'),
+                                                       request.get('model'), request.get('year'),
+                                                       request.get('id', index)))
+                except ServiceError as error:
+                    raise ServiceError(f"Request {request.get('id', index)}: {error}", error.code) from None
+            return service.allocate_requests(checked)
+        report = await self.write(allocate)
+        return {'booked': [dict(booking_json(booking), request_id=request_id)
+                           for request_id, booking in zip(report.request_ids, report.bookings)],
+                'unassigned': [request.request_id for request in report.unassigned],
+                'booked_days': report.booked_days(), 'batches': report.batches, 'error': report.error}
+
+    async def _op_archive_bookings(self, session, before=None):
+        self._require(session, 'admin')
+        return {'archived': await self.write(self.service.archive_bookings, before)}
+
+    async def _op_booking_history(self, session, customer=None, car_id=None, start_date=None, end_date=None,
+                                  status=None, limit=None, offset=0):
+        # Customers only see their own past bookings
+        user = self._require(session)
+        if user.role != 'admin':
+            customer = user.username
+        bookings = await self.read(lambda: _page(self.service.booking_history(customer, car_id, start_date, end_date,
+                                                                             status), limit, offset))
+        return [booking_json(booking) for booking in bookings]
+
+    async def _op_review_bookings(self, session, action, booking_ids=None, start_date=None, end_date=None,
+                                  car_id=None, customer=None):
+        # The listed bookings, or every pending booking matching the filters
+        self._require(session, 'admin')
+        service = self.service
+
+        def review():
+            bookings = booking_ids
+            if bookings is None:
+                bookings = service.find_bookings("Pending", start_date, end_date, car_id, customer)
+            return service.review_bookings(bookings, action)
+        report = await self.write(review)
+        return {'approved': report.approved, 'rejected': report.rejected, 'auto_rejected': report.auto_rejected,
+                'skipped': report.skipped, 'batches': report.batches, 'error': report.error}
+
+    async def _op_approve_booking(self, session, booking_id):
+        self._require(session, 'admin')
+        return booking_json(await self.write(self.service.approve_booking, booking_id))
+
+    async def _op_reject_booking(self, session, booking_id):
+        self._require(session, 'admin')
+        return booking_json(await self.write(self.service.reject_booking, booking_id))
+
+    async def _op_add_car(self, session, make, model, year, mileage, min_rent_period, max_rent_period):
+        self._require(session, 'admin')
+        return car_json(await self.write(self.service.add_car, make, model, year, mileage, min_rent_period,
+                                         max_rent_period))
+
+    async def _op_update_car(self, session, car_id, make=None, model=None, year=None, mileage=None, available=None,
+                             min_rent_period=None, max_rent_period=None):
+        self._require(session, 'admin')
+        return car_json(await self.write(self.service.update_car, car_id, make, model, year, mileage, available,
+                                         min_rent_period, max_rent_period))
+
+    async def _op_delete_car(self, session, car_id):
+        self._require(session, 'admin')
+        await self.write(self.service.delete_car, car_id)
+        return None
+
+    async def _op_metrics(self, session, format='json'):
+        self._require(session, 'admin')
+        if not metrics.enabled:
+            raise ServiceError("Metrics are not enabled; start the server with --metrics.")
+        if format == 'prometheus':
+            return metrics.to_prometheus()
+        return metrics.snapshot()
+
+    async def _op_report(self, session, group='fleet', key=None, month=None):
+        self._require(session, 'admin')
+        # Through the writer: a report first counts the bookings its totals are missing
+        return await self.write(self.service.report, group, key, month)
+
+    async def _op_report_groups(self, session, group='make', month=None, limit=None, offset=0):
+        self._require(session, 'admin')
+        return _page(await self.write(self.service.report_groups, group, month), limit, offset)
+
+    async def _op_cache_stats(self, session):
+        self._require(session, 'admin')
+        return self.service.query_cache.stats()
+
+
+async def serve(service, host, port, read_workers, archive_interval=None):
+    server = RentalServer(service, read_workers, archive_interval)
+    try:
+        # Shut down on SIGTERM as on Ctrl+C, so the database is closed and the metrics are written
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except NotImplementedError:
+        pass  # Not available on Windows
+    host, port = await server.start(host, port)
+    print(f"Listening on {host}:{port}", flush=True)
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="0 picks a free port")
+    parser.add_argument('--db', help="database file (default: src/database/car_rental.db)")
+    parser.add_argument('--journal', metavar='DIR',
+                        help="store data as an append-only event journal in DIR (query mode memory only)")
+    parser.add_argument('--shards', metavar='DIR',
+                        help="partition cars and bookings across the SQLite files in DIR, searched in parallel")
+    parser.add_argument('--shard-count', type=int, help="number of shards of a new --shards directory (default 4)")
+    parser.add_argument('--shard-workers', type=int,
+                        help="processes searching shards in parallel (default: one per shard up to the CPU count)")
+    parser.add_argument('--lazy', action='store_true', help="read data from the database on demand")
+    parser.add_argument('--query-mode', choices=('memory', 'sql'), default='memory')
+    parser.add_argument('--read-workers', type=int, default=DEFAULT_READ_WORKERS,
+                        help="threads serving read operations concurrently")
+    parser.add_argument('--metrics', nargs='?', const='', metavar='PATH',
+                        help="record metrics, served to admins by the metrics operation and written to PATH on exit "
+                             "(Prometheus text if PATH ends in .prom, JSON otherwise)")
+    parser.add_argument('--slow-ms', type=float, help="with --metrics, log operations slower than this")
+    parser.add_argument('--rates', metavar='PATH', help="JSON rate table (default: a flat daily rate)")
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_ENTRIES,
+                        help="query results cached (0 disables the cache)")
+    parser.add_argument('--cache-ttl', type=float, default=DEFAULT_TTL,
+                        help="seconds a cached result stays valid (0 keeps it until a change invalidates it)")
+    parser.add_argument('--archive-every', type=float, metavar='HOURS',
+                        help="archive bookings that have ended every HOURS hours (default: only on request)")
+    args = parser.parse_args()
+    if args.journal and (args.db or args.query_mode == 'sql'):
+        parser.error("--journal cannot be combined with --db or --query-mode sql")
+    if args.shards and (args.db or args.journal):
+        parser.error("--shards cannot be combined with --db or --journal")
+
+    if args.metrics is not None:
+        metrics.enable(slow_threshold=None if args.slow_ms is None else args.slow_ms / 1000)
+
+    if args.journal:
+        db_manager = JournalManager(args.journal)
+    elif args.shards:
+        try:
+            paths = shard_paths(args.shards, args.shard_count)
+        except ValueError as error:
+            parser.error(str(error))
+        db_manager = ShardedDatabaseManager(paths, workers=args.shard_workers, pool_size=args.read_workers + 1)
+    else:
+        # One connection per reader thread plus one for the writer
+        db_manager = DatabaseManager(args.db, pool_size=args.read_workers + 1)
+    pricing = PricingEngine(RateTable.from_file(args.rates)) if args.rates else None
+    query_cache = QueryCache(args.cache_size, args.cache_ttl or None)
+    service = RentalService(db_manager, lazy=args.lazy, query_mode=args.query_mode, pricing=pricing,
+                            query_cache=query_cache)
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.read_workers,
+                          args.archive_every and args.archive_every * 3600))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    finally:
+        db_manager.close()
+        if args.metrics:
+            metrics.write(args.metrics)
+
+
+if __name__ == '__main__':
+    main()
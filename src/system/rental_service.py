@@ -0,0 +1,1211 @@
+import uuid  # Generates car and booking IDs
+import datetime
+import functools  # wraps() for the requires_data decorator
+import itertools
+import threading  # Guards building the recommendation index from concurrent readers
+
+from src.models.user import User
+from src.models.car import Car
+from src.models.booking import Booking
+from src.database.database_manager import (DatabaseManager, ConflictError, REPORT_GRAINS, TABLE_COLUMNS,
+                                           TOTALS_BACKFILL)
+from src.database.unit_of_work import UnitOfWork  # Tracks changed objects between saves
+from src.system.repositories import (UserRepository, CarRepository, BookingRepository, LazyUserRepository,
+                                     LazyCarRepository, LazyBookingRepository)
+from src.system.availability import AvailabilityIndex, LazyAvailabilityIndex  # Reserved date ranges per car
+from src.system.recommendation import RecommendationIndex  # Ranked search structure for recommend_cars
+from src.system.allocation import CarRequest, FleetAllocator  # Assigns requests for any matching car to cars
+from src.system.auth_service import AuthService  # Salted password hashing on a thread pool
+from src.system.pricing import PricingEngine  # Daily rates, seasonal multipliers and long-rental discounts
+from src.system.query_cache import QueryCache  # Cached search and quote results
+from src.utils.dates import parse_date, format_date, month_days  # Memoized YYYY-MM-DD parsing and formatting
+from src.utils.instrumentation import timed  # Opt-in per-operation timers
+
+QUERY_MODES = ('memory', 'sql')  # Where searches are filtered: in Python objects or by SQL in the database
+RECOMMENDATION_ORDERS = ('mileage', 'price')  # How recommend_cars ranks its matches
+REVIEW_ACTIONS = ('approve', 'reject')
+USER_ROLES = ('customer', 'admin')
+BULK_REVIEW_BATCH_SIZE = 1000  # Bookings decided per transaction by review_bookings and allocate_requests
+# What a crash may lose: 'full' syncs every commit to disk, 'normal' (SQLite WAL with synchronous=NORMAL) may lose
+# the last commits on power loss, 'deferred' saves through a WriteBehind and may lose its last flush interval
+DURABILITY_LEVELS = ('full', 'normal', 'deferred')
+
+
+class ServiceError(Exception):
+    """
+    A request that cannot be carried out. The message is meant for the end user.
+    """
+
+    def __init__(self, message, code='invalid'):
+        """
+        Args:
+            message: Explanation for the user, e.g. "Car not found."
+            code: Machine-readable category: 'invalid', 'not_found', 'conflict' or 'unauthorized'
+        """
+        super().__init__(message)
+        self.code = code
+
+
+class ReviewReport:
+    """
+    Outcome of a bulk review: bookings approved, rejected, rejected automatically because they overlap an approved
+    booking or their car is gone or out of service, and skipped because they were no longer pending.
+    """
+
+    def __init__(self):
+        self.approved = 0
+        self.rejected = 0
+        self.auto_rejected = 0
+        self.skipped = 0
+        self.batches = 0  # Transactions committed
+        self.error = None  # Why the review stopped early, if it did
+
+    def add(self, other):
+        self.approved += other.approved
+        self.rejected += other.rejected
+        self.auto_rejected += other.auto_rejected
+        self.skipped += other.skipped
+        self.batches += other.batches
+
+    def __str__(self):
+        summary = (f"{self.approved} approved, {self.rejected + self.auto_rejected} rejected "
+                   f"({self.auto_rejected} because they overlap an approved booking or the car is unavailable), "
+                   f"{self.skipped} skipped (no longer pending), in {self.batches} transactions.")
+        if self.error:
+            summary += f"\nStopped early: {self.error}"
+        return summary
+
+
+class AllocationReport:
+    """
+    Outcome of a batch allocation: the bookings made and the requests no matching car was free for.
+    """
+
+    def __init__(self):
+        self.bookings = []  # Approved Booking objects, one per served request
+        self.request_ids = []  # ID of the request each booking serves
+        self.unassigned = []  # CarRequest objects that were not served
+        self.batches = 0  # Transactions committed
+        self.error = None  # Why the allocation stopped early, if it did
+
+    def booked_days(self):
+        return sum((booking.end_date - booking.start_date).days for booking in self.bookings)
+
+    def __str__(self):
+        summary = (f"{len(self.bookings)} requests booked ({self.booked_days()} days), "
+                   f"{len(self.unassigned)} without a free matching car, in {self.batches} transactions.")
+        if self.error:
+            summary += f"\nStopped early: {self.error}"
+        return summary
+
+
+def requires_data(method):
+    """
+    Load the data deferred by fast_start before the first operation that needs it.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if not self.data_loaded:
+            self.load_data()
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _parse_dates(start_date_str, end_date_str):
+    try:
+        return parse_date(start_date_str), parse_date(end_date_str)
+    except (TypeError, ValueError):
+        raise ServiceError("Invalid date format. Please use YYYY-MM-DD.") from None
+
+
+def _parse_optional_date(value):
+    if not value:
+        return None
+    try:
+        return parse_date(value)
+    except (TypeError, ValueError):
+        raise ServiceError("Invalid date format. Please use YYYY-MM-DD.") from None
+
+
+def _check_rent_period(car, start_date, end_date):
+    rental_days = (end_date - start_date).days
+    if rental_days < car.min_rent_period or rental_days > car.max_rent_period:
+        raise ServiceError(f"Rental period must be between {car.min_rent_period} and {car.max_rent_period} days.")
+    return rental_days
+
+
+def _check_role(role):
+    if role not in USER_ROLES:
+        raise ServiceError(f"Role must be {' or '.join(USER_ROLES)}.")
+
+
+class RentalService:
+    """
+    Business operations on users, cars and bookings, without any console I/O. Operations return their results
+    and raise ServiceError when a request cannot be carried out.
+    """
+
+    def __init__(self, db_manager=None, lazy=False, query_mode='memory', auth=None, fast_start=False, pricing=None,
+                 query_cache=None, write_behind=None):
+        """
+        Create repositories for users, cars, and bookings, and load data from the database.
+
+        Args:
+            db_manager: Database manager to use (optional, defaults to one for database/car_rental.db)
+            lazy: Read users, cars and bookings from the database on demand instead of loading everything at startup
+            query_mode: 'memory' filters searches in Python, 'sql' pushes the filters into indexed SQL queries
+            auth: AuthService that hashes and checks passwords (optional, defaults to scrypt on a thread pool)
+            fast_start: Defer loading data until the first operation that needs it, e.g. the first login
+            pricing: PricingEngine that quotes rental fees (optional, defaults to a flat daily rate)
+            query_cache: QueryCache for available cars, recommendations and fee quotes (optional, defaults to
+                DEFAULT_MAX_ENTRIES entries; QueryCache(0) disables caching)
+            write_behind: WriteBehind that saves changes in the background (optional, by default every operation
+                commits before it returns); needs the data in memory, so it cannot be combined with lazy
+        """
+        if query_mode not in QUERY_MODES:
+            raise ValueError(f"Unknown query mode: {query_mode}")
+        if lazy and write_behind is not None:
+            raise ValueError("Write-behind cannot be combined with lazy loading.")
+        self.db_manager = db_manager or DatabaseManager()  # Instance of the database manager
+        self.auth = auth or AuthService()  # Password hashing, run on worker threads
+        self.pricing = pricing or PricingEngine()  # Rental fees from the rate table
+        self.query_cache = query_cache or QueryCache()  # Results of read-only queries, invalidated by changes
+        self.unit_of_work = UnitOfWork()  # New, modified and deleted objects not yet written to the database
+        self.write_behind = write_behind  # Background writer the changes are handed to, if any
+        self.lazy = lazy
+        self.query_mode = query_mode
+        if lazy:
+            self.users = LazyUserRepository(self.db_manager, self.unit_of_work)
+            self.cars = LazyCarRepository(self.db_manager, self.unit_of_work)
+            self.bookings = LazyBookingRepository(self.db_manager, self.unit_of_work)
+            self.availability = LazyAvailabilityIndex(self._reserved_bookings)
+        else:
+            self.users = UserRepository(self.unit_of_work)  # Users keyed by username
+            self.cars = CarRepository(self.unit_of_work)  # Cars keyed by car_id
+            self.bookings = BookingRepository(self.unit_of_work)  # Bookings keyed by booking_id, indexed by car/customer/status
+            self.availability = AvailabilityIndex()  # Date ranges reserved by approved bookings
+        self.recommendations = RecommendationIndex()  # In-service cars by year, rent period and mileage
+        self._recommendations_loaded = False  # The recommendation index is built on first use in lazy mode
+        self._recommendations_lock = threading.Lock()
+        # Whether queries that read the database save pending changes first. A caller that runs queries from several
+        # threads turns this off and calls sync() itself, from the thread that writes.
+        self.sync_queries = True
+        self.data_loaded = False  # Set by load_data; in fast-start mode the first requires_data method loads
+        self._data_version = None  # db_manager.data_version() when the data was loaded, polled by refresh()
+        if not fast_start:
+            self.load_data()  # Load data from the database
+
+    @timed()
+    def load_data(self):
+        """
+        Load user, car, and booking data from the database. In lazy mode only cached objects are dropped.
+        """
+        self._recommendations_loaded = False
+        self.data_loaded = True
+        self.query_cache.clear()
+        # Taken before reading, so a commit made by another process while loading is picked up by refresh()
+        self._data_version = self.db_manager.data_version()
+        if self.lazy:
+            self.users.load()
+            self.cars.load()
+            self.bookings.load()
+            self.availability.load()
+            return
+
+        # Rows are streamed from the database straight into the repositories
+        self.users.load(map(UserRepository.from_row, self.db_manager.stream('users')))
+        self.cars.load(map(CarRepository.from_row, self.db_manager.stream('cars')))
+        self.bookings.load(map(BookingRepository.from_row, self.db_manager.stream('bookings')))
+        self.availability.load(self.bookings.by_status("Approved"))
+        if self.query_mode == 'memory':
+            self._ensure_recommendations()
+
+    def _reserved_bookings(self, car_id):
+        # Loader for the lazy availability index
+        return [booking for booking in self.bookings.by_car(car_id) if booking.status == "Approved"]
+
+    def _ensure_recommendations(self):
+        if not self._recommendations_loaded:
+            with self._recommendations_lock:
+                if not self._recommendations_loaded:  # Another reader may have built it while this one waited
+                    self.recommendations.load(self.cars)
+                    self._recommendations_loaded = True
+
+    def _index_car(self, car):
+        # Keep the recommendation index current; an index that is not built yet picks the change up when it is
+        if self._recommendations_loaded:
+            self.recommendations.update(car)
+
+    def _unindex_car(self, car_id):
+        if self._recommendations_loaded:
+            self.recommendations.remove(car_id)
+
+    def _sync_for_sql(self):
+        # SQL queries only see saved rows, so write pending changes first
+        if self.sync_queries:
+            self.sync()
+
+    def sync(self):
+        """
+        Save pending changes and wait for the background writer, so that queries reading the database see them.
+
+        Raises:
+            ServiceError: As save_data() does.
+        """
+        if self.unit_of_work.has_changes():
+            self.save_data()
+        self.flush()
+
+    @timed()
+    def refresh(self):
+        """
+        Reload the data if another process has committed changes since it was loaded. Does nothing before the data
+        is loaded or while changes are waiting to be saved.
+
+        Returns:
+            True if the data was reloaded.
+        """
+        if not self.data_loaded or self.unit_of_work.has_changes():
+            return False
+        if self.write_behind is not None and self.write_behind.pending():
+            return False
+        if self.db_manager.data_version() == self._data_version:
+            return False
+        self.load_data()
+        return True
+
+    @timed()
+    def save_data(self):
+        """
+        Save the users, cars, and bookings changed since the last save to the database in one transaction.
+
+        With write-behind the changes are only queued, and a conflict the background writer ran into is raised by
+        the next save (or flush) instead.
+
+        Raises:
+            ServiceError: If another process changed the same rows or reserved the same dates first. The unsaved
+                changes are dropped and the data is reloaded, so the operation can be retried on current data.
+        """
+        try:
+            if self.write_behind is None:
+                self.unit_of_work.commit(self.db_manager)
+                return
+            error = self.write_behind.take_error()
+            if error is not None:
+                raise error
+            if self.unit_of_work.has_changes():
+                self.write_behind.submit(self.unit_of_work.collect())
+        except ConflictError as error:
+            self._conflict(error)
+
+    def _conflict(self, error):
+        self.unit_of_work.clear()
+        self.load_data()
+        raise ServiceError(str(error), 'conflict') from None
+
+    @timed()
+    def flush(self):
+        """
+        Wait until the changes queued for the background writer are committed. Does nothing without write-behind.
+
+        Raises:
+            ServiceError: As save_data() does, if the writer ran into a conflict.
+        """
+        if self.write_behind is None:
+            return
+        try:
+            self.write_behind.flush()
+        except ConflictError as error:
+            self._conflict(error)
+
+    def close(self):
+        """
+        Commit what is still queued for the background writer, stop it and close the database connection.
+
+        Raises:
+            ServiceError: If the queued changes could not be saved because of a conflict; they are lost.
+        """
+        try:
+            if self.write_behind is not None:
+                try:
+                    self.write_behind.close()
+                except ConflictError as error:
+                    raise ServiceError(str(error), 'conflict') from None
+        finally:
+            self.db_manager.close()
+
+    @timed()
+    @requires_data
+    def register_user(self, username, password, role):
+        """
+        Register a new user.
+
+        Args:
+            username: Username
+            password: Password
+            role: Role (customer/admin)
+
+        Returns:
+            The new User.
+
+        Raises:
+            ServiceError: If the username already exists or the role is unknown.
+        """
+        _check_role(role)
+        if username in self.users:
+            raise ServiceError("Username already exists.", 'conflict')
+        return self.create_user(username, self.auth.hash_password_async(password).result(), role)
+
+    @timed()
+    @requires_data
+    def create_user(self, username, password_hash, role):
+        """
+        Store a new user whose password was already hashed with self.auth.
+
+        Returns:
+            The new User.
+
+        Raises:
+            ServiceError: If the username already exists or the role is unknown.
+        """
+        _check_role(role)
+        if username in self.users:
+            raise ServiceError("Username already exists.", 'conflict')
+        user = User(username, password_hash, role)
+        self.users.add(user)
+        self.save_data()
+        return user
+
+    @timed()
+    @requires_data
+    def login_user(self, username, password):
+        """
+        User login.
+
+        Args:
+            username: Username
+            password: Password
+
+        Returns:
+            The User whose username and password match.
+
+        Raises:
+            ServiceError: If the username is unknown or the password is wrong.
+        """
+        user = self.users.get(username)
+        # Unknown users are checked against a dummy hash, so both failures take equally long
+        matches, new_hash = self.auth.check_password_async(password, user.password if user else None).result()
+        if not matches:
+            raise ServiceError("Invalid username or password.", 'unauthorized')
+        if new_hash:
+            self.rehash_password(user, new_hash)
+        return user
+
+    @timed()
+    def rehash_password(self, user, password_hash):
+        """
+        Replace a user's legacy MD5 or outdated KDF hash after a successful login.
+        """
+        self.users.update(user, password=password_hash)
+        self.save_data()
+
+    @timed()
+    @requires_data
+    def add_car(self, make, model, year, mileage, min_rent_period, max_rent_period):
+        """
+        Add a new car.
+
+        Args:
+            make: Manufacturer
+            model: Model
+            year: Production year
+            mileage: Mileage (in km)
+            min_rent_period: Minimum rental period (days)
+            max_rent_period: Maximum rental period (days)
+
+        Returns:
+            The new Car.
+        """
+        try:
+            year, mileage = int(year), int(mileage)
+            min_rent_period, max_rent_period = int(min_rent_period), int(max_rent_period)
+        except (TypeError, ValueError):
+            raise ServiceError("Year, mileage and rent periods must be whole numbers.") from None
+
+        car_id = str(uuid.uuid4())  # Generate a unique car ID
+        car = Car(car_id, make, model, year, mileage, True, min_rent_period, max_rent_period)
+        self.cars.add(car)
+        self._index_car(car)
+        self.query_cache.invalidate_car(car_id)
+        self.save_data()
+        return car
+
+    @timed()
+    @requires_data
+    def update_car(self, car_id, make=None, model=None, year=None, mileage=None, available=None, min_rent_period=None,
+                   max_rent_period=None):
+        """
+        Update car information. Arguments left as None (or empty) are not changed.
+
+        Returns:
+            The updated Car.
+        """
+        car = self.get_car(car_id)
+        changes = {}
+        try:
+            if make: changes['make'] = make
+            if model: changes['model'] = model
+            if year: changes['year'] = int(year)
+            if mileage: changes['mileage'] = int(mileage)
+            if available is not None: changes['available'] = available
+            if min_rent_period: changes['min_rent_period'] = int(min_rent_period)
+            if max_rent_period: changes['max_rent_period'] = int(max_rent_period)
+        except (TypeError, ValueError):
+            raise ServiceError("Year, mileage and rent periods must be whole numbers.") from None
+        self.cars.update(car, **changes)
+        self._index_car(car)
+        self.query_cache.invalidate_car(car_id)
+        self.save_data()
+        return car
+
+    @timed()
+    @requires_data
+    def delete_car(self, car_id):
+        """
+        Delete a car.
+
+        Args:
+            car_id: ID of the car to delete
+        """
+        car = self.get_car(car_id)
+        self.cars.remove(car)
+        self.availability.remove_car(car_id)
+        self._unindex_car(car_id)
+        self.query_cache.invalidate_car(car_id)
+        self.save_data()
+
+    @timed()
+    @requires_data
+    def get_car(self, car_id):
+        """
+        Raises:
+            ServiceError: If there is no car with that ID.
+        """
+        car = self.cars.get(car_id)
+        if not car:
+            raise ServiceError("Car not found.", 'not_found')
+        return car
+
+    @timed()
+    @requires_data
+    def get_booking(self, booking_id):
+        """
+        Raises:
+            ServiceError: If there is no booking with that ID.
+        """
+        booking = self.bookings.get(booking_id)
+        if not booking:
+            raise ServiceError("Booking not found.", 'not_found')
+        return booking
+
+    @timed()
+    @requires_data
+    def available_cars(self, start_date_str=None, end_date_str=None):
+        """
+        Cars that are in service and not reserved for the given dates.
+
+        Args:
+            start_date_str: Rental start date (YYYY-MM-DD, optional, defaults to today)
+            end_date_str: Rental end date (YYYY-MM-DD, optional, defaults to the day after the start date)
+
+        Returns:
+            List of Car objects.
+        """
+        try:
+            start_date = parse_date(start_date_str) if start_date_str else datetime.date.today()
+            end_date = parse_date(end_date_str) if end_date_str else start_date + datetime.timedelta(days=1)
+        except ValueError:
+            raise ServiceError("Invalid date format. Please use YYYY-MM-DD.") from None
+
+        if start_date >= end_date:
+            raise ServiceError("End date must be after start date.")
+
+        return list(self.query_cache.get_or_compute(('available_cars', start_date, end_date),
+                                                    lambda: self._available_cars(start_date, end_date)))
+
+    def _available_cars(self, start_date, end_date):
+        # Lazily loaded availability would read each car's reservations separately, so lazy mode asks the database
+        if self.lazy or self.query_mode == 'sql':
+            self._sync_for_sql()
+            return [self.cars.adopt(row) for row in self.db_manager.stream_available_cars(start_date, end_date)]
+        in_service = (car for car in self.cars if car.available)
+        return list(self.availability.free_cars(in_service, start_date, end_date))
+
+    @timed()
+    @requires_data
+    def book_car(self, customer, car_id, start_date_str, end_date_str):
+        """
+        Book a car.
+
+        Args:
+            customer: Customer booking the car (User object)
+            car_id: ID of the car to book
+            start_date_str: Booking start date (YYYY-MM-DD)
+            end_date_str: Booking end date (YYYY-MM-DD)
+
+        Returns:
+            The new Booking, pending approval.
+        """
+        start_date, end_date = _parse_dates(start_date_str, end_date_str)
+
+        if start_date >= end_date:
+            raise ServiceError("End date must be after start date.")
+
+        # Check if the start date is in the past
+        if start_date < datetime.date.today():
+            raise ServiceError("Start date cannot be in the past.")
+
+        car = self.cars.get(car_id)
+        if not car or not car.available:
+            raise ServiceError("Car not found or not available.", 'not_found')
+
+        _check_rent_period(car, start_date, end_date)
+
+        if not self.availability.is_free(car_id, start_date, end_date):
+            raise ServiceError("Car is already booked for the selected dates.", 'conflict')
+
+        booking_id = str(uuid.uuid4())  # Generate a unique booking ID
+        booking = Booking(booking_id, customer.username, car_id, start_date, end_date)
+        self.bookings.add(booking)
+        self.save_data()
+        return booking
+
+    @requires_data
+    def car_request(self, customer_username, start_date_str, end_date_str, make=None, model=None, year=None,
+                    request_id=None):
+        """
+        Check a request for any car matching a make, model and/or year, for book_any_car or allocate_requests.
+
+        Args:
+            customer_username: Customer the booking is for
+            start_date_str: Rental start date (YYYY-MM-DD)
+            end_date_str: Rental end date (YYYY-MM-DD)
+            make: Required make (optional)
+            model: Required model (optional)
+            year: Required model year (optional)
+            request_id: Caller's ID for the request (optional)
+
+        Returns:
+            CarRequest.
+        """
+        start_date, end_date = _parse_dates(start_date_str, end_date_str)
+        if start_date >= end_date:
+            raise ServiceError("End date must be after start date.")
+        if start_date < datetime.date.today():
+            raise ServiceError("Start date cannot be in the past.")
+        try:
+            year = None if year in (None, '') else int(year)
+        except (TypeError, ValueError):
+            raise ServiceError("Year must be a whole number.") from None
+        user = self.users.get(customer_username)
+        if user is None or user.role != 'customer':
+            raise ServiceError(f"Customer {customer_username} not found.", 'not_found')
+        return CarRequest(request_id, customer_username, start_date, end_date, make or None, model or None, year)
+
+    @timed()
+    @requires_data
+    def book_any_car(self, customer, start_date_str, end_date_str, make=None, model=None, year=None):
+        """
+        Book a free car of a make, model and/or year instead of a given car: the first one found, not the best
+        fit among them (allocate_requests weighs requests against each other).
+
+        Args:
+            customer: Customer booking the car (User object)
+            start_date_str: Booking start date (YYYY-MM-DD)
+            end_date_str: Booking end date (YYYY-MM-DD)
+            make: Required make (optional)
+            model: Required model (optional)
+            year: Required model year (optional)
+
+        Returns:
+            The new Booking, pending approval.
+        """
+        request = self.car_request(customer.username, start_date_str, end_date_str, make, model, year)
+        car = self._free_car(request)
+        if car is None:
+            raise ServiceError("No matching car is available for the selected dates.", 'conflict')
+        # Not self.book_car, which the console overrides to print instead of returning the booking
+        return RentalService.book_car(self, customer, car.car_id, start_date_str, end_date_str)
+
+    def _free_car(self, request):
+        # A car the request can have, without going through the whole fleet
+        if self.lazy or self.query_mode == 'sql':
+            self._sync_for_sql()
+            rows = self.db_manager.free_cars(request.start_date, request.end_date, request.make, request.model,
+                                             request.year, limit=1)
+            return self.cars.adopt(rows[0]) if rows else None
+        accepted = (car for car in self.cars if request.accepts(car))
+        return next(self.availability.free_cars(accepted, request.start_date, request.end_date), None)
+
+    @timed()
+    @requires_data
+    def allocate_requests(self, requests, batch_size=BULK_REVIEW_BATCH_SIZE):
+        """
+        Serve many requests for any matching car at once: FleetAllocator assigns them to cars so that as many as
+        possible are served, and each assignment is booked as an approved booking, in batches of one transaction.
+
+        Args:
+            requests: CarRequest objects, e.g. from car_request()
+            batch_size: Bookings made per transaction
+
+        Returns:
+            AllocationReport. If a batch cannot be saved because another process changed the same data, the
+            allocation stops and the requests not booked yet are reported as unassigned.
+        """
+        if batch_size < 1:
+            raise ServiceError("Batch size must be at least 1.")
+        report = AllocationReport()
+        assignments, report.unassigned = FleetAllocator(self.cars, self.availability).allocate(requests)
+        for start in range(0, len(assignments), batch_size):
+            batch = assignments[start:start + batch_size]
+            try:
+                self._allocate_batch(batch, report)
+            except ServiceError as error:
+                # save_data reloaded the data; the rest was allocated against the old state
+                report.unassigned.extend(request for request, _ in assignments[start:])
+                del report.bookings[start:], report.request_ids[start:]
+                report.error = str(error)
+                return report
+            report.batches += 1
+        return report
+
+    def _allocate_batch(self, batch, report):
+        for request, car in batch:
+            booking = Booking(str(uuid.uuid4()), request.customer_username, car.car_id, request.start_date,
+                              request.end_date, status="Approved")
+            self.availability.reserve(car.car_id, booking.start_date, booking.end_date, booking.booking_id)
+            self.bookings.add(booking)
+            self._count_booking(booking)
+            report.bookings.append(booking)
+            report.request_ids.append(request.request_id)
+        self.query_cache.invalidate_fleet()
+        self.save_data()
+
+    @timed()
+    @requires_data
+    def calculate_rental_fee(self, car_id, start_date_str, end_date_str):
+        """
+        Calculate rental fee.
+
+        Args:
+            car_id: ID of the car to calculate the fee for
+            start_date_str: Rental start date (YYYY-MM-DD)
+            end_date_str: Rental end date (YYYY-MM-DD)
+
+        Returns:
+            Rental fee, rounded to the cent.
+        """
+        start_date, end_date = _parse_dates(start_date_str, end_date_str)
+        pricing = self.pricing
+        return self.query_cache.get_or_compute(('calculate_rental_fee', pricing, car_id, start_date, end_date),
+                                               lambda: self._quote(pricing, car_id, start_date, end_date),
+                                               car_ids=(car_id,))
+
+    def _quote(self, pricing, car_id, start_date, end_date):
+        car = self.get_car(car_id)
+        _check_rent_period(car, start_date, end_date)
+        return pricing.quote(car, start_date, end_date)
+
+    @timed()
+    @requires_data
+    def quote_cars(self, car_ids, start_date_str, end_date_str):
+        """
+        Rental fees of many cars for the same period, priced in one batch.
+
+        Args:
+            car_ids: IDs of the cars to price
+            start_date_str: Rental start date (YYYY-MM-DD)
+            end_date_str: Rental end date (YYYY-MM-DD)
+
+        Returns:
+            Dictionary car_id -> fee, for the cars that exist, are in service and can be rented for that long.
+        """
+        start_date, end_date = _parse_dates(start_date_str, end_date_str)
+        rental_days = (end_date - start_date).days
+        if rental_days <= 0:
+            raise ServiceError("End date must be after start date.")
+        car_ids, pricing = tuple(car_ids), self.pricing
+        return dict(self.query_cache.get_or_compute(('quote_cars', pricing, car_ids, start_date, end_date),
+                                                    lambda: self._quote_cars(pricing, car_ids, start_date, end_date),
+                                                    car_ids=car_ids))
+
+    def _quote_cars(self, pricing, car_ids, start_date, end_date):
+        rental_days = (end_date - start_date).days
+        cars = [car for car in map(self.cars.get, car_ids)
+                if car is not None and car.available and car.min_rent_period <= rental_days <= car.max_rent_period]
+        return dict(zip((car.car_id for car in cars), pricing.quote_cars(cars, start_date, end_date)))
+
+    @timed()
+    @requires_data
+    def quote_periods(self, car_id, periods):
+        """
+        Rental fees of one car for many periods, priced in one batch.
+
+        Args:
+            car_id: ID of the car to price
+            periods: Sequence of (start date, end date) pairs as YYYY-MM-DD strings
+
+        Returns:
+            List of fees, in the order of periods.
+
+        Raises:
+            ServiceError: If the car is unknown or a period is invalid or outside the car's rent period.
+        """
+        car = self.get_car(car_id)
+        parsed = []
+        for start_date_str, end_date_str in periods:
+            start_date, end_date = _parse_dates(start_date_str, end_date_str)
+            _check_rent_period(car, start_date, end_date)
+            parsed.append((start_date, end_date))
+        try:
+            return self.pricing.quote_periods(car, parsed)
+        except ValueError as error:
+            raise ServiceError(str(error)) from None
+
+    @timed()
+    @requires_data
+    def list_bookings(self, status=None):
+        """
+        Bookings to review, optionally only those with a given status.
+
+        Returns:
+            Iterable of Booking objects; streamed from the database in lazy or SQL mode.
+        """
+        if status is None:
+            return self.bookings
+        if self.query_mode == 'sql':
+            self._sync_for_sql()
+            return map(self.bookings.adopt, self.db_manager.stream('bookings', 'status', status))
+        return self.bookings.by_status(status)
+
+    @timed()
+    @requires_data
+    def find_bookings(self, status="Pending", start_date_str=None, end_date_str=None, car_id=None, customer=None):
+        """
+        Bookings with a status, optionally narrowed to a date range, a car or a customer.
+
+        Args:
+            status: Booking status (optional, defaults to the requests waiting for review)
+            start_date_str: Only bookings that end after this date (YYYY-MM-DD, optional)
+            end_date_str: Only bookings that start before this date (YYYY-MM-DD, optional)
+            car_id: Only bookings of this car (optional)
+            customer: Only bookings of this customer (optional)
+
+        Returns:
+            List of Booking objects, earliest start first.
+        """
+        start_date, end_date = _parse_optional_date(start_date_str), _parse_optional_date(end_date_str)
+        if self.lazy or self.query_mode == 'sql':
+            self._sync_for_sql()
+            rows = self.db_manager.stream_bookings(status, start_date, end_date, car_id, customer)
+            return [self.bookings.adopt(row) for row in rows]
+        # Start from the narrowest secondary index
+        if car_id is not None:
+            candidates = self.bookings.by_car(car_id)
+        elif customer is not None:
+            candidates = self.bookings.by_customer(customer)
+        else:
+            candidates = self.bookings.by_status(status)
+        matches = [booking for booking in candidates
+                   if booking.status == status
+                   and (car_id is None or booking.car_id == car_id)
+                   and (customer is None or booking.customer_username == customer)
+                   and (start_date is None or booking.end_date > start_date)
+                   and (end_date is None or booking.start_date < end_date)]
+        matches.sort(key=lambda booking: (booking.start_date, booking.booking_id))
+        return matches
+
+    @timed()
+    @requires_data
+    def review_bookings(self, bookings, action, batch_size=BULK_REVIEW_BATCH_SIZE):
+        """
+        Approve or reject many pending bookings, committing each batch in one transaction.
+
+        Bookings are decided in the order given. When approving, a booking that overlaps an approved one - including
+        one approved earlier in the same review - or whose car was deleted or taken out of service is rejected
+        instead.
+
+        Args:
+            bookings: Booking objects or booking IDs, e.g. from find_bookings()
+            action: 'approve' or 'reject'
+            batch_size: Bookings decided per transaction
+
+        Returns:
+            ReviewReport. If another process keeps changing the same bookings or dates, so that a batch cannot be
+            saved even after reloading and retrying it once, the review stops and the report's error says why.
+        """
+        if action not in REVIEW_ACTIONS:
+            raise ServiceError(f"Action must be {' or '.join(REVIEW_ACTIONS)}.")
+        if batch_size < 1:
+            raise ServiceError("Batch size must be at least 1.")
+        report = ReviewReport()
+        items = iter(bookings)
+        while True:
+            batch = list(itertools.islice(items, batch_size))
+            if not batch:
+                return report
+            try:
+                report.add(self._review_batch(batch, action))
+            except ServiceError:
+                # save_data reloaded the data, so look the bookings up again and decide them on current state
+                batch = [item if isinstance(item, str) else item.booking_id for item in batch]
+                try:
+                    report.add(self._review_batch(batch, action))
+                except ServiceError as error:
+                    report.error = str(error)
+                    return report
+
+    def _review_batch(self, batch, action):
+        outcome = ReviewReport()
+        for item in batch:
+            booking = self.bookings.get(item) if isinstance(item, str) else item
+            if booking is None or booking.status != "Pending":
+                outcome.skipped += 1
+                continue
+            if action == 'reject':
+                self.bookings.update(booking, status="Rejected")
+                outcome.rejected += 1
+                continue
+            car = self.cars.get(booking.car_id)
+            if car is None or not car.available:
+                self.bookings.update(booking, status="Rejected")
+                outcome.auto_rejected += 1
+                continue
+            try:
+                self.availability.reserve(booking.car_id, booking.start_date, booking.end_date, booking.booking_id)
+            except ValueError:
+                self.bookings.update(booking, status="Rejected")
+                outcome.auto_rejected += 1
+                continue
+            self.bookings.update(booking, status="Approved")
+            self._count_booking(booking)
+            outcome.approved += 1
+        if outcome.approved:
+            self.query_cache.invalidate_fleet()
+        self.save_data()
+        outcome.batches = 1
+        return outcome
+
+    @timed()
+    @requires_data
+    def approve_booking(self, booking_id):
+        """
+        Approve a booking, reserving the car for its dates.
+
+        Returns:
+            The approved Booking.
+
+        Raises:
+            ServiceError: If the booking is unknown or already approved, its car was deleted or is out of service,
+                or an approved booking overlaps it.
+        """
+        booking = self.get_booking(booking_id)
+        if booking.status == "Approved":
+            raise ServiceError("Booking is already approved.", 'conflict')
+        car = self.cars.get(booking.car_id)
+        if car is None or not car.available:
+            raise ServiceError("Car not found or not available. Reject this booking instead.", 'conflict')
+        # Reserve the dates first; this fails if another approved booking overlaps them
+        try:
+            self.availability.reserve(booking.car_id, booking.start_date, booking.end_date, booking.booking_id)
+        except ValueError:
+            raise ServiceError("Car is already booked for these dates. Reject this booking instead.",
+                               'conflict') from None
+        self.bookings.update(booking, status="Approved")
+        self._count_booking(booking)
+        self.query_cache.invalidate_fleet()
+        self.save_data()
+        return booking
+
+    @timed()
+    @requires_data
+    def reject_booking(self, booking_id):
+        """
+        Reject a booking, releasing its reservation if it was approved.
+
+        Returns:
+            The rejected Booking.
+        """
+        booking = self.get_booking(booking_id)
+        if booking.status == "Approved":
+            self.availability.release(booking.car_id, booking.start_date, booking.booking_id)
+            self.unit_of_work.register_uncounted(booking.booking_id)
+            self.query_cache.invalidate_fleet()
+        self.bookings.update(booking, status="Rejected")
+        self.save_data()
+        return booking
+
+    def _ledger_row(self, booking, car):
+        # What an approved booking adds to the report totals; revenue is the fee quoted at approval time
+        revenue = 0 if car is None else round(self.pricing.quote(car, booking.start_date, booking.end_date) * 100)
+        return (booking.booking_id, booking.car_id, '' if car is None else car.make, format_date(booking.start_date),
+                format_date(booking.end_date), revenue)
+
+    def _count_booking(self, booking):
+        self.unit_of_work.register_counted(booking.booking_id, self._ledger_row(booking, self.cars.get(booking.car_id)))
+
+    def _ensure_report(self):
+        # Count approved bookings the totals don't know about, e.g. approved before they existed or imported, and
+        # drop the ones no longer approved
+        if not self.db_manager.backfill_pending(TOTALS_BACKFILL):
+            return
+        split = len(TABLE_COLUMNS['bookings'])  # Booking columns come first, then the car's (NULL if it was deleted)
+
+        def uncounted():
+            for row in self.db_manager.stream_uncounted_bookings():
+                car = None if row[split] is None else CarRepository.from_row(row[split:])
+                yield self._ledger_row(BookingRepository.from_row(row[:split]), car)
+        self.db_manager.count_bookings(uncounted())
+        self.db_manager.uncount_stale_bookings()
+        self.db_manager.finish_backfill(TOTALS_BACKFILL)
+
+    @timed()
+    @requires_data
+    def archive_bookings(self, before_date_str=None):
+        """
+        Move bookings that have ended, and rejected bookings, out of the working set into the archive, where
+        booking_history() finds them. The remaining bookings are reloaded.
+
+        Args:
+            before_date_str: Archive bookings that ended on or before this day (YYYY-MM-DD, optional, defaults to
+                today)
+
+        Returns:
+            Number of bookings archived.
+
+        Raises:
+            ServiceError: If the day is in the future: bookings still running must stay in the working set.
+        """
+        today = datetime.date.today()
+        before = _parse_optional_date(before_date_str) or today
+        if before > today:
+            raise ServiceError("Only bookings that have ended can be archived.")
+        self.save_data()  # Archive what is saved, and don't drop pending changes with the reload
+        self.flush()
+        self._ensure_report()  # Approved bookings are only archived once they are counted in the report totals
+        archived = self.db_manager.archive_bookings(before)
+        if archived:
+            self.load_data()
+        return archived
+
+    @timed()
+    @requires_data
+    def booking_history(self, customer=None, car_id=None, start_date_str=None, end_date_str=None, status=None):
+        """
+        Archived bookings, read from the archive on demand, earliest start first.
+
+        Args:
+            customer: Only bookings of this customer (optional)
+            car_id: Only bookings of this car (optional)
+            start_date_str: Only bookings that end after this day (YYYY-MM-DD, optional)
+            end_date_str: Only bookings that start before this day (YYYY-MM-DD, optional)
+            status: Only bookings with this status (optional)
+
+        Returns:
+            Iterator of Booking objects, streamed from the archive. They are history and are not tracked for saving.
+        """
+        start_date, end_date = _parse_optional_date(start_date_str), _parse_optional_date(end_date_str)
+        return map(BookingRepository.from_row, self.db_manager.stream_archived_bookings(start_date, end_date, car_id,
+                                                                                        customer, status))
+
+    @staticmethod
+    def _report_month(month):
+        # Validated 'YYYY-MM' and its number of days; '' and 0 for all months
+        if not month:
+            return '', 0
+        try:
+            first = datetime.date.fromisoformat(f"{month}-01")
+        except (TypeError, ValueError):
+            raise ServiceError("Invalid month. Please use YYYY-MM.") from None
+        return first.strftime("%Y-%m"), month_days(first, first + datetime.timedelta(days=31))[0][1]
+
+    @staticmethod
+    def _report_row(group, key, month, days_in_month, cars, totals):
+        bookings, booked_days, revenue_cents = totals
+        return {'group': group, 'key': key, 'month': month or None, 'bookings': bookings, 'booked_days': booked_days,
+                'revenue': revenue_cents / 100, 'cars': cars,
+                # Share of the month's car-days that are booked; only meaningful for a single month
+                'utilization': round(booked_days / (cars * days_in_month), 4) if cars and days_in_month else None}
+
+    @timed()
+    @requires_data
+    def report(self, group='fleet', key=None, month=None):
+        """
+        Bookings, booked days, revenue and utilization of a car, a make or the whole fleet. Totals are kept up to date
+        as bookings are approved and rejected, so a report is a single lookup however many bookings there are.
+
+        Bookings and revenue count in the month a rental starts; booked days in the month they fall in. Revenue is
+        the fee quoted when the booking was approved.
+
+        Args:
+            group: 'car', 'make' or 'fleet'
+            key: Car ID or make (ignored for the fleet)
+            month: 'YYYY-MM' (optional, all months if omitted)
+
+        Returns:
+            Dictionary with group, key, month, bookings, booked_days, revenue, cars (cars in the group now) and
+            utilization (booked share of the month's car-days, None without a month).
+        """
+        if group not in REPORT_GRAINS:
+            raise ServiceError(f"Report group must be {', '.join(REPORT_GRAINS[:-1])} or {REPORT_GRAINS[-1]}.")
+        key = '' if group == 'fleet' or key is None else str(key)
+        month, days_in_month = self._report_month(month)
+        self._sync_for_sql()
+        self._ensure_report()
+        if group == 'fleet':
+            cars = self.db_manager.count('cars')
+        else:
+            cars = self.db_manager.count('cars', 'car_id' if group == 'car' else 'make', key)
+        return self._report_row(group, key or None, month, days_in_month, cars,
+                                self.db_manager.booking_totals(group, key, month))
+
+    @timed()
+    @requires_data
+    def report_groups(self, group='make', month=None):
+        """
+        Reports of every car or make with bookings, highest revenue first.
+
+        Args:
+            group: 'car', 'make' or 'fleet'
+            month: 'YYYY-MM' (optional, all months if omitted)
+
+        Returns:
+            List of dictionaries as returned by report().
+        """
+        if group not in REPORT_GRAINS:
+            raise ServiceError(f"Report group must be {', '.join(REPORT_GRAINS[:-1])} or {REPORT_GRAINS[-1]}.")
+        month, days_in_month = self._report_month(month)
+        self._sync_for_sql()
+        self._ensure_report()
+        if group == 'fleet':
+            cars = {'': self.db_manager.count('cars')}
+        else:
+            cars = self.db_manager.count_by('cars', 'car_id' if group == 'car' else 'make')
+        rows = [self._report_row(group, key or None, month, days_in_month, cars.get(key, 0), totals)
+                for key, *totals in self.db_manager.list_booking_totals(group, month)]
+        rows.sort(key=lambda row: (-row['revenue'], row['key'] or ''))
+        return rows
+
+    @timed()
+    @requires_data
+    def recommend_cars(self, year, mileage, start_date_str, end_date_str, limit=None, offset=0, order_by='mileage'):
+        """
+        Recommend cars based on year, mileage, and rental dates.
+
+        Args:
+            year: Desired car year (optional)
+            mileage: Maximum mileage (optional)
+            start_date_str: Rental start date (YYYY-MM-DD)
+            end_date_str: Rental end date (YYYY-MM-DD)
+            limit: Maximum number of cars to return (optional, all matches if omitted)
+            offset: Number of best matches to skip, for paging through results
+            order_by: 'mileage' ranks by lowest mileage and then newest year, 'price' by lowest rental fee first
+                (ties in mileage order)
+
+        Returns:
+            List of cars that match the criteria, best first.
+        """
+        if order_by not in RECOMMENDATION_ORDERS:
+            raise ServiceError(f"Recommendations can be ordered by {' or '.join(RECOMMENDATION_ORDERS)}.")
+        start_date, end_date = _parse_dates(start_date_str, end_date_str)
+
+        # Check if year is an empty string, if so, set it to None
+        if year == "":
+            year = None
+
+        # Check if mileage is an empty string, if so, set it to None
+        if mileage == "":
+            mileage = None
+
+        try:
+            year = None if year is None else int(year)
+            mileage = None if mileage is None else int(mileage)
+        except (TypeError, ValueError):
+            raise ServiceError("Year and mileage must be whole numbers.") from None
+
+        pricing = self.pricing if order_by == 'price' else None
+        key = ('recommend_cars', year, mileage, start_date, end_date, limit, offset, pricing)
+        return list(self.query_cache.get_or_compute(
+            key, lambda: self._recommend_cars(year, mileage, start_date, end_date, limit, offset, pricing)))
+
+    def _recommend_cars(self, year, mileage, start_date, end_date, limit, offset, pricing):
+        # Ranked by price when a pricing engine is given, by mileage otherwise
+        if pricing is not None:
+            # Every match is priced in one batch, then ranked; the mileage order breaks ties
+            cars = self._recommend_cars(year, mileage, start_date, end_date, None, 0, None)
+            if not cars:
+                return cars
+            fees = pricing.quote_cars(cars, start_date, end_date)
+            ranked = [car for _, _, car in sorted(zip(fees, itertools.count(), cars))]
+            return ranked[offset:None if limit is None else offset + limit]
+
+        rental_days = (end_date - start_date).days
+        if self.query_mode == 'sql':
+            self._sync_for_sql()
+            rows = self.db_manager.recommend_cars(start_date, end_date, year, mileage, limit, offset)
+            return [self.cars.adopt(row) for row in rows]
+
+        # The index covers year, mileage and rent period; reserved dates are checked per candidate
+        self._ensure_recommendations()
+        start_day, end_day = start_date.toordinal(), end_date.toordinal()
+        car_ids = self.recommendations.query(
+            year, mileage, rental_days,
+            accept=lambda car_id: self.availability.is_free(car_id, start_day, end_day),
+            limit=limit, offset=offset)
+        return [self.cars.get(car_id) for car_id in car_ids]
+
+    @timed()
+    @requires_data
+    def import_data(self, table, path):
+        """
+        Import cars or bookings from a CSV or JSON Lines file, then reload the in-memory state.
+
+        Args:
+            table: 'cars' or 'bookings'
+            path: Input file (.csv or .jsonl)
+
+        Returns:
+            ImportReport with the outcome.
+        """
+        # Imported on first use; most sessions never import or export
+        from src.system.bulk_io import import_file
+        self.save_data()  # Flush pending changes first so the reload doesn't drop them
+        self.flush()
+        try:
+            report = import_file(self.db_manager, table, path)
+        except (OSError, ValueError) as error:
+            raise ServiceError(f"Import failed: {error}") from error
+        if report.written:
+            self.load_data()
+        return report
+
+    @timed()
+    @requires_data
+    def export_data(self, table, path):
+        """
+        Export cars or bookings to a CSV or JSON Lines file.
+
+        Args:
+            table: 'cars' or 'bookings'
+            path: Output file (.csv or .jsonl)
+
+        Returns:
+            Number of rows written.
+        """
+        from src.system.bulk_io import export_table
+        self.save_data()
+        self.flush()
+        try:
+            return export_table(self.db_manager, table, path)
+        except (OSError, ValueError) as error:
+            raise ServiceError(f"Export failed: {error}") from error
@@ -0,0 +1,291 @@
+import weakref
+
+from src.models.user import User
+from src.models.car import Car
+from src.models.booking import Booking
+from src.database.database_manager import STREAM_BATCH_SIZE
+from src.utils.dates import parse_date
+from src.utils.instrumentation import metrics
+
+
+class Repository:
+    """
+    In-memory collection of model objects keyed by their primary key, with optional secondary indexes.
+
+    Every change made through add/update/remove is registered with the unit of work so that save_data only
+    writes the affected rows.
+    """
+
+    table = None  # Database table, set by subclasses
+    key_attr = None  # Primary key attribute, set by subclasses
+    index_attrs = ()  # Attributes with a secondary index, set by subclasses
+
+    @staticmethod
+    def from_row(row):
+        """
+        Build a model object from a database row, set by subclasses.
+        """
+        raise NotImplementedError
+
+    def __init__(self, unit_of_work=None):
+        """
+        Args:
+            unit_of_work: UnitOfWork that records changes (optional)
+        """
+        self.unit_of_work = unit_of_work
+        self._items = {}  # key -> object
+        self._indexes = {attr: {} for attr in self.index_attrs}  # attr -> value -> {key: object}
+
+    def load(self, objects):
+        """
+        Replace the contents with objects read from the database, without recording them as changes.
+
+        Args:
+            objects: Iterable of model objects
+        """
+        self._items = {}
+        self._indexes = {attr: {} for attr in self.index_attrs}
+        for obj in objects:
+            self._insert(obj)
+
+    def _insert(self, obj):
+        key = getattr(obj, self.key_attr)
+        self._items[key] = obj
+        for attr, index in self._indexes.items():
+            index.setdefault(getattr(obj, attr), {})[key] = obj
+
+    def _unindex(self, obj, attrs):
+        key = getattr(obj, self.key_attr)
+        for attr in attrs:
+            index = self._indexes[attr]
+            bucket = index.get(getattr(obj, attr))
+            if bucket is not None:
+                bucket.pop(key, None)
+                if not bucket:
+                    del index[getattr(obj, attr)]
+
+    def adopt(self, row):
+        """
+        Model object for a row read from the database, reusing the loaded object so changes made through it
+        are not lost.
+        """
+        obj = self._items.get(row[0])
+        return obj if obj is not None else self.from_row(row)
+
+    def get(self, key):
+        """
+        Look up an object by primary key.
+
+        Returns:
+            The object, or None if there is none with that key.
+        """
+        return self._items.get(key)
+
+    def add(self, obj):
+        """
+        Add a new object.
+
+        Raises:
+            ValueError: If an object with the same key already exists.
+        """
+        key = getattr(obj, self.key_attr)
+        if key in self._items:
+            raise ValueError(f"Duplicate {self.key_attr}: {key}")
+        self._insert(obj)
+        if self.unit_of_work:
+            self.unit_of_work.register_new(obj)
+
+    def update(self, obj, **fields):
+        """
+        Change attributes of an object and keep the secondary indexes consistent.
+
+        Args:
+            obj: Object held by this repository
+            **fields: Attribute name -> new value
+        """
+        if self.key_attr in fields:
+            raise ValueError(f"{self.key_attr} cannot be changed.")
+        moved = [attr for attr in self._indexes if attr in fields and fields[attr] != getattr(obj, attr)]
+        self._unindex(obj, moved)
+        for attr, value in fields.items():
+            setattr(obj, attr, value)
+        key = getattr(obj, self.key_attr)
+        for attr in moved:
+            self._indexes[attr].setdefault(getattr(obj, attr), {})[key] = obj
+        if self.unit_of_work:
+            self.unit_of_work.register_dirty(obj)
+
+    def remove(self, obj):
+        """
+        Remove an object.
+        """
+        key = getattr(obj, self.key_attr)
+        if self._items.pop(key, None) is None:
+            return
+        self._unindex(obj, self._indexes)
+        if self.unit_of_work:
+            self.unit_of_work.register_deleted(obj)
+
+    def find_by(self, attr, value):
+        """
+        Objects whose indexed attribute equals value.
+
+        Returns:
+            List of matching objects (empty if none).
+        """
+        return list(self._indexes[attr].get(value, {}).values())
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __iter__(self):
+        return iter(self._items.values())
+
+    def __len__(self):
+        return len(self._items)
+
+
+class LazyRepository(Repository):
+    """
+    Repository that reads objects from the database on demand instead of holding the whole table in memory.
+
+    Looked-up objects are kept in a weak identity map, so repeated lookups return the same object for as long as
+    anyone uses it. Iteration and secondary-index queries stream rows from the database in batches.
+    """
+
+    def __init__(self, db_manager, unit_of_work=None, batch_size=STREAM_BATCH_SIZE):
+        """
+        Args:
+            db_manager: DatabaseManager to read rows from
+            unit_of_work: UnitOfWork that records changes (optional)
+            batch_size: Rows fetched per round trip while streaming
+        """
+        super().__init__(unit_of_work)
+        self.db_manager = db_manager
+        self.batch_size = batch_size
+        self._items = weakref.WeakValueDictionary()  # key -> object, for objects that are still referenced
+        self._indexes = {}  # Secondary lookups are answered by the database
+
+    def load(self, objects=()):
+        """
+        Forget cached objects; they are read again on demand.
+        """
+        self._items = weakref.WeakValueDictionary()
+
+    def _insert(self, obj):
+        self._items[getattr(obj, self.key_attr)] = obj
+
+    def get(self, key):
+        obj = self._items.get(key)
+        if obj is None:
+            metrics.increment('identity_map_misses', table=self.table)
+            row = self.db_manager.fetch_one(self.table, key)
+            if row is not None:
+                obj = self.from_row(row)
+                self._insert(obj)
+        else:
+            metrics.increment('identity_map_hits', table=self.table)
+        return obj
+
+    def add(self, obj):
+        if getattr(obj, self.key_attr) in self:
+            raise ValueError(f"Duplicate {self.key_attr}: {getattr(obj, self.key_attr)}")
+        super().add(obj)
+
+    def update(self, obj, **fields):
+        self._insert(obj)
+        super().update(obj, **fields)
+
+    def remove(self, obj):
+        self._items.pop(getattr(obj, self.key_attr), None)
+        if self.unit_of_work:
+            self.unit_of_work.register_deleted(obj)
+
+    def stream_by(self, attr, value):
+        """
+        Stream objects whose attribute equals value.
+        """
+        return (self.adopt(row) for row in self.db_manager.stream(self.table, attr, value, self.batch_size))
+
+    def find_by(self, attr, value):
+        return list(self.stream_by(attr, value))
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __iter__(self):
+        return (self.adopt(row) for row in self.db_manager.stream(self.table, batch_size=self.batch_size))
+
+    def __len__(self):
+        return self.db_manager.count(self.table)
+
+
+class UserRepository(Repository):
+    """
+    Users keyed by username.
+    """
+
+    table = 'users'
+    key_attr = 'username'
+
+    @staticmethod
+    def from_row(row):
+        username, password, role, version = row
+        return User(username, password, role, version)
+
+
+class CarRepository(Repository):
+    """
+    Cars keyed by car_id.
+    """
+
+    table = 'cars'
+    key_attr = 'car_id'
+
+    @staticmethod
+    def from_row(row):
+        car_id, make, model, year, mileage, available, min_rent_period, max_rent_period, version = row
+        return Car(car_id, make, model, year, mileage, available, min_rent_period, max_rent_period, version)
+
+
+class BookingRepository(Repository):
+    """
+    Bookings keyed by booking_id, indexed by car, customer and status.
+    """
+
+    table = 'bookings'
+    key_attr = 'booking_id'
+    index_attrs = ('car_id', 'customer_username', 'status')
+
+    @staticmethod
+    def from_row(row):
+        booking_id, customer_username, car_id, start_date, end_date, status, version = row
+        return Booking(booking_id, customer_username, car_id, parse_date(start_date), parse_date(end_date), status,
+                       version)
+
+    def by_car(self, car_id):
+        return self.find_by('car_id', car_id)
+
+    def by_customer(self, username):
+        return self.find_by('customer_username', username)
+
+    def by_status(self, status):
+        return self.find_by('status', status)
+
+
+class LazyUserRepository(LazyRepository, UserRepository):
+    """
+    Users read from the database on demand.
+    """
+
+
+class LazyCarRepository(LazyRepository, CarRepository):
+    """
+    Cars read from the database on demand.
+    """
+
+
+class LazyBookingRepository(LazyRepository, BookingRepository):
+    """
+    Bookings read from the database on demand; by_car/by_customer/by_status query the database.
+    """
@@ -0,0 +1,79 @@
+# utils/dates.py
+import datetime
+from functools import lru_cache
+
+DATE_FORMAT = "%Y-%m-%d"  # Format of every date entered by users and stored in the database
+
+# Bookings reuse a small set of calendar days, so a few thousand cached entries cover years of history
+DATE_CACHE_SIZE = 8192
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_date(value):
+    """
+    Parse a YYYY-MM-DD string. Results are memoized, so repeated strings return the same date object.
+
+    Args:
+        value: Date string
+
+    Returns:
+        datetime.date
+
+    Raises:
+        ValueError: If the string is not a valid YYYY-MM-DD date.
+    """
+    if len(value) == 10 and value[4] == '-' and value[7] == '-':
+        return datetime.date.fromisoformat(value)  # C fast path for the canonical form
+    # Anything else goes through strptime so non-padded input such as 2025-6-1 is still accepted
+    return datetime.datetime.strptime(value, DATE_FORMAT).date()
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def format_date(day):
+    """
+    Format a date as YYYY-MM-DD, memoized.
+    """
+    return day.isoformat()
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_day(value):
+    """
+    Parse a YYYY-MM-DD string into a day ordinal (date.toordinal()), memoized.
+    """
+    return parse_date(value).toordinal()
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def from_day(ordinal):
+    """
+    Convert a day ordinal back into a date, memoized so equal days share one object.
+    """
+    return datetime.date.fromordinal(ordinal)
+
+
+def month_days(start_date, end_date):
+    """
+    Split the days from start_date up to end_date (exclusive) by calendar month.
+
+    Returns:
+        List of (YYYY-MM string, number of days) pairs, in month order.
+    """
+    months = []
+    day = start_date
+    while day < end_date:
+        next_month = (day.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+        last = min(next_month, end_date)
+        months.append((day.strftime("%Y-%m"), (last - day).days))
+        day = last
+    return months
+
+
+def cache_info():
+    """
+    Hit/miss statistics of the date caches.
+
+    Returns:
+        Dictionary mapping function name to its functools cache_info().
+    """
+    return {function.__name__: function.cache_info() for function in (parse_date, format_date, parse_day, from_day)}
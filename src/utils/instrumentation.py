@@ -0,0 +1,329 @@
+# utils/instrumentation.py
+"""
+Opt-in metrics: per-operation timers, per-statement SQL timing and row counts, event counters (e.g. cache hits and
+misses) and a log of slow operations with their arguments. Everything is recorded in the process-wide `metrics`
+registry and can be exported as a JSON snapshot or in the Prometheus text format.
+
+Instrumentation is off by default. While it is off, a @timed method costs one attribute check per call and
+connections are plain sqlite3 connections. Turn it on before creating the DatabaseManager, since connections
+opened earlier are not profiled:
+    metrics.enable(slow_threshold=0.1)
+"""
+import collections
+import functools
+import sqlite3
+import threading
+import time
+
+from src.utils import dates
+
+SLOW_LOG_SIZE = 100  # Slow operations kept, oldest dropped first
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)  # Histogram upper bounds, seconds
+MAX_ARG_LENGTH = 200  # Characters of each argument's repr kept in the slow log
+REDACTED = '***'
+PROMETHEUS_PREFIX = 'car_rental'
+
+
+class Metrics:
+    """
+    Registry of everything measured in this process. All methods are thread-safe.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.slow_threshold = None  # Seconds; calls at least this slow go to the slow log, None keeps no log
+        self._lock = threading.Lock()
+        self.reset()
+
+    def enable(self, slow_threshold=None, slow_log_size=SLOW_LOG_SIZE):
+        """
+        Start recording.
+
+        Args:
+            slow_threshold: Log operations taking at least this many seconds, with their arguments (optional)
+            slow_log_size: Number of slow operations kept
+        """
+        with self._lock:
+            self.slow_threshold = slow_threshold
+            self._slow_log = collections.deque(self._slow_log, maxlen=slow_log_size)
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        """
+        Drop everything recorded so far.
+        """
+        with self._lock:
+            self._operations = {}  # name -> [count, errors, total seconds, max seconds, bucket counts]
+            self._statements = {}  # SQL text -> [count, total seconds, rows]
+            self._counters = collections.Counter()  # (name, sorted label items) -> count
+            self._slow_log = collections.deque(maxlen=SLOW_LOG_SIZE)
+
+    def increment(self, name, amount=1, **labels):
+        """
+        Add to an event counter, e.g. increment('cache_hits', table='cars'). Does nothing while disabled.
+        """
+        if self.enabled:
+            with self._lock:
+                self._counters[name, tuple(sorted(labels.items()))] += amount
+
+    def observe(self, name, seconds, failed=False, arguments=None):
+        """
+        Record one call of an operation.
+
+        Args:
+            name: Operation name
+            seconds: Duration of the call
+            failed: The call raised an exception
+            arguments: Dictionary of argument name -> repr, stored in the slow log if the call was slow
+        """
+        with self._lock:
+            stats = self._operations.get(name)
+            if stats is None:
+                stats = self._operations[name] = [0, 0, 0.0, 0.0, [0] * len(LATENCY_BUCKETS)]
+            stats[0] += 1
+            stats[1] += failed
+            stats[2] += seconds
+            stats[3] = max(stats[3], seconds)
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    stats[4][i] += 1
+                    break
+            if self.slow_threshold is not None and seconds >= self.slow_threshold:
+                self._slow_log.append({'operation': name, 'seconds': round(seconds, 6), 'failed': failed,
+                                       'arguments': arguments or {}, 'at': time.time()})
+
+    def observe_statement(self, sql, seconds, rows):
+        with self._lock:
+            stats = self._statements.get(sql)
+            if stats is None:
+                stats = self._statements[sql] = [0, 0.0, 0]
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] += rows
+
+    def snapshot(self):
+        """
+        Everything recorded so far, as JSON-serializable data.
+
+        Returns:
+            Dictionary with 'operations', 'statements', 'counters', 'caches' and 'slow_log'.
+        """
+        with self._lock:
+            operations = {name: {'count': count, 'errors': errors, 'total_seconds': round(total, 6),
+                                 'mean_seconds': round(total / count, 6), 'max_seconds': round(maximum, 6),
+                                 'buckets': dict(zip(map(str, LATENCY_BUCKETS), buckets))}
+                          for name, (count, errors, total, maximum, buckets) in self._operations.items()}
+            statements = [{'sql': sql, 'count': count, 'total_seconds': round(total, 6), 'rows': rows}
+                          for sql, (count, total, rows) in self._statements.items()]
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in sorted(self._counters.items())]
+            slow_log = list(self._slow_log)
+        statements.sort(key=lambda statement: statement['total_seconds'], reverse=True)
+        caches = {name: {'hits': info.hits, 'misses': info.misses, 'size': info.currsize}
+                  for name, info in dates.cache_info().items()}
+        return {'operations': operations, 'statements': statements, 'counters': counters, 'caches': caches,
+                'slow_log': slow_log}
+
+    def to_json(self):
+        import json  # Only needed for exports; kept off the startup path
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        """
+        The snapshot in the Prometheus text exposition format.
+        """
+        snapshot = self.snapshot()
+        lines = [f"# TYPE {PROMETHEUS_PREFIX}_operation_seconds histogram"]
+        for name, stats in sorted(snapshot['operations'].items()):
+            label = f'operation="{_escape(name)}"'
+            cumulative = 0
+            for bound, count in stats['buckets'].items():
+                cumulative += count
+                lines.append(f'{PROMETHEUS_PREFIX}_operation_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'{PROMETHEUS_PREFIX}_operation_seconds_bucket{{{label},le="+Inf"}} {stats["count"]}')
+            lines.append(f"{PROMETHEUS_PREFIX}_operation_seconds_sum{{{label}}} {stats['total_seconds']}")
+            lines.append(f"{PROMETHEUS_PREFIX}_operation_seconds_count{{{label}}} {stats['count']}")
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_operation_errors_total counter")
+        for name, stats in sorted(snapshot['operations'].items()):
+            lines.append(f'{PROMETHEUS_PREFIX}_operation_errors_total{{operation="{_escape(name)}"}} '
+                         f"{stats['errors']}")
+        for metric, field in (('sql_statements_total', 'count'), ('sql_seconds_total', 'total_seconds'),
+                              ('sql_rows_total', 'rows')):
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{metric} counter")
+            for statement in snapshot['statements']:
+                lines.append(f'{PROMETHEUS_PREFIX}_{metric}{{sql="{_escape(statement["sql"])}"}} {statement[field]}')
+        names = sorted({counter['name'] for counter in snapshot['counters']})
+        for name in names:
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{name}_total counter")
+            for counter in snapshot['counters']:
+                if counter['name'] == name:
+                    labels = ','.join(f'{key}="{_escape(value)}"' for key, value in counter['labels'].items())
+                    lines.append(f"{PROMETHEUS_PREFIX}_{name}_total{{{labels}}} {counter['value']}")
+        for field in ('hits', 'misses'):
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}_date_cache_{field}_total counter")
+            for name, info in sorted(snapshot['caches'].items()):
+                lines.append(f'{PROMETHEUS_PREFIX}_date_cache_{field}_total{{function="{name}"}} {info[field]}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """
+        Write the snapshot to a file: Prometheus text if the name ends in .prom, JSON otherwise.
+        """
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(self.to_prometheus() if path.endswith('.prom') else self.to_json())
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+metrics = Metrics()  # Process-wide registry
+
+
+def describe_arguments(arguments):
+    """
+    Argument name -> shortened repr, as stored in the slow log. Anything named like a password is redacted.
+
+    Args:
+        arguments: Iterable of (name, value) pairs
+    """
+    described = {}
+    for name, value in arguments:
+        if name == 'self':
+            continue
+        text = REDACTED if 'password' in name else repr(value)
+        described[name] = text if len(text) <= MAX_ARG_LENGTH else text[:MAX_ARG_LENGTH] + '...'
+    return described
+
+
+def timed(name=None):
+    """
+    Decorator recording the duration of each call in `metrics` while instrumentation is enabled.
+
+    Args:
+        name: Operation name (optional, defaults to the function's qualified name, e.g. RentalService.book_car)
+    """
+    def decorator(function):
+        operation = name or function.__qualname__
+        target = function
+        while hasattr(target, '__wrapped__'):  # Parameter names of the innermost function, e.g. under requires_data
+            target = target.__wrapped__
+        names = target.__code__.co_varnames[:target.__code__.co_argcount]
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return function(*args, **kwargs)
+            started = time.perf_counter()
+            failed = True
+            try:
+                result = function(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                seconds = time.perf_counter() - started
+                slow = metrics.slow_threshold is not None and seconds >= metrics.slow_threshold
+                metrics.observe(operation, seconds, failed, describe_arguments(list(zip(names, args)) + list(kwargs.items()))
+                                if slow else None)
+        return wrapper
+    return decorator
+
+
+class ProfilingCursor(sqlite3.Cursor):
+    """
+    Cursor that reports each statement's execution and fetch time and the rows it returned or changed.
+    A statement is reported when the next one starts on the cursor, or when the cursor is closed or exhausted.
+    """
+
+    def __init__(self, connection):
+        super().__init__(connection)
+        self._sql = None
+        self._seconds = 0.0
+        self._rows = 0
+
+    def _report(self):
+        if self._sql is not None:
+            metrics.observe_statement(self._sql, self._seconds, self._rows)
+            self._sql = None
+
+    def _run(self, method, sql, params):
+        self._report()
+        started = time.perf_counter()
+        try:
+            method(sql, params)
+        finally:
+            self._sql = ' '.join(sql.split())
+            self._seconds = time.perf_counter() - started
+            self._rows = max(self.rowcount, 0)  # Changed rows; fetches add the rows returned
+        if self.description is None:
+            self._report()  # Nothing to fetch
+        return self
+
+    def execute(self, sql, params=()):
+        return self._run(super().execute, sql, params)
+
+    def executemany(self, sql, params):
+        return self._run(super().executemany, sql, params)
+
+    def _fetch(self, method, *args):
+        started = time.perf_counter()
+        rows = method(*args)
+        self._seconds += time.perf_counter() - started
+        return rows
+
+    def fetchone(self):
+        row = self._fetch(super().fetchone)
+        if row is None:
+            self._report()
+        else:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._fetch(super().fetchmany, self.arraysize if size is None else size)
+        self._rows += len(rows)
+        if not rows:
+            self._report()
+        return rows
+
+    def fetchall(self):
+        rows = self._fetch(super().fetchall)
+        self._rows += len(rows)
+        self._report()
+        return rows
+
+    def __next__(self):
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    def close(self):
+        self._report()
+        super().close()
+
+    def __del__(self):
+        self._report()  # e.g. execute(...).fetchone() of a single row, never read to the end
+
+
+class ProfilingConnection(sqlite3.Connection):
+    """
+    Connection whose execute()/executemany() shortcuts run on a ProfilingCursor. Used as the sqlite3.connect()
+    factory while instrumentation is enabled.
+    """
+
+    def execute(self, sql, params=()):
+        return self.cursor(ProfilingCursor).execute(sql, params)
+
+    def executemany(self, sql, params):
+        return self.cursor(ProfilingCursor).executemany(sql, params)
+
+
+def connection_factory():
+    """
+    sqlite3.connect() factory for new connections: profiling while instrumentation is enabled, plain otherwise.
+    """
+    return ProfilingConnection if metrics.enabled else sqlite3.Connection